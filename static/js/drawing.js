@@ -53,6 +53,63 @@ function drawMonGraph(data, color_val) {
         );
 }
 
+function drawTrendGraph(data, color_val) {
+    // Clear the trend box.
+    document.getElementById('trend-box').innerHTML = '';    
+    // set the dimensions and margins of the graph; x in minutes or days before now
+    var margin = {top: 10, left: 60, bottom: 30, right: 20},
+        width = 820 - margin.left - margin.right,
+        height = 240 - margin.top - margin.bottom;
+    var svg = d3.select("#trend-box")
+        .append("svg")
+            .attr("width", width + margin.left + margin.right)
+            .attr("height", height + margin.top + margin.bottom)
+        .append("g")
+            .attr("transform", "translate(" + margin.left + "," + margin.top + ")");
+    // Add X axis
+    var x = d3.scaleLinear()
+        .domain([ d3.min(data.x), 0 ])
+        .range([ 0, width ]);
+    svg.append("g")
+        .attr("transform", "translate(0," + height + ")")
+        .call(d3.axisBottom(x));
+    // Add Y axis; min and max of each point as a band if given
+    var y_lo = data.y_lo || data.y;
+    var y_hi = data.y_hi || data.y;
+    var y = d3.scaleLinear()
+        .domain([ d3.min(y_lo), d3.max(y_hi) ])
+        .nice()
+        .range([ height, 0 ]);
+    svg.append("g")
+        .call(d3.axisLeft(y));
+    //
+    var points = [];
+    data.x.forEach((value, i) => {
+        points.push({x: value, y: data.y[i], lo: y_lo[i], hi: y_hi[i]});
+    });
+    if (data.y_lo) {
+        svg.append("path")
+            .datum(points)
+            .attr("fill", color_val)
+            .attr("fill-opacity", 0.15)
+            .attr("d", d3.area()
+                .x(function(d) { return x(d.x) })
+                .y0(function(d) { return y(d.lo) })
+                .y1(function(d) { return y(d.hi) })
+            );
+    }
+    // Add the line
+    svg.append("path")
+        .datum(points)
+        .attr("fill", "none")
+        .attr("stroke", color_val)
+        .attr("stroke-width", 1.0)
+        .attr("d", d3.line()
+            .x(function(d) { return x(d.x) })
+            .y(function(d) { return y(d.y) })
+        );
+}
+
 function drawGraph(data, color_val, y_min_id, y_max_id, x_min_id, x_max_id) {
     // Clear the chart box.
     document.getElementById('chart-box').innerHTML = '';    
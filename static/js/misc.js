@@ -27,3 +27,54 @@ function enableAllMenus(is_mobile) {
         document.getElementById("btn_gfreq").disabled = false;        
     }
 }
+
+function listDevices() {
+    const sel = document.getElementById("dev_id");
+    if (sel == null) { return; }
+    axios.post('/post_devList', {
+    }).then(response => {
+        const rows = response.data.rows;
+        const cur  = sel.value;
+        sel.innerHTML = '';
+        rows.forEach((row) => {
+            const opt = document.createElement("option");
+            opt.value = row.dev;
+            opt.text  = row.sensor ? row.dev + ' (' + row.sensor + ')' : row.dev;
+            if (row.dev == cur) { opt.selected = true; }
+            sel.appendChild(opt);
+        });
+    }).catch(function (error) {
+        console.log('Error occurred on device listing: ' + error);
+    });
+}
+
+function getOwner() {
+    var owner = sessionStorage.getItem("owner");
+    if (owner == null) {
+        owner = Math.random().toString(36).substring(2, 10);
+        sessionStorage.setItem("owner", owner);
+    }
+    return owner;
+}
+
+function getDevice() {
+    const sel = document.getElementById("dev_id");
+    if (sel == null) { return ''; }
+    return sel.value;
+}
+
+function pollJob(url, job, onProgress, onDone) {
+    axios.get(url, {
+        params: { job: job },
+    }).then(response => {
+        const data = response.data;
+        if (data.state == 'queued' || data.state == 'running') {
+            onProgress(data);
+            setTimeout(pollJob, 1000, url, job, onProgress, onDone);
+        } else {
+            onDone(data);
+        }
+    }).catch(function (error) {
+        onDone({ state: 'failed', msg_00: 'Error occurred on polling: ' + error, msg_01: 'N' });
+    });
+}
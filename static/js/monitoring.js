@@ -2,7 +2,8 @@
 // js for Sensor Data Minitoring & Analysis System(WSN application)
 //
 
-var tid = null;
+var es = null;
+var count = 0;
 var col = 'black';
 var row_val;
 var dat_val;
@@ -18,23 +19,30 @@ function monBegin(is_mobile) {
 
 function monStart(value, is_mobile) {
     const interval = document.getElementById('tm_interval').value;
-    axios.post('/post_monStart', {
-        value: value,
-    }).then(response => {
-        const data = response.data;
+    // rows pushed by server as sampled; the stream ends after 10 rows or when the device is off
+    count = value;
+    es = new EventSource('/stream_mon?dev=' + encodeURIComponent(getDevice()) + '&owner=' + encodeURIComponent(getOwner()) +
+                         '&interval=' + Number(interval));
+    es.addEventListener('row', function (event) {
+        const data = JSON.parse(event.data);
         //console.log(data);
         dispData(data);
-        if (data.timer == 'on' & value < 10) {
-            i = value + 1
-            tid = setTimeout(monStart, Number(interval)*1000, i, is_mobile);
+        trendShow();
+        if (data.timer == 'on' & count < 10) {
+            count = count + 1;
             document.getElementById("btn_stop" ).disabled = false;
         } else {
             //enableAllMenus(is_mobile);
             monStop(is_mobile)
         }  
-    }).catch(function (error) {
-        alert('Error occurred on submit: ' + error);
     });
+    es.onerror = function () {
+        // reconnected by the browser while the stream is open
+        if (es != null && es.readyState == EventSource.CLOSED) {
+            alert('Error occurred on monitoring stream');
+            monStop(is_mobile);
+        }
+    };
 }
 
 function monStop(is_mobile) {
@@ -43,9 +51,14 @@ function monStop(is_mobile) {
     document.getElementById("btn_start").disabled = false;
     document.getElementById("btn_stop" ).disabled = true;
     const value = document.getElementById('tm_interval').value;
-    clearTimeout ( tid );
+    if (es != null) {
+        es.close();
+        es = null;
+    }
     axios.post('/post_monStop', {
         //value: Number(value),
+        dev: getDevice(),
+        owner: getOwner(),
     }).then(response => {
         const data = response.data;
         //console.log(data);
@@ -91,3 +104,34 @@ function dispData(data) {
     }    
     document.getElementById("status_1").style.color = col;
 }
+
+function trendShow() {
+    // trend chart only on pages having it
+    if (document.getElementById("trend-box") == null) { return; }
+    const field = Number(document.getElementById('trend_field').value);
+    const minutes = Number(document.getElementById('trend_minutes').value);
+    // last hour kept in memory, days from history on disk; as many points as the chart has pixels
+    const points = 740; // plot width of drawTrendGraph
+    const url = (minutes <= 60) ? '/get_trend' : '/get_history';
+    axios.get(url, { params: {
+        dev: getDevice(),
+        minutes: minutes,
+        days: minutes / 1440,
+        points: points,
+    }}).then(response => {
+        const data = response.data;
+        if (data.count == 0) {
+            document.getElementById("trend_stats").innerHTML = 'no rows kept';
+            document.getElementById("trend-box").innerHTML = '';
+            return;
+        }
+        document.getElementById("trend_stats").innerHTML = ', ' + data.count + ' rows, mean ' + data.mean[field] +
+            ', max ' + data.max[field] + ', variance ' + data.var[field];
+        // time axis in minutes before now, days for history
+        const unit = (minutes <= 60) ? 60 : 86400;
+        drawTrendGraph({ x: data.t.map(t => t / unit), y: data.y[field],
+                         y_lo: data.ymin ? data.ymin[field] : null, y_hi: data.ymax ? data.ymax[field] : null }, 'blue');
+    }).catch(function (error) {
+        console.log('Error occurred on trend: ' + error);
+    });
+}
@@ -0,0 +1,243 @@
+"""
+alerting on sensor data as it comes, whether anyone watches the monitoring pages or not
+coded functions as below
+- rules read from a JSON file; ALERT_DEFAULT_RULES if none
+    {"sinks": {"file": path, "webhook": url}, "rules": [rule, ...]}
+    rule : {"name", "kind", "dev": fnmatch pattern of devices, "above" or "below", "clear", "holdoff"}
+    threshold : "field" of STE row, or "zmax"/"rms" anomaly score of wsn_anomaly, over "above" or under "below"
+    rate      : change of "field" per second over the last "window" seconds, as threshold
+    band      : energy of a spectrum in "low".."high" Hz, sum of squared amplitudes, as threshold
+- every STE row and every spectrum evaluated against the rules of its device at once
+- de-duplication and hysteresis per rule and device
+    raised once when the value passes "above"/"below"; not again till cleared by passing "clear" back
+    not raised again within "holdoff" seconds of the last one; suppressed ones counted
+- alerts and clears delivered by a thread in order; appended as a JSON line to the file sink,
+    posted as JSON to the local webhook sink
+- latency measured per alert; detection to delivery of each sink, sample age at detection
+    percentiles, recent alerts and active ones told by status()
+
+usage: import wsn_alert as ALERT
+       engine = ALERT.AlertEngine(path); engine.start()
+       engine.on_sample(dev_id, t, values, anomaly); engine.on_spectrum(dev_id, t, x, y); engine.status()
+
+                    started 2026-10-18
+"""
+import collections
+import fnmatch
+import json
+import os
+import queue
+import threading
+import time
+import urllib.request
+
+import numpy as np
+
+import wsn_anomaly as ANOMALY
+import wsn_ste as STE
+
+#############################################
+# target definitions to alerting
+#############################################
+#
+ALERT_QUEUE       = 1000              # alerts waiting delivery; dropped when full
+ALERT_RECENT      = 100               # recent alerts kept for status
+ALERT_HOLDOFF     = 60.               # default time period an alert of a rule and device not raised again
+ALERT_WEBHOOK_TIME = 2.               # time period to wait the webhook answering
+ALERT_LATENCY_KEEP = 1000             # latencies kept for percentiles
+ALERT_SCORES      = ['zmax', 'rms']   # anomaly scores taken as fields of threshold rules
+ALERT_DEFAULT_RULES = { 'sinks' : { 'file' : './alerts.log', 'webhook' : '' },
+                        'rules' : [ { 'name' : 'anomaly', 'kind' : 'threshold', 'dev' : '*', 'field' : 'rms',
+                                      'above' : ANOMALY.ANOM_RMS_LIMIT, 'clear' : ANOMALY.ANOM_RMS_LIMIT / 2. } ] }
+
+#############################################
+#############################################
+#
+# alert engine of all devices
+#
+#############################################
+class AlertEngine:
+
+    def __init__(self, path = ''):
+        config = ALERT_DEFAULT_RULES
+        if path != '' and os.path.exists(path):
+            with open(path) as f:
+                config = json.load(f)
+        self.sinks     = config.get('sinks', {})
+        self.rules     = config.get('rules', [])
+        self.states    = {}   # keyed by rule name and device; active, notified, time raised, values of rate window
+        self.queue     = queue.Queue(ALERT_QUEUE)
+        self.recent    = collections.deque(maxlen=ALERT_RECENT)
+        self.latencies = collections.deque(maxlen=ALERT_LATENCY_KEEP)  # detection to delivery in sec
+        self.counts    = { 'raised' : 0, 'cleared' : 0, 'suppressed' : 0, 'dropped' : 0, 'failed' : 0 }
+        self.thread    = None
+        for rule in self.rules:
+            if rule.get('kind') in ('threshold', 'rate') and rule.get('field') not in STE.STE_FIELDS + ALERT_SCORES:
+                raise ValueError('rule "%s" has unknown field "%s"' % (rule.get('name'), rule.get('field')))
+
+    #############################################
+    # start delivery thread
+    #
+    def start(self):
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+        print ('ALT-S> %d alert rule(s), sinks %s' % (len(self.rules), [ k for k, v in self.sinks.items() if v ]), flush=True)
+
+    #############################################
+    # deliver alerts waiting and stop delivery thread
+    #
+    def close(self):
+        if self.thread == None:
+            return
+        self.queue.put(None)
+        self.thread.join()
+        self.thread = None
+
+    #############################################
+    # evaluate rules on a STE row; anomaly scores of the row as fields too once learned
+    #
+    def on_sample(self, dev_id, t, values, anomaly = None):
+        detected = time.time()
+        for rule in self.rules:
+            kind = rule.get('kind')
+            if kind not in ('threshold', 'rate') or not fnmatch.fnmatch(dev_id, rule.get('dev', '*')):
+                continue
+            field = rule['field']
+            if field in ALERT_SCORES:
+                if anomaly == None or anomaly['n'] <= ANOMALY.ANOM_WARMUP:
+                    continue
+                value = anomaly[field]
+            else:
+                value = values[STE.STE_FIELDS.index(field)]
+            if kind == 'rate':
+                state = self.state(rule, dev_id)
+                window = state['window']
+                window.append( (t, value) )
+                while len(window) > 2 and t - window[1][0] >= rule.get('window', 60.):
+                    window.popleft()
+                if len(window) < 2 or t <= window[0][0]:
+                    continue
+                value = (value - window[0][1]) / (t - window[0][0])
+            self.check(rule, dev_id, value, t, detected)
+
+    #############################################
+    # evaluate band rules on a spectrum; x in Hz, y amplitude
+    #
+    def on_spectrum(self, dev_id, t, x, y):
+        detected = time.time()
+        x = np.asarray(x, float)
+        y = np.asarray(y, float)
+        for rule in self.rules:
+            if rule.get('kind') != 'band' or not fnmatch.fnmatch(dev_id, rule.get('dev', '*')):
+                continue
+            band = (x >= rule['low']) & (x <= rule['high'])
+            self.check(rule, dev_id, float((y[band] ** 2).sum()), t, detected)
+
+    #############################################
+    # state of a rule and device
+    #
+    def state(self, rule, dev_id):
+        key = (rule['name'], dev_id)
+        state = self.states.get(key)
+        if state == None:
+            state = { 'active' : False, 'notified' : False, 'raised' : 0., 'value' : None, 'window' : collections.deque() }
+            self.states[key] = state
+        return state
+
+    #############################################
+    # raise or clear an alert of a rule and device by a value; hysteresis and holdoff
+    #
+    def check(self, rule, dev_id, value, t, detected):
+        state = self.state(rule, dev_id)
+        state['value'] = value
+        if 'above' in rule:
+            passed = value >= rule['above']
+            cleared = value < rule.get('clear', rule['above'])
+        else:
+            passed = value <= rule['below']
+            cleared = value > rule.get('clear', rule['below'])
+        if not state['active'] and passed:
+            state['active'] = True
+            # an alert suppressed is not cleared either
+            state['notified'] = detected - state['raised'] >= rule.get('holdoff', ALERT_HOLDOFF)
+            if not state['notified']:
+                self.counts['suppressed'] += 1
+                return
+            state['raised'] = detected
+            self.notify('raised', rule, dev_id, value, t, detected)
+        elif state['active'] and cleared:
+            state['active'] = False
+            if state['notified']:
+                self.notify('cleared', rule, dev_id, value, t, detected)
+
+    #############################################
+    # queue an alert to deliver
+    #
+    def notify(self, event, rule, dev_id, value, t, detected):
+        self.counts[event] += 1
+        alert = { 'event'    : event,
+                  'rule'     : rule['name'],
+                  'kind'     : rule['kind'],
+                  'dev'      : dev_id,
+                  'value'    : round(float(value), 4),
+                  'time'     : t,
+                  'detected' : detected,
+                  'age'      : round(detected - t, 3) }
+        print ('ALT-S> [%s] %s "%s" value %.4g' % (dev_id, event, rule['name'], value), flush=True)
+        try:
+            self.queue.put_nowait(alert)
+        except queue.Full:
+            self.counts['dropped'] += 1
+
+    #############################################
+    # delivery; alerts in order to every sink, latency measured per alert
+    #
+    def run(self):
+        while True:
+            alert = self.queue.get()
+            if alert == None:
+                break
+            latency = {}
+            if self.sinks.get('file'):
+                try:
+                    with open(self.sinks['file'], 'a') as f:
+                        f.write(json.dumps(alert) + '\n')
+                    latency['file'] = round(time.time() - alert['detected'], 4)
+                except Exception as e:
+                    self.counts['failed'] += 1
+                    print ('ALT-S> file sink error "%r"' % (e), flush=True)
+            if self.sinks.get('webhook'):
+                try:
+                    req = urllib.request.Request(self.sinks['webhook'], data=json.dumps(alert).encode(),
+                                                 headers={'Content-Type' : 'application/json'}, method='POST')
+                    urllib.request.urlopen(req, timeout=ALERT_WEBHOOK_TIME).close()
+                    latency['webhook'] = round(time.time() - alert['detected'], 4)
+                except Exception as e:
+                    self.counts['failed'] += 1
+                    print ('ALT-S> webhook sink error "%r"' % (e), flush=True)
+            if len(latency) > 0:
+                self.latencies.append(max(latency.values()))
+            alert['latency'] = latency
+            self.recent.append(alert)
+
+    #############################################
+    # counts, detection to delivery latency in ms, active alerts and recent ones
+    #
+    def status(self):
+        latencies = np.array(self.latencies) * 1000.
+        latency = { 'count' : len(latencies) }
+        if len(latencies) > 0:
+            latency.update({ 'p50' : round(float(np.percentile(latencies, 50)), 2),
+                             'p95' : round(float(np.percentile(latencies, 95)), 2),
+                             'p99' : round(float(np.percentile(latencies, 99)), 2),
+                             'max' : round(float(latencies.max()), 2) })
+        active = [ { 'rule' : key[0], 'dev' : key[1], 'value' : round(float(state['value']), 4) }
+                   for key, state in list(self.states.items()) if state['active'] ]
+        return { 'rules'   : len(self.rules),
+                 'sinks'   : [ k for k, v in self.sinks.items() if v ],
+                 'counts'  : dict(self.counts),
+                 'latency' : latency,
+                 'active'  : active,
+                 'recent'  : list(self.recent) }
+#
+#############################################
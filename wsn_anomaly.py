@@ -0,0 +1,115 @@
+"""
+streaming anomaly scoring of STE rows per device in place of fixed status thresholds
+coded functions as below
+- baseline per device of each STE field; mean and variance updated in O(1) per row, no batch training
+    exact running mean/variance (Welford) for the first 1/ANOM_ALPHA rows, exponentially weighted after
+    the baseline follows slow drift of the machine; a step change stands out till it is learned
+- row scored against the baseline before it is learned
+    z of each field; variance floored by ANOM_STD_FLOOR of the mean so constant fields do not blow up
+    univariate score, max |z|; multivariate score, RMS of z over fields (diagonal Mahalanobis distance)
+- status as post_monStart shows it; [movement, fault]
+    movement : VIBRATION if accelerometer variance of an axis is ANOM_MOVE_RATIO over the rest level of
+               the device, STOP if not; LEARNING till ANOM_WARMUP rows learned
+               rest level seeded by the ANOM_REST_PERCENTILE of variance over the warm-up rows
+               lowered at once by a new minimum; follows slow drift only while STOP, never raised by vibration
+    fault    : ABNORMAL if max |z| over ANOM_Z_LIMIT or RMS over ANOM_RMS_LIMIT, NORMAL if not
+               LEARNING till ANOM_WARMUP rows learned
+
+usage: import wsn_anomaly as ANOMALY
+       baseline = ANOMALY.Baseline(); result = baseline.classify(values)
+
+                    started 2026-10-18
+                    updated 2026-10-18; rest level seeded by warm-up rows, not raised while vibrating
+"""
+import numpy as np
+
+import wsn_ste as STE
+
+#############################################
+# target definitions to anomaly scoring
+#############################################
+#
+ANOM_ALPHA        = 0.005             # weight of a row after warm-up; baseline of about the last 200 rows
+ANOM_WARMUP       = 30                # rows learned before a fault status given
+ANOM_STD_FLOOR    = 0.01              # min standard deviation as a share of |mean|, plus ANOM_STD_MIN
+ANOM_STD_MIN      = 1e-3              # min standard deviation of a field
+ANOM_Z_LIMIT      = 6.                # univariate score of an abnormal row
+ANOM_RMS_LIMIT    = 3.                # multivariate score of an abnormal row
+ANOM_MOVE_RATIO   = 3.                # accelerometer variance over rest level of a vibrating device
+ANOM_REST_ALPHA   = 0.0001            # drift of rest level per row toward the variance while STOP
+ANOM_REST_PERCENTILE = 10.            # percentile of warm-up variance seeding the rest level
+ANOM_ACCEL_VAR    = [1, 3, 5]         # STE fields of accelerometer variance X/Y/Z
+
+#############################################
+#############################################
+#
+# baseline of a device
+#
+#############################################
+class Baseline:
+
+    def __init__(self):
+        self.n    = 0
+        self.mean = np.zeros(len(STE.STE_FIELDS))
+        self.var  = np.zeros(len(STE.STE_FIELDS))
+        self.rest = np.zeros(0)  # rest level of accelerometer variance X/Y/Z; empty till seeded
+        self.warm = []           # accelerometer variance X/Y/Z of warm-up rows
+
+    #############################################
+    # z of each field, max |z| and RMS of z of a row against the baseline
+    #
+    def score(self, values):
+        std = np.sqrt(self.var) + ANOM_STD_FLOOR * np.abs(self.mean) + ANOM_STD_MIN
+        z = (values - self.mean) / std
+        return z, float(np.abs(z).max()), float(np.sqrt((z * z).mean()))
+
+    #############################################
+    # learn a row; exact for the first rows, exponentially weighted after
+    #
+    def update(self, values):
+        self.n += 1
+        alpha = max(1. / self.n, ANOM_ALPHA)
+        diff = values - self.mean
+        self.mean += alpha * diff
+        self.var = (1. - alpha) * (self.var + alpha * diff * diff)
+
+    #############################################
+    # movement of a row against the rest level, then the rest level learned
+    #
+    def movement(self, values):
+        accel = values[ANOM_ACCEL_VAR]
+        if len(self.rest) == 0:
+            self.warm.append(accel)
+            if len(self.warm) >= ANOM_WARMUP:
+                self.rest = np.percentile(self.warm, ANOM_REST_PERCENTILE, axis=0)
+                self.warm = []
+            return 'LEARNING'
+        if (accel >= ANOM_MOVE_RATIO * (self.rest + ANOM_STD_MIN)).any():
+            movement = 'VIBRATION'
+        else:
+            movement = 'STOP'
+            self.rest += ANOM_REST_ALPHA * (accel - self.rest)
+        self.rest = np.minimum(self.rest, accel)
+        return movement
+
+    #############################################
+    # status and scores of a row, then the row learned
+    #
+    def classify(self, values):
+        values = np.asarray(values, float)
+        z, zmax, rms = self.score(values)
+        if self.n < ANOM_WARMUP:
+            fault = 'LEARNING'
+        elif zmax >= ANOM_Z_LIMIT or rms >= ANOM_RMS_LIMIT:
+            fault = 'ABNORMAL'
+        else:
+            fault = 'NORMAL'
+        movement = self.movement(values)
+        self.update(values)
+        return { 'status' : [movement, fault],
+                 'zmax'   : round(zmax, 2),
+                 'rms'    : round(rms, 2),
+                 'field'  : STE.STE_FIELDS[int(np.abs(z).argmax())],
+                 'n'      : self.n }
+#
+#############################################
@@ -0,0 +1,72 @@
+"""
+frequency spectrum of BDT capture data, for the gateway evaluating a capture job where it finishes
+coded functions as below
+- BDT text as the clients send it; 4 header lines then a "row, time, x, y, z" line per accelerometer point
+    header lines "server time", "delay time", "accelometer ODR" stamped as "name: value"
+    points read till an "End" line or BDT_POINT_LIMIT; lines too short or not parsed skipped
+- amplitude |x|+|y|+|z| per point; FFT normalized by points, |real part| of its first half without DC
+    same spectrum as SCD_spectrum/ASD_spectrum of the servers draw, vectorized on numpy
+- no device, no gateway; a function of the text only
+
+usage: import wsn_bdt as BDT
+       spectrum = BDT.spectrum(text); spectrum['x'], spectrum['y'], spectrum['t'], spectrum['f']
+
+                    started 2026-10-18
+"""
+import numpy as np
+
+#############################################
+# target definitions to BDT spectrum
+#############################################
+#
+BDT_POINT_LIMIT   = 9600              # points read of a capture; MAX_X_LIMIT of the servers
+BDT_HEADER_LINES  = 4                 # header lines before the points
+BDT_LINE_MIN      = 7                 # shorter lines are incomplete
+BDT_STAMP_TIME    = "server time"
+BDT_STAMP_DELAY   = "delay time"
+BDT_STAMP_FREQ    = "accelometer ODR"
+
+#############################################
+# value of a "name: value" header line, 'unknown' if not the one named
+#
+def stamp(header, target):
+    if header.find(target) != -1:
+        idx = header.find(':')
+        if idx >= len(target):
+            return header[idx+1:].strip()
+    return 'unknown'
+
+#############################################
+# spectrum of BDT text; x in Hz, y amplitude, t and f stamps of its header
+# returns None if no sampling frequency or no points
+#
+def spectrum(text):
+    lines = text.split('\n')
+    if len(lines) <= BDT_HEADER_LINES:
+        return None
+    time_stamp = stamp(lines[0], BDT_STAMP_TIME) + '+' + stamp(lines[1], BDT_STAMP_DELAY)
+    freq_stamp = stamp(lines[2], BDT_STAMP_FREQ)
+    try:
+        sampling_frequency = float(''.join([c for c in freq_stamp if c in '0123456789.']))
+    except ValueError:
+        return None
+    amplitude = []
+    for row in lines[BDT_HEADER_LINES:]:
+        if len(amplitude) >= BDT_POINT_LIMIT or row.find('End') != -1:
+            break
+        if len(row) < BDT_LINE_MIN:
+            continue
+        try:
+            col = row.split(',')
+            amplitude.append(abs(float(col[2])) + abs(float(col[3])) + abs(float(col[4])))
+        except (IndexError, ValueError):
+            continue
+    n = len(amplitude)
+    if n < 4 or sampling_frequency <= 0.:
+        return None
+    # real part of each bin as the servers take it
+    fourier_transform = np.abs(np.real(np.fft.fft(np.array(amplitude)) / n))[1 : n // 2]
+    frequencies = np.arange(1, n // 2) / (n / sampling_frequency)
+    return { 'x': frequencies.tolist(), 'y': fourier_transform.tolist(), 't': time_stamp, 'f': freq_stamp, 'm': 'Fourier Transform' }
+#
+#############################################
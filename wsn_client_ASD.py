@@ -12,15 +12,28 @@ by Inho Byun, Researcher/KAIST
    inho.byun@gmail.com
                     syarted 2021-01-07;
                     updated 2021-08-03; updated port #
+                    updated 2026-10-18; length-prefixed framed messages
+                    updated 2026-10-18; every command replied with its correlation id
+                    updated 2026-10-18; BDT data by offset/size chunks for windowed transfer
+                    updated 2026-10-18; control and bulk data channels, control handled first
+                    updated 2026-10-18; heartbeat reply, reconnect on dead server, HTTP polling removed
+                    updated 2026-10-18; hello registration on connect, 3'rd argument as device id
+                    updated 2026-10-18; zlib compressed BDT data if server accepts
+                    updated 2026-10-18; BDT data addressed by capture id, acknowledged, kept till completed
+                    updated 2026-10-18; "unix:path" as 1'st argument for AF_UNIX socket of co-located server
 """
 import asyncio
+import collections
 ## from bluepy.btle import Scanner, DefaultDelegate, UUID, Peripheral
 import datetime
+import json
 import socket
 import struct
 import sys
 import time
-from urllib import request, parse
+import zlib
+
+import wsn_protocol as PROTO
 
 import wsn_ADS1256 as ADS1256
 import RPi.GPIO as GPIO
@@ -49,6 +62,8 @@ gBDTdata      = []
 gBDTtextBlock = ''
 gBDTtextLen   = 0
 gBDTtextPos   = 0
+gBDTcapId     = ''   # capture id of the text block; server addresses chunks with
+gBDTackPos    = 0    # text block offset server acknowledged; resumed from on reconnect
 gBDTisRolled  = False
 # IDLE
 gIDLElastTime = 0.    # last BLE traffic on connection
@@ -65,19 +80,24 @@ gIDLElastTime = 0.    # last BLE traffic on connection
 ##TCP_HOST_NAME = "192.168.0.3"     # TEST Host Name
 TCP_HOST_NAME   = "125.131.73.31"   # Default Host Name
 TCP_PORT        = 8082              # Default TCP Port Name
-TCP_HTTP_PORT   = 8081              # flask WEB server port
-##TCP_HTTP_PORT   = 5000            # origin flask WEB server port
-TCP_PACKET_MAX  = 4096              # max TCP packet size
-TCP_POLL_TIME   = 300.              # max time interval to poll TCP port
+TCP_UNIX_PREFIX = 'unix:'           # host name prefix of AF_UNIX socket path; server on the same machine
+TCP_DEV_ID      = socket.gethostname() + '-ASD'  # device id to register; unique on the server
+TCP_DEV_SENSOR  = 'ASD'               # sensor type to register
+TCP_DEV_CAPS    = ['BDT', 'BDT_CHUNK', 'BULK']  # capabilities to register
+TCP_DEAD_TIME   = 20.               # time period of silence to reconnect server; server pings every 5 sec
+TCP_RECONNECT_TIME = 3.             # time interval to retry connecting server
+TCP_ZLIB_LEVEL  = 6                 # zlib level to compress BDT data; 0 not to compress
+TCP_RX_POLL_TIME = 0.001            # time period to take frames arrived while busy
 #
 TCP_DEV_READY_MSG = 'DEV_READY'     # server message to check client ready
-TCP_DEV_OPEN_MSG  = 'DEV_OPEN'      # server message to connect client
 TCP_DEV_CLOSE_MSG = 'DEV_CLOSE'     # server message to disconnect client
 TCP_STE_START_MSG = 'STE_START'     # server message to start STE for monitoring
 TCP_STE_STOP_MSG  = 'STE_STOP'      # server message to stop STE
 TCP_STE_REQ_MSG   = 'STE_REQ'       # server message to request a STE result data 
 TCP_BDT_RUN_MSG   = 'BDT_RUN'       # server message to run BDT advanced STE /w memory write
-TCP_BDT_REQ_MSG   = 'BDT_REQ'       # server message to request BDT data
+TCP_BDT_REQ_MSG   = 'BDT_REQ'       # server message to request BDT data; 'BDT_REQ offset size id' for a chunk
+TCP_BDT_INFO_MSG  = 'BDT_INFO'      # server message to request BDT data length and capture id
+TCP_BDT_ACK_MSG   = 'BDT_ACK'       # server message to acknowledge BDT data; 'BDT_ACK id offset'
 TCP_BDT_END_MSG   = 'BDT_END'       # client message to inform BDT data transfer completed
 #
 # global variables
@@ -87,106 +107,64 @@ gTCPreader   = None
 gTCPwriter   = None
 gTCPrxMsg    = None
 gTCPtxMsg    = None
-gTCPrxNull   = 0
-
-#############################################
-# polling flask server via HTTP
-#############################################
-#
-def http_polling(pol_msg = TCP_DEV_READY_MSG):
-    global gTCPreader
-    global gTCPwriter
-    global TCP_HOST_NAME
-    global TCP_PORT
-    global TCP_HTTP_PORT
-    #
-    print('----->\nWSN-C> HTTP polling try => ', end='', flush=True)
-    url_str = 'http://%s:%s/get_polling/%s' % (TCP_HOST_NAME, TCP_HTTP_PORT, pol_msg)
-    rtn_str = ''
-    try: 
-        f = request.urlopen(url_str)
-        print('sent => ',  end='', flush=True)
-        rtn_str = f.read().decode()
-        f.close()
-    except:
-        print('error !\n----->')
-        sys.exit(-1)
-    else:
-        print('"%r" received\n----->' % rtn_str)
-    
-    return rtn_str
+gTCPtxType   = PROTO.FRAME_CMD
+gTCPrxId     = 0     # correlation id of the command received; its reply carries the same
+gTCPrxFlags  = 0     # channel of the command received; its reply goes on the same
+gTCPctlQueue  = collections.deque()  # control commands received; handled first
+gTCPbulkQueue = collections.deque()  # bulk channel commands received
+gTCPbulkOut   = collections.deque()  # bulk reply fragments to send; one per loop
+gTCPzlib      = False                # server accepted zlib compressed data replies
 
 #############################################
-# send & receive via http port of flask server
+# connect server and register by hello; retry till welcomed
 #############################################
 #
-async def http_TX(tx_msg, loop):
+async def tcp_open(loop):
+    global gTCPlastTime
     global gTCPreader
     global gTCPwriter
+    global gTCPzlib
     #
-    print('----->\nAIO-C> connecting http server to write & read ... ', end ='', flush=True)
-    try:
-        reader, writer = await asyncio.open_connection(TCP_HOST_NAME, TCP_HTTP_PORT)
-    except asyncio.TimeoutError:
-        print('timeout !\n----->', flush=True)
-    except:
-        print('error !\n----->', flush=True)
-        sys.exit(-1)
-    else:    
-        print('connected\n----->', flush=True)
-        # send 'GET /get_polling/%s HTTP/1.1'
-        tx_data = ('GET /get_polling/%s HTTP/1.1' % tx_msg).encode('ascii')
-        # send GET
-        print('AIO-C> [HTTP TX] try => ', end = '', flush=True) 
-        try:        
-            writer.write(tx_data)
-            await asyncio.wait_for ( writer.drain(), timeout=3.0 )
-        except asyncio.TimeoutError:
-            print('timeout !', flush=True)
-        except:
-            print('error !', flush=True)
-            sys.exit(-1)
+    if gTCPwriter != None:
+        gTCPwriter.close()
+        gTCPwriter = gTCPreader = None
+    gTCPctlQueue.clear()
+    gTCPbulkQueue.clear()
+    gTCPbulkOut.clear()
+    while gTCPwriter == None:
+        unix_path = TCP_HOST_NAME[len(TCP_UNIX_PREFIX):] if TCP_HOST_NAME.startswith(TCP_UNIX_PREFIX) else ''
+        if unix_path != '':
+            print('AIO-C> connecting to server %s => ' % TCP_HOST_NAME, end='', flush=True)
+            # no network to save on local socket; compression only costs CPU
+            caps = list(TCP_DEV_CAPS)
         else:
-            print('"%r" sent' % tx_msg, flush=True)
-        # connect server
-        ## rx_corout = asyncio.wait_for ( reader.read(TCP_PACKET_MAX), timeout=3.0 )
-        if tx_msg == TCP_DEV_OPEN_MSG:
-            print('AIO-C> connecting to server => ',  end='', flush=True)
+            print('AIO-C> connecting to server %s:%d => ' % (TCP_HOST_NAME, TCP_PORT), end='', flush=True)
+            caps = TCP_DEV_CAPS + ([PROTO.CAP_ZLIB] if TCP_ZLIB_LEVEL > 0 else [])
+        hello = { 'dev' : TCP_DEV_ID, 'sensor' : TCP_DEV_SENSOR, 'caps' : caps }
+        if gBDTisRolled and gBDTcapId != '':
+            # capture not transferred completely; server resumes from acknowledged offset
+            hello['capture'] = { 'id' : gBDTcapId, 'length' : gBDTtextLen, 'acked' : gBDTackPos }
+        try:    
+            if unix_path != '':
+                gTCPreader, gTCPwriter = await asyncio.wait_for( asyncio.open_unix_connection(unix_path), timeout=10.0 )
+            else:
+                gTCPreader, gTCPwriter = await asyncio.wait_for( asyncio.open_connection(TCP_HOST_NAME, TCP_PORT), timeout=10.0 )
+            gTCPwriter.write( PROTO.pack_frame(PROTO.FRAME_HELLO, json.dumps(hello)) )
+            await asyncio.wait_for ( gTCPwriter.drain(), timeout=10.0 )
+            ftype, flags, rx_id, rx_data = await PROTO.read_frame ( gTCPreader, timeout=10.0 )
+            if ftype != PROTO.FRAME_WELCOME:
+                raise ValueError('frame type %d instead of welcome' % ftype)
+            welcome = json.loads(rx_data)
+        except Exception as e:
+            print('error "%r", retry after %d sec...' % (e, TCP_RECONNECT_TIME), flush=True)
             if gTCPwriter != None:
                 gTCPwriter.close()
-                gTCPwriter = None
-            try:    
-                gTCPreader, gTCPwriter = await asyncio.open_connection(TCP_HOST_NAME, TCP_PORT)
-            except asyncio.TimeoutError:
-                print('timeout !', flush=True)
-            except:
-                print('error !', flush=True)
-                sys.exit(-1)
-            else:    
-                print('connected', flush=True)
-        # receive
-        '''
-        print('AIO-C> [HTTP RX] wait => ', end = '', flush=True)    
-        rx_msg = ''
-        rx_data = None
-        try:
-            rx_data = await asyncio.wait_for ( reader.read(TCP_PACKET_MAX), timeout=3.0 )
-            ## rx_data = await rx_corout
-        except asyncio.TimeoutError:
-            print('timeout', flush=True)
-        except:
-            print('error !', flush=True)
-            sys.exit(-1)
-        else:
-            if rx_data != None:
-                rx_msg = rx_data.decode()
-            if rx_msg == '':
-                print('null received', flush=True)
-            else:
-                print('"%r" received' % rx_msg, flush=True)
-        '''      
-        #
-        writer.close()        
+                gTCPwriter = gTCPreader = None
+            await asyncio.sleep(TCP_RECONNECT_TIME)
+        else:    
+            gTCPzlib = PROTO.CAP_ZLIB in welcome.get('caps', [])
+            print('registered as [%s], caps %r' % (welcome.get('dev'), welcome.get('caps', [])), flush=True)
+    gTCPlastTime = time.time()
 
 #############################################
 # handle to receive command message
@@ -195,44 +173,81 @@ async def http_TX(tx_msg, loop):
 async def tcp_RX(loop):
     global gTCPlastTime
     global gTCPrxMsg
+    global gTCPrxId
+    global gTCPrxFlags
     global gTCPreader
     global gTCPwriter
-    global gTCPrxNull
     #
     if ( gTCPwriter != None ):
     #
-        rx_data = None
-        print('AIO-C> [RX] wait => ', end = '', flush=True)    
-        try:
-            rx_data = await asyncio.wait_for ( gTCPreader.read(TCP_PACKET_MAX), timeout=10.0 )
-        except asyncio.TimeoutError:
-            print('timeout', flush=True)
-            print ("\33[2A", flush=True)
-        except ConnectionResetError:
-            print('connection error !', flush=True)
-            gTCPwriter = gTCPreader = None
-        except:
-            print('unknown error !', flush=True)
-            sys.exit(-1)
+        # wait a frame only if nothing to do, then take all frames arrived
+        if gTCPctlQueue or gTCPbulkQueue or gTCPbulkOut:
+            timeout = TCP_RX_POLL_TIME
         else:
-            if rx_data != None:
-                gTCPrxMsg = rx_data.decode()
-            else:
-                gTCPrxNull += 1
-            if gTCPrxMsg == '':
-                gTCPrxNull += 1
-                print('null received: %d times' % gTCPrxNull, flush=True)
-                time.sleep(1.)
+            print('AIO-C> [RX] wait => ', end = '', flush=True)    
+            timeout = 10.0
+        waited = timeout != TCP_RX_POLL_TIME
+        while True:
+            try:
+                ftype, flags, rx_id, rx_data = await PROTO.read_frame ( gTCPreader, timeout=timeout )
+            except asyncio.IncompleteReadError:
+                # connection closed by server
+                print('closed by server !', flush=True)
+                gTCPwriter.close()
+                gTCPwriter = gTCPreader = None
+                return
+            except asyncio.TimeoutError:
+                if timeout != TCP_RX_POLL_TIME:
+                    print('timeout', flush=True)
+                    print ("\33[2A", flush=True)
+                break
+            except ConnectionResetError:
+                print('connection error !', flush=True)
+                gTCPwriter = gTCPreader = None
+                return
+            except:
+                print('unknown error !', flush=True)
+                sys.exit(-1)
             else:
-                gTCPrxNull = 0
-                print('"%r" received' % gTCPrxMsg, flush=True)
-            gTCPlastTime = time.time()     
+                gTCPlastTime = time.time()     
+                timeout = TCP_RX_POLL_TIME
+                if ftype == PROTO.FRAME_PING:
+                    # heartbeat replied at once, not queued behind commands
+                    gTCPwriter.write( PROTO.pack_frame(PROTO.FRAME_PONG, rx_data, rx_id) )
+                    continue
+                if flags & PROTO.FLAG_BULK:
+                    gTCPbulkQueue.append( (rx_id, flags, rx_data.decode()) )
+                else:
+                    gTCPctlQueue.append( (rx_id, flags, rx_data.decode()) )
+        # control commands go ahead of bulk commands
+        if gTCPctlQueue:
+            gTCPrxId, gTCPrxFlags, gTCPrxMsg = gTCPctlQueue.popleft()
+        elif gTCPbulkQueue:
+            gTCPrxId, gTCPrxFlags, gTCPrxMsg = gTCPbulkQueue.popleft()
+        else:
+            return
+        if waited:
+            print('"%r" received' % gTCPrxMsg, flush=True)
+        else:
+            print('AIO-C> [RX] "%r" received' % gTCPrxMsg, flush=True)
     
+#############################################
+# compress a data reply; ratio and CPU time logged
+#
+def tcp_zlib(tx_msg):
+    raw = tx_msg.encode()
+    cpu_time = time.process_time()
+    rtn = zlib.compress(raw, TCP_ZLIB_LEVEL)
+    cpu_time = time.process_time() - cpu_time
+    print('AIO-C> [ZLIB] %d => %d bytes (%.1f%%), %.1f ms' %
+          (len(raw), len(rtn), len(rtn) * 100. / max(len(raw), 1), cpu_time * 1000.), flush=True)
+    return rtn
+
 #############################################
 # handle to send data
 #############################################
 #
-async def tcp_TX(tx_msg, loop):
+async def tcp_TX(tx_msg, loop, tx_type = PROTO.FRAME_CMD, tx_id = 0, tx_flags = 0):
     global gTCPlastTime
     global gTCPrxMsg
     global gTCPreader
@@ -240,9 +255,17 @@ async def tcp_TX(tx_msg, loop):
     #
     if ( gTCPwriter != None ):
     #
-        if tx_msg != None and tx_msg != '':
+        # data reply compressed if server accepts
+        tx_payload = tx_msg
+        if tx_type == PROTO.FRAME_DATA and gTCPzlib and tx_msg != None and tx_msg != '':
+            tx_payload = tcp_zlib(tx_msg)
+            tx_flags |= PROTO.FLAG_ZLIB
+        if tx_msg != None and tx_msg != '' and (tx_flags & PROTO.FLAG_BULK):
+            # bulk reply is sent fragment by fragment between control replies
+            gTCPbulkOut.extend( PROTO.pack_frames(tx_type, tx_payload, tx_id, tx_flags) )
+        elif tx_msg != None and tx_msg != '':
             print('AIO-C> [TX] try => ', end = '', flush=True)        
-            tx_data = tx_msg.encode()
+            tx_data = PROTO.pack_frame(tx_type, tx_payload, tx_id, tx_flags)
             try:        
                 gTCPwriter.write(tx_data)
                 await asyncio.wait_for ( gTCPwriter.drain(), timeout=10.0 )
@@ -265,10 +288,31 @@ async def tcp_TX(tx_msg, loop):
                     print('"%r"...; %d bytes sent' % (txt, n), flush=True)
                 '''    
                 print('sent', flush=True)
-                gTCPlastTime = time.time()        
         else:
             print('AIO-C> [TX] nothing to send !', flush=True)    
 
+#############################################
+# send a fragment of bulk replies queued
+#
+async def tcp_TX_bulk(loop):
+    global gTCPlastTime
+    global gTCPreader
+    global gTCPwriter
+    #
+    if ( gTCPwriter != None and gTCPbulkOut ):
+        try:        
+            gTCPwriter.write( gTCPbulkOut.popleft() )
+            await asyncio.wait_for ( gTCPwriter.drain(), timeout=10.0 )
+        except asyncio.TimeoutError:
+            print('AIO-C> [TX] bulk timeout !', flush=True)
+        except ConnectionResetError:
+            print('AIO-C> [TX] bulk connection error !', flush=True)
+            gTCPwriter = gTCPreader = None
+            gTCPbulkOut.clear()
+        except:
+            print('AIO-C> [TX] bulk unknown error !', flush=True)
+            sys.exit(-1)
+
 #############################################
 # functions definition
 #############################################
@@ -383,26 +427,22 @@ def ASD_BDT_text_block(isZon = True):
 #############################################
 # create text memory block from BDT w/o non-data
 #
-def ASD_BDT_get_text(returnMax = TCP_PACKET_MAX):
+def ASD_BDT_get_text(offset = None, size = None):
     global gBDTtextBlock
     global gBDTtextLen
     global gBDTtextPos
 
+    # chunk at offset; server keeps several chunk requests in flight
+    if offset != None:
+        gBDTtextPos = min(offset + size, gBDTtextLen)
+        return gBDTtextBlock[offset:gBDTtextPos]
+    # whole text block goes as one framed message, ends with 'End of Data'
     if gBDTtextPos >= gBDTtextLen:
         rtn = 'End of Data\n'
-        gBDTtextPos = idx = 0
+        gBDTtextPos = 0
     else:
-        idx = gBDTtextPos + returnMax    
-        if idx > gBDTtextLen:
-            idx = gBDTtextLen
-        while ( gBDTtextBlock[idx-1:idx] != '\n' ) and ( idx > gBDTtextPos ):
-            idx -= 1
-        if idx > gBDTtextPos:
-            rtn = gBDTtextBlock[gBDTtextPos:idx+1]
-            gBDTtextPos = idx + 1
-        else:
-            rtn = ''
-            gBDTtextPos += 1
+        rtn = gBDTtextBlock[gBDTtextPos:]
+        gBDTtextPos = gBDTtextLen
     #        
     return rtn    
 
@@ -412,17 +452,21 @@ def ASD_BDT_get_text(returnMax = TCP_PACKET_MAX):
 def server_msg_handling():
     global gTCPrxMsg
     global gTCPtxMsg
+    global gTCPtxType
     global gSTElastTime
     global gSTEisRolling
     global gBDTisRolled
     global gBDTtextPos
+    global gBDTcapId
+    global gBDTackPos
     global gIDLElastTime
 
     # message handling
-    if gTCPrxMsg == TCP_DEV_READY_MSG or gTCPrxMsg == TCP_DEV_OPEN_MSG:
+    if gTCPrxMsg == TCP_DEV_READY_MSG:
         # polling messages that server or manually sent
         print ("WSN-C> got polling [%s] ..." % gTCPrxMsg, flush=True)
         # polling reponse here
+        gTCPtxMsg = gTCPrxMsg
     elif gTCPrxMsg == TCP_BDT_END_MSG:
         # polling message that server sent, should echo-back
         print ("WSN-C> got polling [%s], echo-back..." % TCP_BDT_END_MSG, flush=True)
@@ -430,12 +474,17 @@ def server_msg_handling():
     elif gTCPrxMsg == TCP_STE_START_MSG:
         # start STE rolling w/o memory writing
         print ("WSN-C> start STE rolling...", flush=True)
+        gTCPtxMsg = TCP_STE_START_MSG
     elif gTCPrxMsg == TCP_STE_REQ_MSG:
         # request STE data
         if gSTEisRolling:
             print ("WSN-C> handover STE data ...", flush=True)
+            gTCPtxMsg = 'STE data is not supported'
+            gTCPtxType = PROTO.FRAME_NAK
         else:
             print ("WSN-C> invalid message, STE has not been started !", flush=True)    
+            gTCPtxMsg = 'STE has not been started'
+            gTCPtxType = PROTO.FRAME_NAK
     elif gTCPrxMsg == TCP_BDT_RUN_MSG:
         # start BDT
         print ("WSN-C> BDT running => ", end='', flush=True)
@@ -443,25 +492,63 @@ def server_msg_handling():
         ASD_BDT_text_block(False)
         gBDTisRolled = True
         gBDTtextPos = 0
+        gBDTcapId = '%d' % int(time.time() * 1000.)
+        gBDTackPos = 0
         print ('completed', flush=True)
-    elif gTCPrxMsg == TCP_BDT_REQ_MSG:
-        # request BDT data
+        gTCPtxMsg = TCP_BDT_RUN_MSG
+    elif gTCPrxMsg == TCP_BDT_INFO_MSG:
+        # request BDT data length and capture id
         if gBDTisRolled:
-            print ("WSN-C> request BDT data ...", flush=True)
-            gTCPtxMsg = ASD_BDT_get_text(TCP_PACKET_MAX) ## send bigger than TCP_PACKET_MAX
-            if gTCPtxMsg.find("End") != -1:
-                gBDTisRolled = False
+            print ("WSN-C> BDT data length [%d] of capture [%s] ..." % (gBDTtextLen, gBDTcapId), flush=True)
+            gTCPtxMsg = '%d %s' % (gBDTtextLen, gBDTcapId)
         else:
             print ("WSN-C> invalid message, BDT has not been done !", flush=True)    
+            gTCPtxMsg = 'BDT has not been done'
+            gTCPtxType = PROTO.FRAME_NAK
+    elif gTCPrxMsg != None and gTCPrxMsg.startswith(TCP_BDT_REQ_MSG):
+        # request BDT data; whole block or a chunk of 'BDT_REQ offset size id'
+        args = gTCPrxMsg.split()
+        if gBDTisRolled and len(args) == 4 and args[3] != gBDTcapId:
+            print ("WSN-C> invalid message, capture [%s] not found !" % args[3], flush=True)    
+            gTCPtxMsg = 'capture not found'
+            gTCPtxType = PROTO.FRAME_NAK
+        elif gBDTisRolled:
+            if len(args) == 4:
+                gTCPtxMsg = ASD_BDT_get_text(int(args[1]), int(args[2]))
+            else:
+                print ("WSN-C> request BDT data ...", flush=True)
+                gTCPtxMsg = ASD_BDT_get_text()
+                if gTCPtxMsg.find("End") != -1:
+                    gBDTisRolled = False
+            gTCPtxType = PROTO.FRAME_DATA
+        else:
+            print ("WSN-C> invalid message, BDT has not been done !", flush=True)    
+            gTCPtxMsg = 'BDT has not been done'
+            gTCPtxType = PROTO.FRAME_NAK
+    elif gTCPrxMsg != None and gTCPrxMsg.startswith(TCP_BDT_ACK_MSG):
+        # server got BDT data till offset; capture released when all acknowledged
+        args = gTCPrxMsg.split()
+        if gBDTisRolled and len(args) == 3 and args[1] == gBDTcapId:
+            gBDTackPos = max(gBDTackPos, int(args[2]))
+            if gBDTackPos >= gBDTtextLen:
+                print ("WSN-C> capture [%s] transfer completed" % gBDTcapId, flush=True)
+                gBDTisRolled = False
+            gTCPtxMsg = gTCPrxMsg
+        else:
+            gTCPtxMsg = 'capture not found'
+            gTCPtxType = PROTO.FRAME_NAK
     elif gTCPrxMsg == TCP_STE_STOP_MSG or gTCPrxMsg == TCP_DEV_CLOSE_MSG:
         # stop STE or disconnect
         print ("WSN-C> stop STE rolling ...", flush=True)
+        gTCPtxMsg = gTCPrxMsg
     elif gTCPrxMsg == TCP_DEV_CLOSE_MSG:
         # exit from loop
         print ("WSN-C> close device ...", flush=True)
     elif gTCPrxMsg != None:
         # invalid message
         print ('WSN-C> invalid [RX] message: "%r" !' % gTCPrxMsg, flush=True)    
+        gTCPtxMsg = 'invalid message'
+        gTCPtxType = PROTO.FRAME_NAK
     #
     return
 #
@@ -473,14 +560,14 @@ def server_msg_handling():
 # Main starts here
 #
 if len(sys.argv) > 1:
-    print ("WSN-C> take 1'st argument as Host IP address (default: '%s')" % TCP_HOST_NAME, flush=True)
+    print ("WSN-C> take 1'st argument as Host IP address or 'unix:path' (default: '%s')" % TCP_HOST_NAME, flush=True)
     TCP_HOST_NAME = sys.argv[1]
 if len(sys.argv) > 2:
     print ("WSN-C> take 2'nd argument as tcp port# (default: '%d')" % TCP_PORT, flush=True)
     TCP_PORT = int(sys.argv[2])
 if len(sys.argv) > 3:
-    print ("WSN-C> take 3'rd argument as http port# (default: '%d')" % TCP_HTTP_PORT, flush=True)
-    TCP_HTTP_PORT = int(sys.argv[3])
+    print ("WSN-C> take 3'rd argument as device id (default: '%s')" % TCP_DEV_ID, flush=True)
+    TCP_DEV_ID = sys.argv[3]
 
 #
 # ASD init
@@ -496,7 +583,7 @@ except Exception as e:
 # connect server
 #
 loop = asyncio.get_event_loop()
-loop.run_until_complete( http_TX(TCP_DEV_OPEN_MSG, loop) )
+loop.run_until_complete( tcp_open(loop) )
 #############################################
 #
 # loop if not TCP_DEV_CLOSE_MSG 
@@ -504,22 +591,30 @@ loop.run_until_complete( http_TX(TCP_DEV_OPEN_MSG, loop) )
 gTCPlastTime = time.time()
 while gTCPrxMsg != TCP_DEV_CLOSE_MSG:
     #
-    # if too many null messages
-    #
-    if gTCPrxNull > 3:
-            print ("WSN-C> too many null received, exiting !", flush=True)
-            break
-    #
     # if any messae to send
     #
     if gTCPtxMsg != None:
-        loop.run_until_complete( tcp_TX(gTCPtxMsg, loop) )
+        loop.run_until_complete( tcp_TX(gTCPtxMsg, loop, gTCPtxType, gTCPrxId, gTCPrxFlags & PROTO.FLAG_BULK) )
+    #
+    # send a bulk fragment if any; control replies go between fragments
+    #
+    if gTCPbulkOut:
+        loop.run_until_complete( tcp_TX_bulk(loop) )
     #
     # wait any message from server
     #
     gTCPtxMsg = gTCPrxMsg = None
+    gTCPtxType = PROTO.FRAME_CMD
+    gTCPrxFlags = 0
     loop.run_until_complete( tcp_RX(loop) )
     #
+    # reconnect if server connection lost or server silent too long
+    #
+    if gTCPwriter == None or time.time() - gTCPlastTime > TCP_DEAD_TIME:
+        print ("WSN-C> server connection lost, reconnecting ...", flush=True)
+        loop.run_until_complete( tcp_open(loop) )
+        continue
+    #
     # does message handling
     #
     try:
@@ -527,12 +622,6 @@ while gTCPrxMsg != TCP_DEV_CLOSE_MSG:
     except Exception as e:
         print ('WSN-S> error "%r" while message loop ... exit ...' % (e), flush=True)
         break
-    #
-    # if last server communication time is longer than poll time, polling via http
-    #
-    if time.time() - gTCPlastTime > TCP_POLL_TIME:
-            http_polling()
-            ## loop.run_until_complete( http_TX(TCP_DEV_READY_MSG, loop) )
 #
 #############################################
 
@@ -0,0 +1,440 @@
+"""
+simulated WSN client fleet for server scale testing; real framed protocol, no BLE or SPI hardware
+coded functions as below
+- fleet mode; hundreds of simulated wsn_client_SCD/wsn_client_ASD devices in one asyncio loop
+    hello/welcome registration, heartbeat echoed, reconnect on drop
+    STE_REQ answered with synthetic SCD_string_STE_data rows; ASD refuses as the real one
+    STE_START pushes synthetic STE samples by UDP if server accepts
+    BDT_RUN makes a synthetic capture of capture time x ODR rows in the client's text format
+    BDT_INFO, BDT_REQ chunks and BDT_ACK served as the real clients do, zlib compressed if accepted
+- bench mode; gateway opened in this process, fleet grown step by step in a child process
+    each step drives STE_REQ from worker threads as flask threads do, a capture pulled on some devices
+    reports command throughput, latency percentiles, BDT throughput, heartbeat RTT and gateway memory
+
+usage: python wsn_fleet_sim.py fleet host[:port] count [SCD|ASD] [capture sec] [ODR] [first index]
+       python wsn_fleet_sim.py bench [counts e.g. 10,50,100,200,500] [SCD|ASD] [capture sec] [ODR]
+
+                    started 2026-10-18
+"""
+import asyncio
+import datetime
+import json
+import math
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+import zlib
+
+import wsn_protocol as PROTO
+
+#############################################
+# target definitions to simulation
+#############################################
+#
+SIM_HOST_NAME     = '127.0.0.1'       # server to connect in fleet mode
+SIM_PORT          = 8082              # server port to connect in fleet mode
+SIM_BENCH_PORT    = 8092              # gateway port opened in bench mode
+SIM_SENSOR        = 'SCD'             # sensor type of simulated devices
+SIM_CAPTURE_TIME  = 3.3               # capture time in seconds of a BDT run; STE_RUN_TIME of the client
+SIM_ODR           = 1600              # capture rows per second
+SIM_BDT_RUN_TIME  = 1.                # time period a BDT run takes on a simulated device
+SIM_SAMPLE_INTERVAL = 1.              # time interval of STE samples pushed by UDP while rolling
+SIM_RECONNECT_TIME = 3.               # time interval to retry connecting server
+SIM_CONNECT_RATE  = 200               # devices started per second; no connection storm
+SIM_ZLIB_LEVEL    = 6                 # zlib level to compress BDT data; 0 not to compress
+SIM_FIFO_ROWS     = 96                # SCD capture rows per FIFO block; time stamp on the first one
+#
+SIM_BENCH_COUNTS  = [10, 50, 100, 200, 500]  # device counts of bench steps
+SIM_STEP_TIME     = 10.               # time period to drive load on a bench step
+SIM_WORKERS       = 8                 # worker threads sending commands on a bench step; flask threads
+SIM_BDT_DEVICES   = 2                 # devices pulling a capture on a bench step
+SIM_REGISTER_WAIT_TIME = 60.          # time period to wait the fleet registered on a bench step
+#
+TCP_DEV_READY_MSG = 'DEV_READY'
+TCP_DEV_CLOSE_MSG = 'DEV_CLOSE'
+TCP_STE_START_MSG = 'STE_START'
+TCP_STE_STOP_MSG  = 'STE_STOP'
+TCP_STE_REQ_MSG   = 'STE_REQ'
+TCP_BDT_RUN_MSG   = 'BDT_RUN'
+TCP_BDT_REQ_MSG   = 'BDT_REQ'
+TCP_BDT_INFO_MSG  = 'BDT_INFO'
+TCP_BDT_ACK_MSG   = 'BDT_ACK'
+TCP_BDT_END_MSG   = 'BDT_END'
+#
+WSN_STAMP_TIME    = "server time"
+WSN_STAMP_DELAY   = "delay time"
+WSN_STAMP_FREQ    = "accelometer ODR"
+#
+# global variables
+#
+gCaptures   = {}    # synthetic capture text keyed by sensor, rows; shared by devices
+gFleetStats = { 'connects' : 0, 'commands' : 0, 'samples' : 0, 'tx_bytes' : 0 }
+
+#############################################
+#############################################
+#
+# synthetic sensor data
+#
+#############################################
+# STE row as SCD_string_STE_data makes
+#
+def synthetic_STE_row(t, idx):
+    wave = math.sin(t * 2. * math.pi / 60. + idx)
+    return ( "(%s [%.3f]," % (datetime.datetime.fromtimestamp(t).strftime('%Y-%m-%d %H:%M:%S'), t) +
+             "%.1f,%.2f,%.1f,%.2f,%.1f,%.2f," % (wave * 2., 0.5 + random.random() * 0.1, -wave, 0.4 + random.random() * 0.1,
+                                                   1000. + wave, 0.6 + random.random() * 0.1) +
+             "%.2f,%.3f,%.1f,%.1f,%.1f)" % (25. + wave, 120. + wave * 10., 30. + wave, -12., 40.) )
+
+#############################################
+# capture text block as SCD_BDT_text_block or ASD_BDT_text_block makes
+# shared by devices of the same sensor and size
+#
+def synthetic_capture(sensor, capture_time, odr):
+    rows = int(capture_time * odr)
+    key = (sensor, rows)
+    text = gCaptures.get(key)
+    if text != None:
+        return text
+    t = time.time()
+    block = [ "%s: %s(%d)\n" % (WSN_STAMP_TIME, datetime.datetime.fromtimestamp(t).strftime('%Y-%m-%d %H:%M:%S'), int(t)),
+              "%s: %.3f\n" % (WSN_STAMP_DELAY, 0.),
+              "%s: %d Hz\n" % (WSN_STAMP_FREQ, odr),
+              "Row #, Time-Stamp, X-AXIS, Y-AXIS, Z-AXIS\n" ]
+    for n in range(rows):
+        x = math.sin(n * 2. * math.pi * 50. / odr) + random.gauss(0., 0.05)
+        y = math.sin(n * 2. * math.pi * 120. / odr) * 0.5 + random.gauss(0., 0.05)
+        z = 1. + random.gauss(0., 0.05)
+        if sensor == 'ASD':
+            block.append( "%d,%.5f,%.5f,%.5f,%.5f\n" % (n + 1, float(n) / odr, x, y, z) )
+        elif n % SIM_FIFO_ROWS == 0:
+            block.append( "%d,%.5f,%.1f,%.1f,%.1f\n" % (n + 1, float(n) / odr, x * 10., y * 10., z * 10.) )
+        else:
+            block.append( "%d,,%.1f,%.1f,%.1f\n" % (n + 1, x * 10., y * 10., z * 10.) )
+    block.append("End of Data\n")
+    text = ''.join(block)
+    gCaptures[key] = text
+    return text
+
+#############################################
+#############################################
+#
+# simulated device
+#
+#############################################
+class SimDevice:
+
+    def __init__(self, dev_id, sensor, capture_time, odr):
+        self.dev_id       = dev_id
+        self.sensor       = sensor
+        self.capture_time = capture_time
+        self.odr          = odr
+        self.text         = ''      # capture text; '' if no capture
+        self.cap_id       = ''
+        self.acked        = 0
+        self.rolling      = False
+        self.zlib         = False
+        self.udp_addr     = None
+        self.udp_seq      = 0
+        self.writer       = None
+
+    def hello(self):
+        caps = ['STE', 'BDT', 'BDT_CHUNK', 'BULK'] + ([PROTO.CAP_ZLIB] if SIM_ZLIB_LEVEL > 0 else [])
+        caps += [PROTO.CAP_UDP] if self.sensor == 'SCD' else []
+        hello = { 'dev' : self.dev_id, 'sensor' : self.sensor, 'caps' : caps }
+        if self.text != '' and self.acked < len(self.text):
+            hello['capture'] = { 'id' : self.cap_id, 'length' : len(self.text), 'acked' : self.acked }
+        return hello
+
+    # reply of a command; (frame type, message)
+    async def handle(self, msg):
+        args = msg.split()
+        if msg in (TCP_DEV_READY_MSG, TCP_BDT_END_MSG):
+            return PROTO.FRAME_CMD, msg
+        if msg == TCP_STE_START_MSG:
+            self.rolling = True
+            return PROTO.FRAME_CMD, msg
+        if msg in (TCP_STE_STOP_MSG, TCP_DEV_CLOSE_MSG):
+            self.rolling = False
+            return PROTO.FRAME_CMD, msg
+        if msg == TCP_STE_REQ_MSG:
+            if self.sensor != 'SCD':
+                return PROTO.FRAME_NAK, 'STE data is not supported'
+            if not self.rolling:
+                return PROTO.FRAME_NAK, 'STE has not been started'
+            return PROTO.FRAME_CMD, synthetic_STE_row(time.time(), hash(self.dev_id) % 7)
+        if msg == TCP_BDT_RUN_MSG:
+            if self.rolling:
+                return PROTO.FRAME_NAK, 'BDT is not allowed during rolling'
+            await asyncio.sleep(SIM_BDT_RUN_TIME)
+            self.text   = synthetic_capture(self.sensor, self.capture_time, self.odr)
+            self.cap_id = '%d' % int(time.time() * 1000.)
+            self.acked  = 0
+            return PROTO.FRAME_CMD, msg
+        if msg == TCP_BDT_INFO_MSG:
+            if self.text == '':
+                return PROTO.FRAME_NAK, 'BDT has not been done'
+            return PROTO.FRAME_CMD, '%d %s' % (len(self.text), self.cap_id)
+        if len(args) > 0 and args[0] == TCP_BDT_REQ_MSG:
+            if self.text == '':
+                return PROTO.FRAME_NAK, 'BDT has not been done'
+            if len(args) == 4:
+                if args[3] != self.cap_id:
+                    return PROTO.FRAME_NAK, 'capture not found'
+                return PROTO.FRAME_DATA, self.text[int(args[1]):int(args[1])+int(args[2])]
+            return PROTO.FRAME_DATA, self.text
+        if len(args) == 3 and args[0] == TCP_BDT_ACK_MSG:
+            if args[1] != self.cap_id:
+                return PROTO.FRAME_NAK, 'capture not found'
+            self.acked = max(self.acked, int(args[2]))
+            if self.acked >= len(self.text):
+                self.text = ''
+            return PROTO.FRAME_CMD, msg
+        return PROTO.FRAME_NAK, 'invalid message'
+
+    # answer a command; long ones like BDT_RUN do not hold the others
+    async def answer(self, req_id, flags, msg):
+        ftype, reply = await self.handle(msg)
+        tx_flags = flags & PROTO.FLAG_BULK
+        payload = reply.encode()
+        if ftype == PROTO.FRAME_DATA and self.zlib:
+            payload = zlib.compress(payload, SIM_ZLIB_LEVEL)
+            tx_flags |= PROTO.FLAG_ZLIB
+        if self.writer == None:
+            return
+        for frame in PROTO.pack_frames(ftype, payload, req_id, tx_flags):
+            self.writer.write(frame)
+            gFleetStats['tx_bytes'] += len(frame)
+        gFleetStats['commands'] += 1
+        await self.writer.drain()
+
+    # push STE samples while rolling
+    async def push_samples(self):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.setblocking(False)
+        while True:
+            await asyncio.sleep(SIM_SAMPLE_INTERVAL)
+            if self.rolling and self.udp_addr != None:
+                self.udp_seq += 1
+                try:
+                    sock.sendto( PROTO.pack_sample(self.udp_seq, self.dev_id, synthetic_STE_row(time.time(), 0)), self.udp_addr )
+                    gFleetStats['samples'] += 1
+                except OSError:
+                    pass
+
+    # connect, register and serve till dropped; then again
+    async def run(self, host, port):
+        loop = asyncio.get_running_loop()
+        push_task = loop.create_task( self.push_samples() )
+        while True:
+            try:
+                reader, self.writer = await asyncio.wait_for( asyncio.open_connection(host, port), timeout=10. )
+                self.writer.write( PROTO.pack_frame(PROTO.FRAME_HELLO, json.dumps(self.hello())) )
+                ftype, flags, req_id, payload = await PROTO.read_frame(reader, timeout=10.)
+                if ftype != PROTO.FRAME_WELCOME:
+                    raise ValueError('frame type %d instead of welcome' % ftype)
+                welcome = json.loads(payload)
+                self.zlib = PROTO.CAP_ZLIB in welcome.get('caps', [])
+                self.udp_addr = None
+                if PROTO.CAP_UDP in welcome.get('caps', []) and welcome.get('udp', 0) > 0:
+                    self.udp_addr = (host, welcome['udp'])
+                gFleetStats['connects'] += 1
+                while True:
+                    ftype, flags, req_id, payload = await PROTO.read_frame(reader)
+                    if ftype == PROTO.FRAME_PING:
+                        self.writer.write( PROTO.pack_frame(PROTO.FRAME_PONG, payload, req_id) )
+                    elif ftype == PROTO.FRAME_CMD:
+                        loop.create_task( self.answer(req_id, flags, payload.decode()) )
+                        if payload.decode() == TCP_DEV_CLOSE_MSG:
+                            break
+            except asyncio.CancelledError:
+                break
+            except Exception:
+                pass
+            if self.writer != None:
+                self.writer.close()
+                self.writer = None
+            await asyncio.sleep(SIM_RECONNECT_TIME)
+        push_task.cancel()
+
+#############################################
+# run a fleet of simulated devices
+#
+async def fleet_main(host, port, count, sensor, capture_time, odr, first):
+    loop = asyncio.get_running_loop()
+    # capture text made once before devices start
+    synthetic_capture(sensor, capture_time, odr)
+    tasks = []
+    for idx in range(first, first + count):
+        device = SimDevice('sim-%s-%04d' % (sensor, idx), sensor, capture_time, odr)
+        tasks.append( loop.create_task( device.run(host, port) ) )
+        if len(tasks) % SIM_CONNECT_RATE == 0:
+            await asyncio.sleep(1.)
+    print ('SIM> %d %s devices [%04d..%04d] started to %s:%d' % (count, sensor, first, first + count - 1, host, port), flush=True)
+    while True:
+        await asyncio.sleep(10.)
+        print ('SIM> %d connects, %d commands, %d samples, %d bytes sent' %
+               (gFleetStats['connects'], gFleetStats['commands'], gFleetStats['samples'], gFleetStats['tx_bytes']), flush=True)
+
+#############################################
+#############################################
+#
+# bench mode
+#
+#############################################
+# memory in use of this process in KB; '-' if not known
+#
+def memory_rss():
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return '-'
+
+#############################################
+# value at a percentile of sorted values
+#
+def percentile(values, pct):
+    if len(values) == 0:
+        return 0.
+    return values[ min(len(values) - 1, int(len(values) * pct / 100.)) ]
+
+#############################################
+# drive a command on random devices till the end time; as flask threads do
+# gateway called not by command_device not to measure its logging
+#
+def bench_worker(GW, dev_ids, tx_msg, end_time, latencies, errors):
+    while time.time() < end_time:
+        dev_id = random.choice(dev_ids)
+        t = time.time()
+        reply = GW.run_in_gateway(GW.device_request(dev_id, tx_msg, GW.GW_REPLY_WAIT_TIME), GW.GW_REPLY_WAIT_TIME + 1.)
+        if reply == None or reply == '':
+            errors.append(dev_id)
+        else:
+            latencies.append( time.time() - t )
+
+#############################################
+# pull a capture from a device as post_STEandBDT and post_BDTtoServer do
+#
+def bench_capture(GW, dev_id, results):
+    GW.command_device(dev_id, TCP_STE_STOP_MSG)
+    if GW.command_device(dev_id, TCP_BDT_RUN_MSG, SIM_BDT_RUN_TIME + 10.) != TCP_BDT_RUN_MSG:
+        return
+    bulk = GW.bulk_from_device(dev_id, TCP_BDT_INFO_MSG, TCP_BDT_REQ_MSG, TCP_BDT_ACK_MSG)
+    if bulk != None:
+        results.append( bulk[1] )
+    GW.command_device(dev_id, TCP_STE_START_MSG)
+
+#############################################
+# grow the fleet step by step against a gateway of this process and report each step
+#
+def bench_main(counts, sensor, capture_time, odr):
+    import wsn_gateway as GW
+    #
+    if not GW.open_gateway(SIM_HOST_NAME, SIM_BENCH_PORT):
+        print ('SIM> gateway open fail', flush=True)
+        return
+    fleets = []
+    rows = []
+    try:
+        for count in counts:
+            # add devices up to the count in a child process; fleet does not weigh on gateway memory
+            have = sum(n for n, proc in fleets)
+            if count > have:
+                proc = subprocess.Popen( [sys.executable, os.path.abspath(__file__), 'fleet', '%s:%d' % (SIM_HOST_NAME, SIM_BENCH_PORT),
+                                          '%d' % (count - have), sensor, '%g' % capture_time, '%d' % odr, '%d' % have],
+                                         stdout=subprocess.DEVNULL )
+                fleets.append( (count - have, proc) )
+            t = time.time()
+            while len(GW.list_devices()) < count and time.time() - t < SIM_REGISTER_WAIT_TIME:
+                time.sleep(0.5)
+            devices = GW.list_devices()
+            dev_ids = [ dev['dev'] for dev in devices ]
+            print ('SIM> step %d devices; %d registered in %.1f sec' % (count, len(dev_ids), time.time() - t), flush=True)
+            if len(dev_ids) == 0:
+                continue
+            for dev_id in dev_ids:
+                GW.write_to_device(dev_id, TCP_STE_START_MSG)
+            time.sleep(GW.GW_PING_INTERVAL)
+            # load of the step
+            latencies, errors, captures = [], [], []
+            cpu_time = time.process_time()
+            start = time.time()
+            # ASD has no STE data; monitoring of ASD server polls devices
+            tx_msg = TCP_STE_REQ_MSG if sensor == 'SCD' else TCP_DEV_READY_MSG
+            # devices capturing stop rolling; commanded by workers only if no other
+            bdt_ids = random.sample(dev_ids, min(SIM_BDT_DEVICES, len(dev_ids)))
+            ste_ids = [ dev_id for dev_id in dev_ids if dev_id not in bdt_ids ] or dev_ids
+            threads = [ threading.Thread(target=bench_worker, args=(GW, ste_ids, tx_msg, start + SIM_STEP_TIME, latencies, errors))
+                        for n in range(SIM_WORKERS) ]
+            threads += [ threading.Thread(target=bench_capture, args=(GW, dev_id, captures)) for dev_id in bdt_ids ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            elapsed = time.time() - start
+            cpu_time = time.process_time() - cpu_time
+            latencies.sort()
+            rtts = sorted( dev['rtt'] for dev in GW.list_devices() if dev['rtt'] != '-' )
+            rows.append( ( count, len(dev_ids), len(latencies) / elapsed,
+                           percentile(latencies, 50) * 1000., percentile(latencies, 95) * 1000., percentile(latencies, 99) * 1000.,
+                           len(errors),
+                           sum(stats['kbps'] for stats in captures) / len(captures) if captures else 0.,
+                           percentile(rtts, 95), sum(dev['udp_rx'] for dev in GW.list_devices()),
+                           cpu_time * 100. / elapsed, memory_rss() ) )
+            for dev_id in dev_ids:
+                GW.write_to_device(dev_id, TCP_STE_STOP_MSG)
+    except KeyboardInterrupt:
+        pass
+    for n, proc in fleets:
+        proc.terminate()
+    GW.close_gateway()
+    #
+    print ('SIM> %s devices, capture %g sec x %d Hz, %d workers, %d captures a step, %g sec a step' %
+           (sensor, capture_time, odr, SIM_WORKERS, SIM_BDT_DEVICES, SIM_STEP_TIME), flush=True)
+    print ('SIM> %7s %7s %9s %8s %8s %8s %6s %9s %8s %8s %6s %9s' %
+           ('devices', 'online', 'cmd/s', 'p50 ms', 'p95 ms', 'p99 ms', 'errors', 'BDT KB/s', 'rtt95 ms', 'UDP rx', 'CPU %', 'RSS KB'), flush=True)
+    for row in rows:
+        print ('SIM> %7d %7d %9.1f %8.1f %8.1f %8.1f %6d %9.1f %8.1f %8d %6.1f %9s' % row, flush=True)
+
+#############################################
+#############################################
+#
+# Main starts here
+#
+#############################################
+#
+if __name__ == '__main__':
+    if len(sys.argv) < 2 or sys.argv[1] not in ('fleet', 'bench'):
+        print (__doc__)
+        sys.exit(1)
+    try:
+        if sys.argv[1] == 'fleet':
+            host, port = SIM_HOST_NAME, SIM_PORT
+            if len(sys.argv) > 2:
+                host = sys.argv[2]
+                if ':' in host:
+                    host, port = host.rsplit(':', 1)
+                    port = int(port)
+            count        = int(sys.argv[3]) if len(sys.argv) > 3 else 1
+            sensor       = sys.argv[4] if len(sys.argv) > 4 else SIM_SENSOR
+            capture_time = float(sys.argv[5]) if len(sys.argv) > 5 else SIM_CAPTURE_TIME
+            odr          = int(sys.argv[6]) if len(sys.argv) > 6 else SIM_ODR
+            first        = int(sys.argv[7]) if len(sys.argv) > 7 else 0
+            asyncio.run( fleet_main(host, port, count, sensor, capture_time, odr, first) )
+        else:
+            counts       = [ int(n) for n in sys.argv[2].split(',') ] if len(sys.argv) > 2 else SIM_BENCH_COUNTS
+            sensor       = sys.argv[3] if len(sys.argv) > 3 else SIM_SENSOR
+            capture_time = float(sys.argv[4]) if len(sys.argv) > 4 else SIM_CAPTURE_TIME
+            odr          = int(sys.argv[5]) if len(sys.argv) > 5 else SIM_ODR
+            bench_main(counts, sensor, capture_time, odr)
+    except KeyboardInterrupt:
+        print ('SIM> stopped', flush=True)
+#
+#############################################
@@ -0,0 +1,1394 @@
+"""
+asyncio based gateway holding many WSN edge client connections for flask WEB servers
+coded functions as below
+- accept wsn_client_SCD / wsn_client_ASD connections at once on TCP port
+- keep device sessions in a registry keyed by device id told by hello message
+- send commands to a specific device without stalling the others
+- every command carries a correlation id; its reply resolves a future, several may be in flight
+- bulk data pulled by a window of chunk requests in flight; throughput reported per transfer
+- control and bulk data on separate channels; control frames sent ahead of queued bulk frames
+- heartbeat on every device connection measuring RTT; silent devices dropped after dead-peer timeout
+- zlib compressed data replies accepted from devices telling the capability
+- bulk data addressed by capture id and offset, acknowledged; resumed after device reconnect
+- STE samples pushed by devices on UDP port; latest one kept per device
+- AF_UNIX socket path accepting co-located devices besides TCP port; same framing and commands
+- handover to a new server process; listening and device sockets inherited with session state
+    handover_gateway(path) quiets devices and leaves sockets open across exec
+    open_gateway() of the new process adopts them if GW_HANDOVER_ENV names the state file
+- session recording; every frame and datagram exchanged with devices appended to a file for wsn_replay
+- values shared by flask workers; the last capture of each device
+    held here so that flask workers in other processes share them through wsn_gateway_rpc
+- leases of devices for monitoring and acquisition; keyed by device, held by an owner id till released or expired
+    a lease is refused while a conflicting one of the device is held by another owner, or by the owner under another name
+    the owner renews its lease by acquiring it again; expired ones taken over by the next owner
+- capture jobs run in background; a bounded queue per device, progress and result kept by job id
+    a job is a list of steps, ['command', msg, timeout, reply expected] or ['bulk', info, req, ack]
+    leases named released when the job finishes, chunks of its bulk step kept as result
+    spectrum of the bulk step computed where it finishes, kept with the job and told to alert rules once
+- shared STE sampler per device; the device read once per interval however many viewers subscribe
+    started with the first subscriber, stopped when the last one leaves or its subscription expires
+    the latest STE sample pushed on UDP taken if fresh, otherwise requested
+    a caller may wait a row newer than the one it has; woken as soon as sampled
+- STE rows sampled or pushed kept in a ring buffer per device by wsn_ste; trend of the last minutes
+- STE rows appended to daily segment files per device by wsn_history if a history path given; trend of months
+    read from rollups of the coarsest bucket size giving the points asked; min and max of each point too
+- every STE row scored by wsn_anomaly against a baseline per device learned as rows come; status of the latest kept
+- every STE row and every spectrum told by a server evaluated by wsn_alert rules if an alert rules path given
+    alerts delivered to file and webhook sinks off the event loop; active ones and latency told by alert_status()
+
+usage: import wsn_gateway as GW
+       GW.open_gateway(host, port) then GW.command_device(), GW.write_to_device(), ...
+
+                    started 2026-10-18; multi-device gateway
+                    updated 2026-10-18; windowed bulk transfer
+                    updated 2026-10-18; control and bulk data channels, prioritized send queue
+                    updated 2026-10-18; heartbeat and dead-peer detection
+                    updated 2026-10-18; hello/welcome registration in one round trip
+                    updated 2026-10-18; negotiated zlib compression of data replies
+                    updated 2026-10-18; resumable capture transfer
+                    updated 2026-10-18; UDP STE sample channel
+                    updated 2026-10-18; AF_UNIX transport for co-located devices
+                    updated 2026-10-18; handover to a new process without dropping devices
+                    updated 2026-10-18; session recording
+                    updated 2026-10-18; shared values for flask workers
+                    updated 2026-10-18; background capture jobs
+                    updated 2026-10-18; per-device leases with owner and expiry in place of lock flags
+                    updated 2026-10-18; shared STE sampler fanned out to subscribers
+                    updated 2026-10-18; waiting a new sampled row for streaming
+                    updated 2026-10-18; STE ring buffer per device and trend
+                    updated 2026-10-18; persistent STE history in daily segments
+                    updated 2026-10-18; STE history trend from rollups
+                    updated 2026-10-18; anomaly scoring of STE rows per device
+                    updated 2026-10-18; alert rules on STE rows and spectra
+"""
+import asyncio
+import collections
+import datetime
+import json
+import os
+import socket
+import stat
+import threading
+import time
+import zlib
+
+import wsn_alert as ALERT
+import wsn_anomaly as ANOMALY
+import wsn_bdt as BDT
+import wsn_history as HISTORY
+import wsn_protocol as PROTO
+import wsn_ste as STE
+
+#############################################
+# target definitions to gateway
+#############################################
+#
+GW_BACKLOG         = 64               # listen backlog for device connections
+GW_OPEN_WAIT_TIME  = 5.               # time period to wait gateway thread ready
+GW_TX_WAIT_TIME    = 10.              # time period to wait a device drained on write
+GW_REPLY_WAIT_TIME = 8.               # default time period to wait a reply of command
+GW_BULK_CHUNK      = 0x10000          # 64KB; bytes requested by a chunk request of bulk transfer
+GW_BULK_WINDOW     = 8                # chunk requests kept in flight on bulk transfer
+GW_PING_INTERVAL   = 5.               # time interval to send heartbeat to devices
+GW_DEAD_TIME       = 15.              # default time period of silence to drop a device
+GW_HELLO_WAIT_TIME = 5.               # time period to wait hello message on device connection
+GW_READ_CHUNK      = 0x40000          # 256KB; bytes read at once from a device; over what StreamReader buffers
+GW_RESUME_TRIES    = 4                # attempts of a bulk transfer; first one and resumes
+GW_RESUME_WAIT_TIME = 30.             # time period to wait a device reconnecting to resume bulk transfer
+GW_RESUME_POLL_TIME = 0.2             # time interval to check a device reconnected
+GW_SAMPLE_SEQ_RESET = 1000            # seq far behind the last one means device restarted counting
+GW_HANDOVER_ENV    = 'WSN_GW_HANDOVER'  # environment variable naming handover state file to the new process
+GW_HANDOVER_WAIT_TIME = 10.           # time period to wait commands in flight replied before handover
+GW_JOB_QUEUE       = 2                # jobs waiting per device besides the running one
+GW_JOB_KEEP_TIME   = 600.             # time period to keep a finished job to be reported
+GW_SAMPLER_REQ_TIME = 20.             # time period to wait a STE row requested by sampler
+#
+# global variables
+#
+gLoop       = None  # asyncio event loop of the gateway thread
+gThread     = None  # gateway thread
+gServer     = None  # asyncio server accepting devices
+gSampler    = None  # asyncio datagram transport receiving STE samples
+gUnixServer = None  # asyncio server accepting co-located devices on AF_UNIX path
+gUnixPath   = ''    # AF_UNIX socket path; '' if not used
+gDevices    = {}    # device sessions keyed by device identity; first one is the default
+gDeadTime   = GW_DEAD_TIME  # time period of silence to drop a device
+gCaps       = [PROTO.CAP_ZLIB]  # capabilities accepted from devices
+gCaptures   = {}    # captures partially pulled keyed by device identity; id, length, data, acked
+gHandover   = False # handing over to a new process; no command, no heartbeat
+gRecorder   = None  # session record file; frames and datagrams exchanged with devices
+gShared     = {}    # values shared by flask workers; last capture of each device
+gSharedLock = threading.Lock()  # for shared values and leases
+gLeases     = {}    # leases keyed by device identity then lease name; owner and expiry time
+gJobs       = {}    # capture jobs keyed by job id; status reported
+gJobResults = {}    # chunks and transfer stats of finished jobs keyed by job id
+gJobSpectra = {}    # spectra of the bulk step of finished jobs keyed by job id
+gJobQueues  = {}    # queues of jobs waiting keyed by device identity; worker running while queued
+gJobSeq     = 0     # last job number
+gSamplers   = {}    # STE samplers keyed by device identity; subscribers, messages, latest row
+gTrends     = {}    # STE ring buffers keyed by device identity; kept across reconnects
+gHistory    = None  # STE history store on disk; None if no history path
+gBaselines  = {}    # anomaly baselines keyed by device identity; kept across reconnects
+gAnomalies  = {}    # status and scores of the latest STE row keyed by device identity
+gAlerts     = None  # alert engine; None if no alert rules path
+
+#############################################
+#############################################
+#
+# device session
+#
+#############################################
+class DeviceSession:
+
+    def __init__(self, reader, writer):
+        peer = writer.get_extra_info('peername')
+        self.reader    = reader
+        self.writer    = writer
+        if isinstance(peer, tuple):
+            self.addr   = peer[0]
+            self.dev_id = '%s:%d' % (peer[0], peer[1])
+        else:
+            # AF_UNIX peer has no address
+            self.addr   = 'unix'
+            self.dev_id = 'unix:%d' % id(self)
+        self.sensor    = ''
+        self.caps      = []
+        self.capture   = None  # capture pending on device told by hello; id, length, acked
+        self.outbox    = asyncio.PriorityQueue()  # frames to send; (priority, seq, frame)
+        self.tx_seq    = 0
+        self.pending   = {}    # futures of commands in flight keyed by req_id
+        self.partial   = {}    # fragments of bulk replies being received keyed by req_id
+        self.busy      = {}    # commands allowed to keep device silent long; req_id to deadline
+        self.req_id    = 0
+        self.open_time = self.last_time = self.rx_time = time.time()
+        self.rtt       = None  # last heartbeat round trip time
+        self.rx_bytes  = 0
+        self.tx_bytes  = 0
+        self.zlib_wire = 0     # compressed bytes received
+        self.zlib_raw  = 0     # bytes of them decompressed
+        self.zlib_cpu  = 0.    # CPU time spent to decompress
+        self.sample    = None  # latest STE sample by UDP; receive time, seq, row
+        self.rx_buf    = bytearray()  # bytes received but not parsed yet; kept across handover
+        self.udp_seq   = 0
+        self.udp_rx    = 0
+        self.udp_lost  = 0
+
+    def next_id(self):
+        self.req_id = self.req_id % 0xffffffff + 1
+        return self.req_id
+
+    def queue_frames(self, frames, priority):
+        for frame in frames:
+            self.tx_seq += 1
+            self.outbox.put_nowait( (priority, self.tx_seq, frame) )
+
+    async def read_frame(self):
+        while True:
+            frame = PROTO.take_frame(self.rx_buf)
+            if frame != None:
+                return frame
+            data = await self.reader.read(GW_READ_CHUNK)
+            if not data:
+                raise asyncio.IncompleteReadError(bytes(self.rx_buf), None)
+            self.rx_buf += data
+
+    def register(self, hello):
+        self.dev_id = str(hello.get('dev') or self.dev_id)
+        self.sensor = str(hello.get('sensor', ''))
+        self.caps   = list(hello.get('caps', []))
+        self.capture = hello.get('capture')
+
+    def state(self):
+        # frames queued taken out and put back; only to read them
+        queued = []
+        while not self.outbox.empty():
+            queued.append( self.outbox.get_nowait() )
+        for item in queued:
+            self.outbox.put_nowait(item)
+        return { 'dev'       : self.dev_id,
+                 'sensor'    : self.sensor,
+                 'caps'      : self.caps,
+                 'capture'   : self.capture,
+                 'addr'      : self.addr,
+                 'open_time' : self.open_time,
+                 'last_time' : self.last_time,
+                 'rtt'       : self.rtt,
+                 'req_id'    : self.req_id,
+                 'rx_bytes'  : self.rx_bytes,
+                 'tx_bytes'  : self.tx_bytes,
+                 'zlib'      : [ self.zlib_wire, self.zlib_raw, self.zlib_cpu ],
+                 'sample'    : self.sample,
+                 'udp'       : [ self.udp_seq, self.udp_rx, self.udp_lost ],
+                 'partial'   : { str(req_id) : [ data.hex() for data in frags ] for req_id, frags in self.partial.items() },
+                 'outbox'    : [ [ priority, frame.hex() ] for priority, seq, frame in queued ],
+                 'rx'        : bytes(self.rx_buf).hex()
+               }
+
+    def restore(self, state):
+        self.dev_id    = state['dev']
+        self.sensor    = state['sensor']
+        self.caps      = state['caps']
+        self.capture   = state['capture']
+        self.addr      = state['addr']
+        self.open_time = state['open_time']
+        self.last_time = state['last_time']
+        self.rtt       = state['rtt']
+        self.req_id    = state['req_id']
+        self.rx_bytes  = state['rx_bytes']
+        self.tx_bytes  = state['tx_bytes']
+        self.zlib_wire, self.zlib_raw, self.zlib_cpu = state['zlib']
+        self.sample    = tuple(state['sample']) if state['sample'] != None else None
+        self.udp_seq, self.udp_rx, self.udp_lost = state['udp']
+        self.partial   = { int(req_id) : [ bytes.fromhex(data) for data in frags ] for req_id, frags in state['partial'].items() }
+        for priority, frame in state['outbox']:
+            self.queue_frames( [bytes.fromhex(frame)], priority )
+        self.rx_buf    = bytearray.fromhex(state['rx'])
+        # silence while handing over is not the device's
+        self.rx_time   = time.time()
+
+    def info(self):
+        return { 'dev'      : self.dev_id,
+                 'sensor'   : self.sensor,
+                 'caps'     : self.caps,
+                 'addr'     : self.addr,
+                 'opened'   : datetime.datetime.fromtimestamp(self.open_time).strftime('%Y-%m-%d %H:%M:%S'),
+                 'last'     : round(time.time() - self.last_time, 3),
+                 'rtt'      : round(self.rtt * 1000., 1) if self.rtt != None else '-',
+                 'pending'  : len(self.pending),
+                 'queued'   : self.outbox.qsize(),
+                 'rx_bytes' : self.rx_bytes,
+                 'tx_bytes' : self.tx_bytes,
+                 'zlib'     : round(self.zlib_wire / self.zlib_raw, 3) if self.zlib_raw > 0 else '-',
+                 'udp_rx'   : self.udp_rx,
+                 'udp_lost' : self.udp_lost
+               }
+
+#############################################
+#############################################
+#
+# gateway coroutines; run in the gateway thread
+#
+#############################################
+# handle one device connection; registration then served till closed
+#
+async def device_handler(reader, writer):
+    session = DeviceSession(reader, writer)
+    # registration; hello should be the first frame
+    try:
+        ftype, flags, req_id, payload = await asyncio.wait_for(session.read_frame(), timeout=GW_HELLO_WAIT_TIME)
+        if ftype != PROTO.FRAME_HELLO:
+            raise ValueError('frame type %d instead of hello' % ftype)
+        session.register( json.loads(payload) )
+        session.rx_bytes += PROTO.FRAME_HEADER_LEN + len(payload)
+        if gRecorder != None:
+            record(session.dev_id, PROTO.RECORD_RX, PROTO.pack_frame(ftype, payload, req_id, flags))
+    except Exception as e:
+        print ('AIO-S> device [%s] registration fail "%r"' % (session.dev_id, e), flush=True)
+        writer.close()
+        return
+    old = gDevices.get(session.dev_id)
+    if old != None:
+        print ('AIO-S> device [%s] registered again, previous connection closed' % session.dev_id, flush=True)
+        old.writer.close()
+    gDevices[session.dev_id] = session
+    print ("AIO-S> device [%s] %s %r connected; %d device(s)" %
+           (session.dev_id, session.sensor, session.caps, len(gDevices)), flush=True)
+    if session.capture != None:
+        print ('AIO-S> device [%s] capture [%s] pending, %s of %s acknowledged' %
+               (session.dev_id, session.capture.get('id'), session.capture.get('acked'), session.capture.get('length')), flush=True)
+    welcome = { 'dev' : session.dev_id, 'ping' : GW_PING_INTERVAL, 'dead' : gDeadTime,
+                'caps' : [ cap for cap in session.caps if cap in gCaps ],
+                'udp'  : gSampler.get_extra_info('sockname')[1] if gSampler != None else 0 }
+    session.queue_frames( [PROTO.pack_frame(PROTO.FRAME_WELCOME, json.dumps(welcome), req_id)], PROTO.PRIO_CONTROL )
+    await device_serve(session)
+
+#############################################
+# serve a device registered till closed; dispatches replies to the commands
+#
+async def device_serve(session):
+    writer = session.writer
+    writer_task = gLoop.create_task( device_writer(session) )
+    try:
+        while True:
+            ftype, flags, req_id, payload = await session.read_frame()
+            session.rx_bytes += PROTO.FRAME_HEADER_LEN + len(payload)
+            session.rx_time = time.time()
+            if gRecorder != None:
+                record(session.dev_id, PROTO.RECORD_RX, PROTO.pack_frame(ftype, payload, req_id, flags))
+            if ftype == PROTO.FRAME_PONG:
+                try:
+                    session.rtt = session.rx_time - float(payload)
+                except ValueError:
+                    pass
+                continue
+            session.last_time = session.rx_time
+            # gather fragments of a bulk reply; control replies pass between them
+            if flags & PROTO.FLAG_MORE:
+                session.partial.setdefault(req_id, []).append(payload)
+                continue
+            if req_id in session.partial:
+                session.partial[req_id].append(payload)
+                payload = b''.join(session.partial.pop(req_id))
+            if flags & PROTO.FLAG_ZLIB:
+                cpu_time = time.process_time()
+                session.zlib_wire += len(payload)
+                payload = zlib.decompress(payload)
+                session.zlib_raw += len(payload)
+                session.zlib_cpu += time.process_time() - cpu_time
+            session.busy.pop(req_id, None)
+            future = session.pending.pop(req_id, None)
+            if future != None:
+                if not future.done():
+                    future.set_result( (ftype, payload) )
+            else:
+                print ('AIO-S> device [%s] unsolicited or late reply #%d dropped' % (session.dev_id, req_id), flush=True)
+    except asyncio.IncompleteReadError:
+        pass
+    except Exception as e:
+        print ('AIO-S> device [%s] error "%r"' % (session.dev_id, e), flush=True)
+    #
+    if gDevices.get(session.dev_id) is session:
+        del gDevices[session.dev_id]
+    for future in session.pending.values():
+        if not future.done():
+            future.set_result(None)
+    session.pending.clear()
+    session.partial.clear()
+    writer_task.cancel()
+    writer.close()
+    print ("AIO-S> device [%s] disconnected; %d device(s)" % (session.dev_id, len(gDevices)), flush=True)
+
+#############################################
+# send frames queued to a device; control frames go ahead of bulk frames
+#
+async def device_writer(session):
+    while True:
+        priority, seq, frame = await session.outbox.get()
+        if gRecorder != None:
+            record(session.dev_id, PROTO.RECORD_TX, frame)
+        try:
+            session.writer.write(frame)
+            await asyncio.wait_for( session.writer.drain(), timeout=GW_TX_WAIT_TIME )
+        except Exception as e:
+            print ('AIO-S> device [%s] TX error "%r"' % (session.dev_id, e), flush=True)
+            session.writer.close()
+            return
+        session.tx_bytes += len(frame)
+
+#############################################
+# append a frame or datagram to session record
+#
+def record(dev_id, direction, data):
+    try:
+        gRecorder.write( PROTO.pack_record(time.time(), direction, dev_id, data) )
+    except Exception as e:
+        print ('AIO-S> session record error "%r"; recording stopped' % (e), flush=True)
+        stop_recording()
+
+#############################################
+# close session record file
+#
+def stop_recording():
+    global gRecorder
+    #
+    if gRecorder != None:
+        gRecorder.close()
+        gRecorder = None
+
+#############################################
+# expire a command not replied in time
+#
+def command_expire(session, req_id):
+    session.busy.pop(req_id, None)
+    future = session.pending.pop(req_id, None)
+    if future != None and not future.done():
+        future.set_result(None)
+
+#############################################
+# queue a command to a device; returns the future of its reply
+# bulk commands go on bulk channel behind control commands
+#
+async def device_send(dev_id, tx_msg, timeout, bulk = False):
+    session = gDevices.get(dev_id)
+    if session == None or gHandover:
+        return None
+    req_id = session.next_id()
+    future = gLoop.create_future()
+    session.pending[req_id] = future
+    gLoop.call_later(timeout, command_expire, session, req_id)
+    if timeout > gDeadTime:
+        # device may be silent while running a long command
+        session.busy[req_id] = time.time() + timeout
+    if bulk:
+        session.queue_frames(PROTO.pack_frames(PROTO.FRAME_CMD, tx_msg, req_id, PROTO.FLAG_BULK), PROTO.PRIO_BULK)
+    else:
+        session.queue_frames(PROTO.pack_frames(PROTO.FRAME_CMD, tx_msg, req_id), PROTO.PRIO_CONTROL)
+    return future
+
+#############################################
+# send a command to a device and wait the reply
+#
+async def device_request(dev_id, tx_msg, timeout):
+    future = await device_send(dev_id, tx_msg, timeout)
+    if future == None:
+        return None
+    reply = await future
+    if reply == None:
+        return None
+    ftype, payload = reply
+    if ftype == PROTO.FRAME_NAK:
+        print ('AIO-S> device [%s] NAK "%r" for "%r"' % (dev_id, payload.decode(), tx_msg), flush=True)
+        return ''
+    return payload.decode()
+
+#############################################
+# wait a device connected; the session given only if still heard from within dead time
+#
+async def device_wait(dev_id, old_session, wait):
+    t = time.time()
+    while True:
+        session = gDevices.get(dev_id)
+        if session != None and (session is not old_session or time.time() - session.rx_time < gDeadTime):
+            return session
+        if time.time() - t >= wait:
+            return None
+        await asyncio.sleep(GW_RESUME_POLL_TIME)
+
+#############################################
+# pull a capture from a device connection, from the offset acknowledged
+# capture kept partially in gCaptures till completed; returns True if completed
+#
+async def capture_pull(session, info_msg, req_msg, ack_msg, timeout, chunk, window):
+    dev_id = session.dev_id
+    reply = await device_request(dev_id, info_msg, timeout)
+    try:
+        length, cap_id = reply.split()
+        length = int(length)
+    except:
+        return False
+    capture = gCaptures.get(dev_id)
+    if capture == None or capture['id'] != cap_id or capture['length'] != length:
+        capture = { 'id' : cap_id, 'length' : length, 'data' : [], 'acked' : 0 }
+        gCaptures[dev_id] = capture
+    elif capture['acked'] > 0:
+        print ('AIO-S> device [%s] capture [%s] resumed at %d of %d' % (dev_id, cap_id, capture['acked'], length), flush=True)
+    offset = capture['acked']  # offset of the next chunk request
+    futures = collections.deque()  # chunk requests in flight; offset and future
+    while capture['acked'] < length:
+        # fill the window
+        while len(futures) < window and offset < length:
+            future = await device_send(dev_id, '%s %d %d %s' % (req_msg, offset, chunk, cap_id), timeout, True)
+            if future == None:
+                return False
+            futures.append( (offset, future) )
+            offset += chunk
+        at, future = futures.popleft()
+        reply = await future
+        if reply == None or reply[0] == PROTO.FRAME_NAK or len(reply[1]) == 0:
+            print ('AIO-S> device [%s] capture [%s] chunk at %d failed' % (dev_id, cap_id, at), flush=True)
+            return False
+        data = reply[1].decode()
+        capture['data'].append(data)
+        capture['acked'] += len(data)
+        # acknowledge; device resumes from here on reconnect
+        await device_send(dev_id, '%s %s %d' % (ack_msg, cap_id, capture['acked']), timeout, True)
+        if len(data) != min(chunk, length - at):
+            # not the size asked; requests in flight are off, asked again from the bytes received
+            print ('AIO-S> device [%s] capture [%s] chunk at %d of %d bytes, not %d' % (dev_id, cap_id, at, len(data), min(chunk, length - at)), flush=True)
+            futures.clear()
+            offset = capture['acked']
+    #
+    return capture['acked'] >= length
+
+#############################################
+# pull a bulk data from a device keeping a window of chunk requests in flight
+# info_msg is replied with total length and capture id, req_msg + ' offset size id' with a chunk
+# ack_msg + ' id offset' acknowledges data received; transfer resumes on device reconnect
+# returns list of chunks and transfer stats, None if failed
+#
+async def device_bulk(dev_id, info_msg, req_msg, ack_msg, timeout, chunk, window):
+    start_time = time.time()
+    zlib_wire = zlib_raw = zlib_cpu = 0
+    session = None
+    for attempt in range(GW_RESUME_TRIES):
+        session = await device_wait(dev_id, session, GW_RESUME_WAIT_TIME if attempt > 0 else 0.)
+        if session == None:
+            break
+        wire, raw, cpu = session.zlib_wire, session.zlib_raw, session.zlib_cpu
+        completed = await capture_pull(session, info_msg, req_msg, ack_msg, timeout, chunk, window)
+        zlib_wire += session.zlib_wire - wire
+        zlib_raw  += session.zlib_raw - raw
+        zlib_cpu  += session.zlib_cpu - cpu
+        if completed:
+            break
+    capture = gCaptures.get(dev_id)
+    if capture == None or capture['acked'] < capture['length']:
+        return None
+    del gCaptures[dev_id]
+    #
+    length = capture['length']
+    elapsed = time.time() - start_time
+    stats = { 'capture' : capture['id'],
+              'bytes'   : length,
+              'chunks'  : len(capture['data']),
+              'window'  : window,
+              'resumed' : attempt,
+              'elapsed' : round(elapsed, 3),
+              'kbps'    : round(length / 1024. / elapsed, 1) if elapsed > 0. else 0.,
+              'wire'    : zlib_wire + length - zlib_raw,
+              'ratio'   : round((zlib_wire + length - zlib_raw) / length, 3) if length > 0 else 1.,
+              'zlib_ms' : round(zlib_cpu * 1000., 1)
+            }
+    print ('AIO-S> device [%s] bulk %d bytes in %d chunks, %d resumed, %.3f sec, %.1f KB/s, wire %d bytes (%.1f%%), zlib %.1f ms' %
+           (dev_id, length, stats['chunks'], attempt, elapsed, stats['kbps'], stats['wire'], stats['ratio'] * 100., stats['zlib_ms']), flush=True)
+    return capture['data'], stats
+
+#############################################
+# close a device connection
+#
+async def device_close(dev_id):
+    session = gDevices.pop(dev_id, None)
+    if session != None:
+        session.writer.close()
+
+#############################################
+# queue a job to its device; worker started if none running
+# returns job id, None if device unknown or its queue full
+#
+async def job_submit(dev_id, steps, owner, leases, result_name):
+    global gJobSeq
+    #
+    if gDevices.get(dev_id) == None:
+        return None
+    t = time.time()
+    for job_id in [ job_id for job_id, job in gJobs.items() if job['finished'] != None and t - job['finished'] > GW_JOB_KEEP_TIME ]:
+        del gJobs[job_id]
+        gJobResults.pop(job_id, None)
+        gJobSpectra.pop(job_id, None)
+    queue = gJobQueues.get(dev_id)
+    if queue != None and queue.full():
+        print ('AIO-S> device [%s] job queue full' % dev_id, flush=True)
+        return None
+    gJobSeq += 1
+    job = { 'job'      : '%s-%d' % (dev_id, gJobSeq),
+            'dev'      : dev_id,
+            'state'    : 'queued',
+            'step'     : 0,
+            'steps'    : len(steps),
+            'what'     : '',
+            'bytes'    : 0,
+            'length'   : 0,
+            'error'    : '',
+            'queued'   : t,
+            'started'  : None,
+            'finished' : None,
+            'stats'    : None }
+    gJobs[job['job']] = job
+    if queue == None:
+        queue = asyncio.Queue(GW_JOB_QUEUE)
+        gJobQueues[dev_id] = queue
+        gLoop.create_task(job_worker(dev_id, queue))
+    queue.put_nowait( (job, steps, owner, leases, result_name) )
+    print ('AIO-S> device [%s] job [%s] queued, %d step(s)' % (dev_id, job['job'], len(steps)), flush=True)
+    return job['job']
+
+#############################################
+# run jobs of a device one after another till its queue is empty
+#
+async def job_worker(dev_id, queue):
+    while not queue.empty():
+        job, steps, owner, leases, result_name = queue.get_nowait()
+        try:
+            await job_run(job, steps, result_name)
+        except Exception as e:
+            job['state'] = 'failed'
+            job['error'] = repr(e)
+        job['finished'] = time.time()
+        for name in leases:
+            release_lease(dev_id, name, owner)
+        print ('AIO-S> device [%s] job [%s] %s in %.3f sec %s' %
+               (dev_id, job['job'], job['state'], job['finished'] - job['started'], job['error']), flush=True)
+    del gJobQueues[dev_id]
+
+#############################################
+# run steps of a job; state done if all completed, failed at the first one not
+#
+async def job_run(job, steps, result_name):
+    dev_id = job['dev']
+    job['state'] = 'running'
+    job['started'] = time.time()
+    for step in steps:
+        job['step'] += 1
+        job['what'] = step[1]
+        if step[0] == 'command':
+            reply = await device_request(dev_id, step[1], step[2])
+            if reply == None or reply == '' or (step[3] != None and reply != step[3]):
+                job['state'] = 'failed'
+                job['error'] = 'device did not complete "%s"' % step[1]
+                return
+        elif step[0] == 'bulk':
+            rtn = await device_bulk(dev_id, step[1], step[2], step[3], GW_REPLY_WAIT_TIME, GW_BULK_CHUNK, GW_BULK_WINDOW)
+            if rtn == None:
+                job['state'] = 'failed'
+                job['error'] = 'device did not send "%s" data' % step[2]
+                return
+            chunks, stats = rtn
+            job['bytes'] = job['length'] = stats['bytes']
+            job['stats'] = stats
+            gJobResults[job['job']] = (chunks, stats)
+            if result_name != '':
+                with gSharedLock:
+                    gShared[result_name] = chunks
+            # spectrum of this job's own data computed off the loop; alert rules told here, polled or not
+            spectrum = await gLoop.run_in_executor(None, BDT.spectrum, ''.join(chunks))
+            if spectrum != None:
+                gJobSpectra[job['job']] = spectrum
+                if gAlerts != None:
+                    gAlerts.on_spectrum(dev_id, time.time(), spectrum['x'], spectrum['y'])
+        else:
+            job['state'] = 'failed'
+            job['error'] = 'unknown step "%s"' % step[0]
+            return
+    job['state'] = 'done'
+
+#############################################
+# copy of the status of a job taken on the gateway thread that runs it; None if unknown
+#
+async def job_snapshot(job_id):
+    job = gJobs.get(job_id)
+    if job == None:
+        return None
+    status = dict(job)
+    capture = gCaptures.get(job['dev'])
+    if job['state'] == 'running' and capture != None:
+        status['bytes'] = capture['acked']
+        status['length'] = capture['length']
+    return status
+
+#############################################
+# subscribe to the STE sampler of a device, started if not running; renewed by subscribing again
+# returns number of subscribers, None if device unknown
+#
+async def sampler_subscribe(dev_id, owner, start_msg, stop_msg, req_msg, interval, ttl):
+    if gDevices.get(dev_id) == None:
+        return None
+    sampler = gSamplers.get(dev_id)
+    if sampler == None:
+        sampler = { 'subs'  : {},
+                    'msgs'  : (start_msg, stop_msg, req_msg),
+                    'row'   : None,
+                    'time'  : 0.,
+                    'seq'   : 0,
+                    'reads' : 0,
+                    'pushed' : 0.,
+                    'anomaly' : None,
+                    'new'   : asyncio.Event(),
+                    'stopped' : False }
+        gSamplers[dev_id] = sampler
+        gLoop.create_task(sampler_run(dev_id, sampler))
+    sampler['subs'][owner] = (interval, time.time() + ttl)
+    return len(sampler['subs'])
+
+#############################################
+# leave the STE sampler of a device; returns number of subscribers left
+#
+async def sampler_unsubscribe(dev_id, owner):
+    sampler = gSamplers.get(dev_id)
+    if sampler == None:
+        return 0
+    sampler['subs'].pop(owner, None)
+    if len(sampler['subs']) == 0:
+        await sampler_stop(dev_id, sampler)
+    return len(sampler['subs'])
+
+#############################################
+# wait a row newer than seq sampled from a device; the latest one at timeout
+#
+async def sampler_wait(dev_id, seq, timeout):
+    sampler = gSamplers.get(dev_id)
+    if sampler == None:
+        return None
+    if sampler['seq'] == seq:
+        try:
+            await asyncio.wait_for(sampler['new'].wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+    return sampled_row(dev_id)
+
+#############################################
+# stop the STE sampler of a device; sampler task ends at its next interval
+#
+async def sampler_stop(dev_id, sampler):
+    if sampler['stopped']:
+        return
+    sampler['stopped'] = True
+    if gSamplers.get(dev_id) is sampler:
+        del gSamplers[dev_id]
+    if gDevices.get(dev_id) != None:
+        await device_send(dev_id, sampler['msgs'][1], GW_REPLY_WAIT_TIME)
+    print ('AIO-S> device [%s] sampler stopped; %d rows, %d device reads' % (dev_id, sampler['seq'], sampler['reads']), flush=True)
+
+#############################################
+# keep a STE row in the ring buffer of a device
+#
+def trend_append(dev_id, row):
+    parsed = STE.parse_row(row)
+    if parsed == None:
+        return
+    ring = gTrends.get(dev_id)
+    if ring == None:
+        ring = STE.SteRing()
+        gTrends[dev_id] = ring
+    # a row sampled and pushed on UDP stored and scored once
+    if not ring.append(*parsed):
+        return
+    if gHistory != None:
+        gHistory.append(dev_id, *parsed)
+    baseline = gBaselines.get(dev_id)
+    if baseline == None:
+        baseline = ANOMALY.Baseline()
+        gBaselines[dev_id] = baseline
+    anomaly = baseline.classify(parsed[1])
+    anomaly['time'] = parsed[0]
+    gAnomalies[dev_id] = anomaly
+    if gAlerts != None:
+        gAlerts.on_sample(dev_id, parsed[0], parsed[1], anomaly)
+
+#############################################
+# sample a device once per the shortest interval of subscribers till none left
+#
+async def sampler_run(dev_id, sampler):
+    start_msg, stop_msg, req_msg = sampler['msgs']
+    print ('AIO-S> device [%s] sampler started' % dev_id, flush=True)
+    await device_send(dev_id, start_msg, GW_REPLY_WAIT_TIME)
+    while True:
+        t = time.time()
+        for owner in [ owner for owner, sub in sampler['subs'].items() if sub[1] <= t ]:
+            del sampler['subs'][owner]
+        session = gDevices.get(dev_id)
+        if sampler['stopped'] or len(sampler['subs']) == 0 or session == None:
+            break
+        interval = min( sub[0] for sub in sampler['subs'].values() )
+        # latest STE sample pushed by device if fresh, otherwise request it
+        # a sample pushed is a new row once; not told again as new by seq
+        if session.sample != None and t - session.sample[0] < interval:
+            row = session.sample[2] if session.sample[0] != sampler['pushed'] else None
+            sampler['pushed'] = session.sample[0]
+        else:
+            row = await device_request(dev_id, req_msg, GW_SAMPLER_REQ_TIME)
+            sampler['reads'] += 1
+        if row != None and row != '':
+            sampler['row'] = row
+            sampler['time'] = t
+            sampler['seq'] += 1
+            trend_append(dev_id, row)
+            sampler['anomaly'] = gAnomalies.get(dev_id)
+            # wake the ones waiting a new row
+            sampler['new'].set()
+            sampler['new'] = asyncio.Event()
+        await asyncio.sleep( max(0., interval - (time.time() - t)) )
+    await sampler_stop(dev_id, sampler)
+
+#############################################
+# STE samples pushed by devices; latest one kept, older or duplicated ones dropped
+#
+class SampleProtocol(asyncio.DatagramProtocol):
+
+    def datagram_received(self, data, addr):
+        try:
+            seq, dev_id, row = PROTO.unpack_sample(data)
+        except Exception:
+            return
+        session = gDevices.get(dev_id)
+        if session == None or session.addr != addr[0]:
+            return
+        if seq <= session.udp_seq and session.udp_seq - seq < GW_SAMPLE_SEQ_RESET:
+            return
+        if seq > session.udp_seq + 1 and session.udp_seq > 0:
+            session.udp_lost += seq - session.udp_seq - 1
+        session.udp_seq = seq
+        session.udp_rx += 1
+        session.sample = (time.time(), seq, row)
+        trend_append(dev_id, row)
+        if gRecorder != None:
+            record(dev_id, PROTO.RECORD_UDP, data)
+
+#############################################
+# send heartbeat to devices and drop the ones silent longer than dead-peer time
+#
+async def gateway_heartbeat():
+    while True:
+        await asyncio.sleep(GW_PING_INTERVAL)
+        if gHandover:
+            continue
+        t = time.time()
+        for session in list(gDevices.values()):
+            if t - session.rx_time > gDeadTime and not session.busy:
+                print ('AIO-S> device [%s] silent for %.1f sec, dropped' % (session.dev_id, t - session.rx_time), flush=True)
+                session.writer.close()
+                continue
+            session.queue_frames( [PROTO.pack_frame(PROTO.FRAME_PING, '%.6f' % t)], PROTO.PRIO_CONTROL )
+
+#############################################
+# duplicate a socket to be inherited by the new process
+#
+def inherit_fd(sock):
+    fd = os.dup(sock.fileno())
+    os.set_inheritable(fd, True)
+    return fd
+
+#############################################
+# file descriptors of a handover state
+#
+def handover_fds(state):
+    fds = [ state['server'], state['sampler'], state['unix'] ] + [ dev['fd'] for dev in state['devices'] ]
+    return [ fd for fd in fds if fd >= 0 ]
+
+#############################################
+# go on serving devices after a handover failed
+#
+def gateway_resume(fds):
+    global gHandover
+    #
+    for fd in fds:
+        os.close(fd)
+    for session in gDevices.values():
+        if not session.writer.is_closing():
+            session.writer.transport.resume_reading()
+    gHandover = False
+
+#############################################
+# quiet devices and take gateway state to hand over to a new process
+# commands in flight replied or timed out, frames queued sent, reading paused
+# sockets duplicated inheritable; returns state, None if failed
+#
+async def gateway_handover():
+    global gHandover
+    #
+    gHandover = True
+    t = time.time()
+    while time.time() - t < GW_HANDOVER_WAIT_TIME:
+        if all( not session.pending and session.outbox.empty() and session.writer.transport.get_write_buffer_size() == 0
+                for session in gDevices.values() ):
+            break
+        await asyncio.sleep(GW_RESUME_POLL_TIME)
+    state = { 'server' : -1, 'sampler' : -1, 'unix' : -1, 'unix_path' : gUnixPath, 'devices' : [], 'captures' : gCaptures }
+    try:
+        state['server'] = inherit_fd(gServer.sockets[0])
+        if gSampler != None:
+            state['sampler'] = inherit_fd(gSampler.get_extra_info('socket'))
+        if gUnixServer != None:
+            state['unix'] = inherit_fd(gUnixServer.sockets[0])
+        sessions = [ session for session in gDevices.values() if not session.writer.is_closing() ]
+        for session in sessions:
+            session.writer.transport.pause_reading()
+        # bytes the reader buffered before the pause moved to the receive buffers of sessions
+        await asyncio.sleep(GW_RESUME_POLL_TIME)
+        for session in sessions:
+            dev = session.state()
+            dev['fd'] = inherit_fd(session.writer.get_extra_info('socket'))
+            state['devices'].append(dev)
+    except Exception as e:
+        print ('AIO-S> gateway handover error "%r"' % (e), flush=True)
+        gateway_resume( handover_fds(state) )
+        return None
+    #
+    return state
+
+#############################################
+# take over listening sockets and devices of the previous process
+#
+async def gateway_adopt(state):
+    global gServer
+    global gSampler
+    global gUnixServer
+    global gUnixPath
+    #
+    socks = { fd : socket.socket(fileno=fd) for fd in handover_fds(state) }
+    try:
+        gServer = await asyncio.start_server(device_handler, sock=socks[state['server']], backlog=GW_BACKLOG)
+        print ("AIO-S> gateway listening %s:%d; handed over" % gServer.sockets[0].getsockname()[0:2], flush=True)
+        if state['sampler'] >= 0:
+            gSampler, protocol = await gLoop.create_datagram_endpoint(SampleProtocol, sock=socks[state['sampler']])
+            gCaps.append(PROTO.CAP_UDP)
+            print ("AIO-S> gateway listening STE samples %s:%d/udp; handed over" % gSampler.get_extra_info('sockname')[0:2], flush=True)
+        if state['unix'] >= 0:
+            gUnixServer = await asyncio.start_unix_server(device_handler, sock=socks[state['unix']], backlog=GW_BACKLOG)
+            gUnixPath = state['unix_path']
+            print ("AIO-S> gateway listening unix:%s; handed over" % gUnixPath, flush=True)
+        for dev in state['devices']:
+            reader, writer = await asyncio.open_connection(sock=socks[dev['fd']])
+            session = DeviceSession(reader, writer)
+            session.restore(dev)
+            gDevices[session.dev_id] = session
+            gLoop.create_task( device_serve(session) )
+            print ("AIO-S> device [%s] %s %r handed over; %d device(s)" %
+                   (session.dev_id, session.sensor, session.caps, len(gDevices)), flush=True)
+        gCaptures.update(state['captures'])
+    except:
+        # back to a fresh start; devices reconnect
+        for session in list(gDevices.values()):
+            session.writer.close()
+        gDevices.clear()
+        for server in (gServer, gSampler, gUnixServer):
+            if server != None:
+                server.close()
+        gServer = gSampler = gUnixServer = None
+        for sock in socks.values():
+            sock.close()
+        raise
+
+#############################################
+# listen on host:port, UDP and AF_UNIX path; returns False if TCP binding failed
+#
+def gateway_bind(host, port, udp, unix_path):
+    global gServer
+    global gSampler
+    global gUnixServer
+    global gUnixPath
+    #
+    try:
+        gServer = gLoop.run_until_complete(
+                    asyncio.start_server(device_handler, host, port, backlog=GW_BACKLOG) )
+    except Exception as e:
+        print ('AIO-S> gateway binding %s:%d fail "%r"' % (host, port, e), flush=True)
+        gServer = None
+        return False
+    print ("AIO-S> gateway listening %s:%d" % (host, port), flush=True)
+    if udp:
+        try:
+            gSampler, protocol = gLoop.run_until_complete(
+                        gLoop.create_datagram_endpoint(SampleProtocol, local_addr=(host, port)) )
+            gCaps.append(PROTO.CAP_UDP)
+            print ("AIO-S> gateway listening STE samples %s:%d/udp" % (host, port), flush=True)
+        except Exception as e:
+            print ('AIO-S> gateway binding %s:%d/udp fail "%r"; no STE sample push' % (host, port, e), flush=True)
+            gSampler = None
+    if unix_path != '':
+        try:
+            # stale socket file of the last run
+            if os.path.exists(unix_path) and stat.S_ISSOCK(os.stat(unix_path).st_mode):
+                os.unlink(unix_path)
+            gUnixServer = gLoop.run_until_complete(
+                        asyncio.start_unix_server(device_handler, unix_path, backlog=GW_BACKLOG) )
+            gUnixPath = unix_path
+            print ("AIO-S> gateway listening unix:%s" % unix_path, flush=True)
+        except Exception as e:
+            print ('AIO-S> gateway binding unix:%s fail "%r"' % (unix_path, e), flush=True)
+            gUnixServer = None
+    #
+    return True
+
+#############################################
+# gateway thread main; takes over the previous process if handover state given
+#
+def gateway_main(host, port, udp, unix_path, handover, ready):
+    asyncio.set_event_loop(gLoop)
+    if handover != None:
+        try:
+            gLoop.run_until_complete( gateway_adopt(handover) )
+        except Exception as e:
+            print ('AIO-S> gateway handover fail "%r"; devices dropped' % (e), flush=True)
+            handover = None
+    if handover == None and not gateway_bind(host, port, udp, unix_path):
+        ready.set()
+        return
+    gLoop.create_task( gateway_heartbeat() )
+    ready.set()
+    gLoop.run_forever()
+
+#############################################
+#############################################
+#
+# gateway functions; called from flask threads
+#
+#############################################
+# run a coroutine in the gateway thread and wait the result
+#
+def run_in_gateway(coro, timeout = None):
+    if gLoop == None or gServer == None:
+        coro.close()
+        return None
+    future = asyncio.run_coroutine_threadsafe(coro, gLoop)
+    try:
+        return future.result(timeout)
+    except Exception as e:
+        future.cancel()
+        print ('AIO-S> gateway call error "%r"' % (e), flush=True)
+        return None
+
+#############################################
+# start gateway thread to accept devices
+#
+def open_gateway(host, port, dead_time = GW_DEAD_TIME, compress = True, udp = True, unix_path = '', record_path = '',
+                 history_path = '', alert_path = ''):
+    global gLoop
+    global gThread
+    global gDeadTime
+    global gCaps
+    global gRecorder
+    global gHistory
+    global gAlerts
+    #
+    if alert_path != '':
+        try:
+            gAlerts = ALERT.AlertEngine(alert_path)
+            gAlerts.start()
+        except Exception as e:
+            print ('AIO-S> gateway alert rules "%s" error "%r"' % (alert_path, e), flush=True)
+            gAlerts = None
+    if history_path != '':
+        try:
+            gHistory = HISTORY.HistoryStore(history_path)
+            gHistory.start()
+        except Exception as e:
+            print ('AIO-S> gateway history "%s" error "%r"' % (history_path, e), flush=True)
+            gHistory = None
+    if record_path != '':
+        try:
+            gRecorder = open(record_path, 'ab')
+            print ('AIO-S> gateway recording session to "%s"' % record_path, flush=True)
+        except Exception as e:
+            print ('AIO-S> gateway session record "%s" error "%r"' % (record_path, e), flush=True)
+            gRecorder = None
+    gDeadTime = dead_time
+    gCaps = [PROTO.CAP_ZLIB] if compress else []
+    # state of the previous process handing over
+    handover = None
+    state_path = os.environ.pop(GW_HANDOVER_ENV, '')
+    if state_path != '':
+        try:
+            with open(state_path) as f:
+                handover = json.load(f)
+            os.unlink(state_path)
+        except Exception as e:
+            print ('AIO-S> gateway handover state "%s" error "%r"' % (state_path, e), flush=True)
+    ready = threading.Event()
+    gLoop = asyncio.new_event_loop()
+    gThread = threading.Thread(target=gateway_main, args=(host, port, udp, unix_path, handover, ready), daemon=True)
+    gThread.start()
+    ready.wait(GW_OPEN_WAIT_TIME)
+    #
+    return gServer != None
+
+#############################################
+# stop gateway and close all devices
+#
+def close_gateway():
+    global gServer
+    #
+    if gLoop == None or gServer == None:
+        return
+    for dev_id in list(gDevices):
+        run_in_gateway(device_close(dev_id), GW_OPEN_WAIT_TIME)
+    gLoop.call_soon_threadsafe(gServer.close)
+    if gSampler != None:
+        gLoop.call_soon_threadsafe(gSampler.close)
+    if gUnixServer != None:
+        gLoop.call_soon_threadsafe(gUnixServer.close)
+    gLoop.call_soon_threadsafe(gLoop.stop)
+    gThread.join(GW_OPEN_WAIT_TIME)
+    gServer = None
+    stop_recording()
+    if gHistory != None:
+        gHistory.close()
+    if gAlerts != None:
+        gAlerts.close()
+    if gUnixPath != '' and os.path.exists(gUnixPath):
+        os.unlink(gUnixPath)
+    print ("AIO-S> gateway closed", flush=True)
+
+#############################################
+# hand over gateway to a new process; devices kept connected
+# sockets left open and inheritable, state saved to the file named by GW_HANDOVER_ENV
+# caller should exec the new process at once; returns False if failed and gateway goes on
+#
+def handover_gateway(state_path):
+    if gLoop == None or gServer == None:
+        return False
+    print ("AIO-S> gateway handing over %d device(s) => " % len(gDevices), end='', flush=True)
+    state = run_in_gateway(gateway_handover(), GW_HANDOVER_WAIT_TIME + GW_OPEN_WAIT_TIME)
+    if state == None:
+        print ("error !", flush=True)
+        return False
+    try:
+        with open(state_path, 'w') as f:
+            json.dump(state, f)
+    except Exception as e:
+        print ('error "%r" !' % (e), flush=True)
+        gLoop.call_soon_threadsafe(gateway_resume, handover_fds(state))
+        return False
+    os.environ[GW_HANDOVER_ENV] = state_path
+    if gRecorder != None:
+        gRecorder.flush()
+    # rows waiting written; the new process appends after them
+    if gHistory != None:
+        gHistory.close()
+    if gAlerts != None:
+        gAlerts.close()
+    print ('state saved to "%s"' % state_path, flush=True)
+    return True
+
+#############################################
+# find device identity; default device if not given
+#
+def find_device(dev_id = None, addr = None):
+    devices = list(gDevices.values())
+    for session in devices:
+        if dev_id != None and dev_id != '':
+            if session.dev_id == dev_id:
+                return session.dev_id
+        elif addr != None:
+            if session.addr == addr:
+                return session.dev_id
+        else:
+            return session.dev_id
+    return None
+
+#############################################
+# list devices connected
+#
+def list_devices():
+    return [ session.info() for session in list(gDevices.values()) ]
+
+#############################################
+# latest STE sample pushed by a device; None if not pushed within max_age
+#
+def latest_sample(dev_id, max_age):
+    session = gDevices.get(dev_id)
+    if session == None or session.sample == None:
+        return None
+    rx_time, seq, row = session.sample
+    if time.time() - rx_time > max_age:
+        return None
+    return row
+
+#############################################
+# send a command to a device not waiting the reply
+#
+def write_to_device(dev_id, tx_msg, timeout = GW_REPLY_WAIT_TIME):
+    print ("AIO-S> [TX] [%s] try => " % dev_id, end = '', flush=True)
+    if run_in_gateway(device_send(dev_id, tx_msg, timeout), GW_TX_WAIT_TIME + 1.) != None:
+        print ('"%r" sent to WSN client' % tx_msg, flush=True)
+        return True
+    print ('error !', flush=True)
+    return False
+
+#############################################
+# send a command to a device and wait the reply
+# returns reply message, '' if refused, None if timeout or disconnected
+#
+def command_device(dev_id, tx_msg, timeout = GW_REPLY_WAIT_TIME):
+    print ('AIO-S> [TX/RX] [%s] "%r" => ' % (dev_id, tx_msg), end = '', flush=True)
+    rx_msg = run_in_gateway(device_request(dev_id, tx_msg, timeout), timeout + GW_TX_WAIT_TIME + 1.)
+    if rx_msg == None:
+        print ("timeout !", flush=True)
+        return None
+    n = len(rx_msg)
+    if n < 40:
+        print ('received "%r"' % rx_msg, flush=True)
+    else:
+        print ('received "%r"...; %d bytes' % (rx_msg[0:40], n), flush=True)
+    return rx_msg
+
+#############################################
+# pull a bulk data from a device; window of chunk requests in flight
+# resumes from the offset acknowledged if the device reconnects in a while
+# returns list of chunks and transfer stats, None if failed
+#
+def bulk_from_device(dev_id, info_msg, req_msg, ack_msg, timeout = GW_REPLY_WAIT_TIME,
+                     chunk = GW_BULK_CHUNK, window = GW_BULK_WINDOW):
+    print ('AIO-S> [BULK] [%s] "%r" => ' % (dev_id, req_msg), flush=True)
+    return run_in_gateway(device_bulk(dev_id, info_msg, req_msg, ack_msg, timeout, chunk, window), None)
+
+#############################################
+# close a device
+#
+def close_device(dev_id):
+    run_in_gateway(device_close(dev_id), GW_OPEN_WAIT_TIME)
+
+#############################################
+# get a value shared by flask workers
+#
+def get_shared(name, default = None):
+    with gSharedLock:
+        return gShared.get(name, default)
+
+#############################################
+# set a value shared by flask workers
+#
+def set_shared(name, value):
+    with gSharedLock:
+        gShared[name] = value
+
+#############################################
+# take or renew a lease of a device for ttl seconds
+# refused if a lease of busy names is held by another owner, or by the owner under another name
+# returns True if taken
+#
+def acquire_lease(dev_id, name, owner, ttl, busy_names):
+    with gSharedLock:
+        t = time.time()
+        leases = gLeases.setdefault(dev_id, {})
+        for busy in busy_names:
+            lease = leases.get(busy)
+            if lease == None:
+                continue
+            if lease[1] <= t:
+                print ('AIO-S> device [%s] lease "%s" of [%s] expired' % (dev_id, busy, lease[0]), flush=True)
+                del leases[busy]
+            elif lease[0] != owner or busy != name:
+                return False
+        leases[name] = (owner, t + ttl)
+        return True
+
+#############################################
+# release a lease of a device; returns True if it was held by the owner
+#
+def release_lease(dev_id, name, owner):
+    with gSharedLock:
+        leases = gLeases.get(dev_id, {})
+        lease = leases.get(name)
+        if lease == None or lease[0] != owner:
+            return False
+        del leases[name]
+        if len(leases) == 0:
+            del gLeases[dev_id]
+        return True
+
+#############################################
+# owner of a lease of a device; None if not held or expired
+#
+def lease_holder(dev_id, name):
+    with gSharedLock:
+        lease = gLeases.get(dev_id, {}).get(name)
+        if lease == None or lease[1] <= time.time():
+            return None
+        return lease[0]
+
+#############################################
+# leases held on a device; owner and seconds left keyed by lease name
+#
+def list_leases(dev_id):
+    with gSharedLock:
+        t = time.time()
+        return { name : { 'owner' : lease[0], 'left' : round(lease[1] - t, 1) }
+                 for name, lease in gLeases.get(dev_id, {}).items() if lease[1] > t }
+
+#############################################
+# run a capture job in background; leases of the owner released when finished, bulk chunks kept as result_name
+# returns job id, None if device unknown or its queue full
+#
+def submit_job(dev_id, steps, owner = '', leases = [], result_name = ''):
+    return run_in_gateway(job_submit(dev_id, steps, owner, leases, result_name), GW_OPEN_WAIT_TIME)
+
+#############################################
+# status of a job; bytes pulled so far while its bulk step runs, None if unknown
+#
+def job_status(job_id):
+    return run_in_gateway(job_snapshot(job_id), GW_OPEN_WAIT_TIME)
+
+#############################################
+# chunks and transfer stats of a job done, None if not done
+#
+def job_result(job_id):
+    return gJobResults.get(job_id)
+
+#############################################
+# frequency spectrum of the bulk step of a job done, None if not done or not parsed
+#
+def job_spectrum(job_id):
+    return gJobSpectra.get(job_id)
+
+#############################################
+# subscribe to the shared STE sampler of a device for ttl seconds; renewed by subscribing again
+# start_msg and stop_msg sent when sampling starts and stops, req_msg requests a row
+# returns number of subscribers, None if device unknown
+#
+def subscribe_samples(dev_id, owner, start_msg, stop_msg, req_msg, interval, ttl):
+    return run_in_gateway(sampler_subscribe(dev_id, owner, start_msg, stop_msg, req_msg, interval, ttl), GW_OPEN_WAIT_TIME)
+
+#############################################
+# leave the STE sampler of a device; stopped at once if none left
+# returns number of subscribers left
+#
+def unsubscribe_samples(dev_id, owner):
+    rtn = run_in_gateway(sampler_unsubscribe(dev_id, owner), GW_OPEN_WAIT_TIME)
+    return rtn if rtn != None else 0
+
+#############################################
+# latest STE row sampled from a device with its time, sequence, subscribers and anomaly status; None if not sampled
+# waits up to timeout for a row newer than seq if seq given
+#
+def sampled_row(dev_id, seq = None, timeout = 0.):
+    if seq != None:
+        return run_in_gateway(sampler_wait(dev_id, seq, timeout), timeout + GW_OPEN_WAIT_TIME)
+    sampler = gSamplers.get(dev_id)
+    if sampler == None or sampler['row'] == None:
+        return None
+    return { 'row'     : sampler['row'],
+             'time'    : sampler['time'],
+             'seq'     : sampler['seq'],
+             'viewers' : len(sampler['subs']),
+             'reads'   : sampler['reads'],
+             'anomaly' : sampler['anomaly'] }
+
+#############################################
+# status and scores of the latest STE row of a device; None if none scored
+#
+def device_anomaly(dev_id):
+    return gAnomalies.get(dev_id)
+
+#############################################
+# evaluate band rules on a spectrum of a device; x in Hz, y amplitude
+# evaluated on the gateway thread as STE rows are, the caller not waiting
+#
+def alert_spectrum(dev_id, x, y):
+    if gAlerts == None or gLoop == None:
+        return False
+    gLoop.call_soon_threadsafe(gAlerts.on_spectrum, dev_id, time.time(), x, y)
+    return True
+
+#############################################
+# counts, detection to delivery latency, active and recent alerts; None if no alert rules path
+#
+def alert_status():
+    if gAlerts == None:
+        return None
+    return gAlerts.status()
+
+#############################################
+# trend of STE rows of a device in the last seconds; fields, stats and series of points buckets
+# None if none kept
+#
+def ste_trend(dev_id, seconds, points):
+    ring = gTrends.get(dev_id)
+    if ring == None:
+        return None
+    now = time.time()
+    trend = { 'dev' : dev_id, 'window' : seconds, 'fields' : STE.STE_FIELDS }
+    trend.update(ring.stats(seconds, now))
+    trend.update(ring.series(seconds, points, now))
+    return trend
+
+#############################################
+# trend of STE rows of a device between start and end from history on disk; as ste_trend
+# with bucket size of rollup read, 0 for raw rows, and min and max of each point
+# None if no history path
+#
+def ste_history(dev_id, start, end, points):
+    if gHistory == None:
+        return None
+    step, buckets = gHistory.trend(dev_id, start, end, points)
+    total = HISTORY.reduce_rollups(buckets, start, end, 1)
+    trend = { 'dev' : dev_id, 'window' : end - start, 'fields' : STE.STE_FIELDS, 'step' : step,
+              'count' : int(total['n'].sum()) }
+    for key in ('mean', 'max', 'var'):
+        trend[key] = total[key][0].astype(float).round(4).tolist() if len(total) > 0 else []
+    trend['t'] = (buckets['t'] - time.time()).round(1).tolist()
+    trend['y'] = buckets['mean'].T.astype(float).round(4).tolist()
+    trend['ymin'] = buckets['min'].T.astype(float).round(4).tolist()
+    trend['ymax'] = buckets['max'].T.astype(float).round(4).tolist()
+    return trend
+#
+#############################################
@@ -0,0 +1,340 @@
+"""
+wsn_gateway in a process of its own, reached by flask workers over a local AF_UNIX socket
+coded functions as below
+- gateway process owns every WSN client connection; flask workers hold none
+    python wsn_gateway_rpc.py runs wsn_gateway and answers calls on RPC_PATH
+- calls framed by wsn_protocol on the RPC socket
+    FRAME_CMD  : JSON {"fn": gateway function, "args": [arguments]}, req_id counted per connection
+    FRAME_DATA : JSON of the return value, FRAME_NAK : error of the call
+- only gateway functions of RPC_CALLS answered
+- client side has the same functions as wsn_gateway; a server takes it in place of wsn_gateway
+    one connection per thread, made again in a worker forked from the process that made it
+    open_gateway() starts the gateway process if none answers on RPC_PATH, else attaches to it
+    handover_gateway() has nothing to hand over; devices stay with the gateway process across restart
+- leases of devices and the last capture kept in the gateway process; every worker sees the same ones
+- capture jobs run in the gateway process; a job started by a worker is reported to any worker
+
+usage: python wsn_gateway_rpc.py host port [unix socket path] [session record file] [rpc path]
+                                 [dead time] [zlib 0|1] [udp 0|1] [history path] [alert rules path]
+       import wsn_gateway_rpc as GW
+       GW.attach(path); GW.open_gateway(host, port) then GW.command_device(), GW.write_to_device(), ...
+
+                    started 2026-10-18
+                    updated 2026-10-18; capture jobs
+                    updated 2026-10-18; device leases
+                    updated 2026-10-18; shared STE sampler, waiting a new sampled row
+                    updated 2026-10-18; STE trend
+                    updated 2026-10-18; STE history
+                    updated 2026-10-18; anomaly status of devices
+                    updated 2026-10-18; alert rules on STE rows and spectra
+"""
+import json
+import os
+import socket
+import socketserver
+import subprocess
+import sys
+import threading
+import time
+
+import wsn_gateway as GATEWAY
+import wsn_protocol as PROTO
+
+#############################################
+# target definitions to gateway process
+#############################################
+#
+RPC_ENV           = 'WSN_GATEWAY_RPC'        # environment variable naming RPC path to flask workers
+RPC_PATH          = '/tmp/wsn_gateway.rpc'   # default AF_UNIX socket path of gateway process
+RPC_OPEN_WAIT_TIME = 10.                     # time period to wait gateway process answering
+RPC_POLL_TIME     = 0.2                      # time interval to check gateway process answering
+RPC_CALLS         = ('find_device', 'list_devices', 'latest_sample', 'write_to_device', 'command_device',
+                     'bulk_from_device', 'close_device', 'get_shared', 'set_shared', 'acquire_lease',
+                     'release_lease', 'lease_holder', 'list_leases', 'submit_job', 'job_status', 'job_result',
+                     'job_spectrum', 'subscribe_samples', 'unsubscribe_samples', 'sampled_row', 'ste_trend',
+                     'ste_history', 'device_anomaly', 'alert_spectrum', 'alert_status', 'close_gateway')
+#
+# global variables
+#
+gPath       = RPC_PATH  # AF_UNIX socket path of gateway process
+gLocal      = threading.local()  # per thread connection; sock, pid made in, req_id
+gServer     = None  # RPC server of gateway process
+
+#############################################
+#############################################
+#
+# gateway process side
+#
+#############################################
+# answer calls of one flask worker connection
+#
+class RpcHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        while True:
+            try:
+                ftype, flags, req_id, payload = PROTO.recv_frame(self.request)
+            except (OSError, ValueError):
+                return
+            fn = None
+            try:
+                call = json.loads(payload)
+                fn = call['fn']
+                if fn not in RPC_CALLS:
+                    raise ValueError('unknown call "%s"' % fn)
+                rtn = getattr(GATEWAY, fn)(*call['args'])
+                frame = PROTO.pack_frame(PROTO.FRAME_DATA, json.dumps(rtn), req_id)
+            except Exception as e:
+                print ('RPC-S> call "%s" error "%r"' % (fn, e), flush=True)
+                frame = PROTO.pack_frame(PROTO.FRAME_NAK, repr(e), req_id)
+            try:
+                self.request.sendall(frame)
+            except OSError:
+                return
+            if fn == 'close_gateway':
+                threading.Thread(target=gServer.shutdown, daemon=True).start()
+                return
+
+#############################################
+# RPC server; a thread per flask worker connection
+#
+class RpcServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+#############################################
+# run gateway and answer calls till close_gateway
+#
+def serve_gateway(host, port, dead_time, compress, udp, unix_path, record_path, path, history_path = '', alert_path = ''):
+    global gServer
+    #
+    if os.path.exists(path):
+        os.unlink(path)
+    if not GATEWAY.open_gateway(host, port, dead_time, compress, udp, unix_path, record_path, history_path, alert_path):
+        print ('RPC-S> gateway open fail... Exiting...', flush=True)
+        return False
+    gServer = RpcServer(path, RpcHandler)
+    print ('RPC-S> gateway process %d answering on "%s"' % (os.getpid(), path), flush=True)
+    try:
+        gServer.serve_forever()
+    except KeyboardInterrupt:
+        GATEWAY.close_gateway()
+    gServer.server_close()
+    if os.path.exists(path):
+        os.unlink(path)
+    print ('RPC-S> gateway process done', flush=True)
+    return True
+
+#############################################
+#############################################
+#
+# flask worker side
+#
+#############################################
+# name RPC path of gateway process to call
+#
+def attach(path):
+    global gPath
+    #
+    gPath = path
+    os.environ[RPC_ENV] = path
+
+#############################################
+# drop connection of this thread
+#
+def disconnect():
+    sock = getattr(gLocal, 'sock', None)
+    gLocal.sock = None
+    if sock != None and getattr(gLocal, 'pid', None) == os.getpid():
+        sock.close()
+
+#############################################
+# call a gateway function in gateway process; connects again once if the call could not be sent
+# not sent again once sent; the gateway process may have run it, a command or a job twice otherwise
+# returns the return value, None if failed
+#
+def rpc_call(fn, *args):
+    frame = json.dumps({ 'fn' : fn, 'args' : args })
+    for attempt in range(2):
+        # connection made before fork is the parent's one
+        if getattr(gLocal, 'sock', None) != None and gLocal.pid != os.getpid():
+            gLocal.sock = None
+        try:
+            if getattr(gLocal, 'sock', None) == None:
+                sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                sock.connect(gPath)
+                gLocal.sock = sock
+                gLocal.pid = os.getpid()
+                gLocal.req_id = 0
+            gLocal.req_id = gLocal.req_id % 0xffffffff + 1
+            gLocal.sock.sendall( PROTO.pack_frame(PROTO.FRAME_CMD, frame, gLocal.req_id) )
+        except OSError as e:
+            # connection lost before the call reached the gateway process
+            disconnect()
+            error = e
+            continue
+        try:
+            ftype, flags, req_id, payload = PROTO.recv_frame(gLocal.sock)
+        except (OSError, ValueError) as e:
+            disconnect()
+            print ('RPC-C> call "%s" sent, no reply "%r"' % (fn, e), flush=True)
+            return None
+        if ftype == PROTO.FRAME_NAK:
+            print ('RPC-C> call "%s" refused "%s"' % (fn, payload.decode()), flush=True)
+            return None
+        return json.loads(payload)
+    print ('RPC-C> call "%s" error "%r"' % (fn, error), flush=True)
+    return None
+
+#############################################
+# gateway process answering on RPC path
+#
+def gateway_alive():
+    try:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.connect(gPath)
+        sock.close()
+        return True
+    except OSError:
+        return False
+
+#############################################
+# attach to gateway process, started if none answers
+#
+def open_gateway(host, port, dead_time = GATEWAY.GW_DEAD_TIME, compress = True, udp = True, unix_path = '', record_path = '',
+                 history_path = '', alert_path = ''):
+    if gateway_alive():
+        print ('RPC-C> gateway process found on "%s"' % gPath, flush=True)
+        return True
+    print ('RPC-C> starting gateway process on "%s" => ' % gPath, end='', flush=True)
+    # own session; Ctrl-C on the server does not reach it, close_gateway() does
+    subprocess.Popen( [sys.executable, os.path.abspath(__file__), host, str(port), unix_path, record_path, gPath,
+                       str(dead_time), '1' if compress else '0', '1' if udp else '0', history_path,
+                       alert_path],
+                      start_new_session=True )
+    t = time.time()
+    while time.time() - t < RPC_OPEN_WAIT_TIME:
+        if gateway_alive():
+            print ('started', flush=True)
+            return True
+        time.sleep(RPC_POLL_TIME)
+    print ('timeout !', flush=True)
+    return False
+
+#############################################
+# stop gateway process and close all devices
+#
+def close_gateway():
+    rpc_call('close_gateway')
+    disconnect()
+
+#############################################
+# nothing to hand over; devices stay with gateway process while the server restarts
+#
+def handover_gateway(state_path):
+    disconnect()
+    return True
+
+#############################################
+# gateway functions called in gateway process; see wsn_gateway
+#
+def find_device(dev_id = None, addr = None):
+    return rpc_call('find_device', dev_id, addr)
+
+def list_devices():
+    rtn = rpc_call('list_devices')
+    return rtn if rtn != None else []
+
+def latest_sample(dev_id, max_age):
+    return rpc_call('latest_sample', dev_id, max_age)
+
+def write_to_device(dev_id, tx_msg, timeout = GATEWAY.GW_REPLY_WAIT_TIME):
+    return rpc_call('write_to_device', dev_id, tx_msg, timeout) == True
+
+def command_device(dev_id, tx_msg, timeout = GATEWAY.GW_REPLY_WAIT_TIME):
+    return rpc_call('command_device', dev_id, tx_msg, timeout)
+
+def bulk_from_device(dev_id, info_msg, req_msg, ack_msg, timeout = GATEWAY.GW_REPLY_WAIT_TIME,
+                     chunk = GATEWAY.GW_BULK_CHUNK, window = GATEWAY.GW_BULK_WINDOW):
+    return rpc_call('bulk_from_device', dev_id, info_msg, req_msg, ack_msg, timeout, chunk, window)
+
+def close_device(dev_id):
+    rpc_call('close_device', dev_id)
+
+def get_shared(name, default = None):
+    rtn = rpc_call('get_shared', name, default)
+    return rtn if rtn != None else default
+
+def set_shared(name, value):
+    rpc_call('set_shared', name, value)
+
+def acquire_lease(dev_id, name, owner, ttl, busy_names):
+    return rpc_call('acquire_lease', dev_id, name, owner, ttl, busy_names) == True
+
+def release_lease(dev_id, name, owner):
+    return rpc_call('release_lease', dev_id, name, owner) == True
+
+def lease_holder(dev_id, name):
+    return rpc_call('lease_holder', dev_id, name)
+
+def list_leases(dev_id):
+    rtn = rpc_call('list_leases', dev_id)
+    return rtn if rtn != None else {}
+
+def submit_job(dev_id, steps, owner = '', leases = [], result_name = ''):
+    return rpc_call('submit_job', dev_id, steps, owner, leases, result_name)
+
+def job_status(job_id):
+    return rpc_call('job_status', job_id)
+
+def job_result(job_id):
+    return rpc_call('job_result', job_id)
+
+def job_spectrum(job_id):
+    return rpc_call('job_spectrum', job_id)
+
+def subscribe_samples(dev_id, owner, start_msg, stop_msg, req_msg, interval, ttl):
+    return rpc_call('subscribe_samples', dev_id, owner, start_msg, stop_msg, req_msg, interval, ttl)
+
+def unsubscribe_samples(dev_id, owner):
+    rtn = rpc_call('unsubscribe_samples', dev_id, owner)
+    return rtn if rtn != None else 0
+
+def sampled_row(dev_id, seq = None, timeout = 0.):
+    return rpc_call('sampled_row', dev_id, seq, timeout)
+
+def device_anomaly(dev_id):
+    return rpc_call('device_anomaly', dev_id)
+
+def ste_trend(dev_id, seconds, points):
+    return rpc_call('ste_trend', dev_id, seconds, points)
+
+def ste_history(dev_id, start, end, points):
+    return rpc_call('ste_history', dev_id, start, end, points)
+
+def alert_spectrum(dev_id, x, y):
+    return rpc_call('alert_spectrum', dev_id, x, y) == True
+
+def alert_status():
+    return rpc_call('alert_status')
+
+#############################################
+#############################################
+#
+# Main starts here
+#
+#############################################
+#
+if __name__ == '__main__':
+    if len(sys.argv) < 3:
+        print (__doc__)
+        sys.exit(1)
+    serve_gateway( sys.argv[1], int(sys.argv[2]),
+                   float(sys.argv[6]) if len(sys.argv) > 6 else GATEWAY.GW_DEAD_TIME,
+                   sys.argv[7] != '0' if len(sys.argv) > 7 else True,
+                   sys.argv[8] != '0' if len(sys.argv) > 8 else True,
+                   sys.argv[3] if len(sys.argv) > 3 else '',
+                   sys.argv[4] if len(sys.argv) > 4 else '',
+                   sys.argv[5] if len(sys.argv) > 5 else RPC_PATH,
+                   sys.argv[9] if len(sys.argv) > 9 else '',
+                   sys.argv[10] if len(sys.argv) > 10 else '' )
+#
+#############################################
@@ -0,0 +1,460 @@
+"""
+persistent STE history of devices in append-only daily segment files
+coded functions as below
+- a directory per device, a segment file per day of local time
+    YYYYMMDD.seg : fixed size records; unix time float64, 11 STE values float32; 52 bytes
+    YYYYMMDD.idx : time of every HIST_INDEX_EVERY'th record of the segment, float64
+- rows appended by a writer thread in batches; the caller never waits for disk
+    rows not newer than the last one of the device dropped
+    segment rotated when a row of the next day comes; files of past days closed
+    a record cut by a crash truncated, index rebuilt from the segment if not matching on open
+- range query of columns; days of the range only, index searched for the first and last blocks
+    segment mapped by numpy memmap, rows of the blocks sliced; no scan of the rest
+- compaction in the writer thread; segments older than HIST_COMPACT_DAYS averaged per HIST_COMPACT_STEP
+    YYYYMMDD.c.seg and YYYYMMDD.c.idx written aside then the raw ones removed
+- rollups of HIST_ROLLUP_STEPS buckets per device updated by the writer as rows come
+    rollup_<step>.seg : bucket start time, count, min, max, mean and variance of each field; sorted by time
+    the bucket being filled is the last record of the file, written again in place as rows come
+    nothing of it lost by a crash but rows not flushed; filled on when the store opens again in the same bucket
+- trend query picks the coarsest rollup still giving the points asked; raw rows if none does
+    segment and rollup files read under the store lock the writer holds while it writes or compacts
+
+usage: import wsn_history as HISTORY
+       store = HISTORY.HistoryStore(path); store.start()
+       store.append(dev_id, t, values); store.query(dev_id, start, end); store.close()
+
+                    started 2026-10-18
+                    updated 2026-10-18; multi-resolution rollups and trend query on them
+                    updated 2026-10-18; bucket being filled kept on disk, rollups read under lock
+                    updated 2026-10-18; segments read under lock, trend from the bucket start is in
+"""
+import datetime
+import os
+import queue
+import threading
+import time
+
+import numpy as np
+
+import wsn_ste as STE
+
+#############################################
+# target definitions to history store
+#############################################
+#
+HIST_RECORD       = np.dtype([('t', '<f8'), ('v', '<f4', (len(STE.STE_FIELDS),))])  # segment record
+HIST_INDEX_EVERY  = 256               # records per index entry
+HIST_QUEUE        = 10000             # rows waiting the writer; dropped when full
+HIST_FLUSH_TIME   = 1.                # time interval the writer flushes rows waiting
+HIST_COMPACT_DAYS = 7                 # days kept raw; older segments compacted
+HIST_COMPACT_STEP = 60.               # time step in seconds of compacted segments
+HIST_COMPACT_INTERVAL = 3600.         # time interval of compaction runs
+HIST_ROLLUP_STEPS = [10, 60, 3600]    # bucket sizes in seconds of rollups, finest first
+HIST_ROLLUP       = np.dtype([('t', '<f8'), ('n', '<u4'), ('min', '<f4', (len(STE.STE_FIELDS),)),
+                              ('max', '<f4', (len(STE.STE_FIELDS),)), ('mean', '<f4', (len(STE.STE_FIELDS),)),
+                              ('var', '<f4', (len(STE.STE_FIELDS),))])  # rollup record
+
+#############################################
+# day of a unix time as segment name
+#
+def day_name(t):
+    return datetime.datetime.fromtimestamp(t).strftime('%Y%m%d')
+
+#############################################
+#############################################
+#
+# segment of a device day being appended
+#
+#############################################
+class Segment:
+
+    def __init__(self, path):
+        self.path  = path
+        self.file  = open(path + '.seg', 'ab')
+        # a record cut by a crash
+        size = self.file.tell()
+        if size % HIST_RECORD.itemsize != 0:
+            self.file.truncate(size - size % HIST_RECORD.itemsize)
+            self.file.seek(0, os.SEEK_END)
+        self.count = self.file.tell() // HIST_RECORD.itemsize
+        self.last  = 0.
+        if self.count > 0:
+            self.last = float(np.memmap(path + '.seg', HIST_RECORD, 'r', shape=(self.count,))['t'][-1])
+        # index not matching the segment rebuilt
+        index = np.fromfile(path + '.idx', '<f8') if os.path.exists(path + '.idx') else np.zeros(0)
+        if len(index) != (self.count + HIST_INDEX_EVERY - 1) // HIST_INDEX_EVERY:
+            index = np.memmap(path + '.seg', HIST_RECORD, 'r', shape=(self.count,))['t'][::HIST_INDEX_EVERY] if self.count > 0 else np.zeros(0)
+            with open(path + '.idx', 'wb') as f:
+                f.write(np.ascontiguousarray(index, '<f8').tobytes())
+        self.index = open(path + '.idx', 'ab')
+
+    #############################################
+    # append records; index entries of the records starting a block
+    #
+    def append(self, records):
+        first = (-self.count) % HIST_INDEX_EVERY
+        self.file.write(records.tobytes())
+        self.index.write(np.ascontiguousarray(records['t'][first::HIST_INDEX_EVERY], '<f8').tobytes())
+        self.count += len(records)
+        self.last = float(records['t'][-1])
+
+    def flush(self):
+        self.file.flush()
+        self.index.flush()
+
+    def close(self):
+        self.file.close()
+        self.index.close()
+
+#############################################
+# records of a segment in a time range; index searched, blocks in range sliced from memmap
+#
+def read_segment(path, start, end):
+    if not os.path.exists(path + '.seg'):
+        return np.zeros(0, HIST_RECORD)
+    count = os.path.getsize(path + '.seg') // HIST_RECORD.itemsize
+    if count == 0:
+        return np.zeros(0, HIST_RECORD)
+    records = np.memmap(path + '.seg', HIST_RECORD, 'r', shape=(count,))
+    index = np.fromfile(path + '.idx', '<f8') if os.path.exists(path + '.idx') else np.zeros(0)
+    if len(index) > 0:
+        lo = max(0, np.searchsorted(index, start, 'right') - 1) * HIST_INDEX_EVERY
+        # rows after the last block indexed up to the end of the segment
+        last = np.searchsorted(index, end, 'right')
+        hi = count if last >= len(index) else min(count, last * HIST_INDEX_EVERY)
+    else:
+        lo, hi = 0, count
+    block = records[lo:hi]
+    return np.array(block[(block['t'] >= start) & (block['t'] <= end)])
+
+#############################################
+#############################################
+#
+# rollup of a device at a bucket size
+#
+#############################################
+class Rollup:
+
+    def __init__(self, path, step):
+        self.path  = path
+        self.step  = step
+        self.open  = np.zeros(0, HIST_ROLLUP)  # bucket being filled, the last record; none or one rollup record
+        open(path, 'ab').close()
+        self.file  = open(path, 'r+b')
+        self.count = os.path.getsize(path) // HIST_ROLLUP.itemsize  # records in the file
+        # a record cut by a crash dropped
+        self.file.truncate(self.count * HIST_ROLLUP.itemsize)
+        # last bucket filled on; the row coming may be in it
+        if self.count > 0:
+            self.file.seek((self.count - 1) * HIST_ROLLUP.itemsize)
+            self.open = np.frombuffer(self.file.read(HIST_ROLLUP.itemsize), HIST_ROLLUP).copy()
+
+    #############################################
+    # add rows in time order; the bucket being filled written again in place, later ones after it
+    #
+    def append(self, records):
+        buckets = rollup_records(records, self.step)
+        if len(self.open) > 0 and buckets['t'][0] == self.open['t'][0]:
+            buckets[:1] = merge_rollups(self.open, buckets[:1])
+            at = self.count - 1
+        else:
+            at = self.count
+        self.file.seek(at * HIST_ROLLUP.itemsize)
+        self.file.write(buckets.tobytes())
+        self.count = at + len(buckets)
+        self.open = buckets[-1:].copy()
+
+    def flush(self):
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+#############################################
+# rollup records of rows in time order at a bucket size
+#
+def rollup_records(records, step):
+    t = np.floor(records['t'] / step) * step
+    first = np.flatnonzero(np.r_[True, t[1:] != t[:-1]])
+    values = records['v'].astype(float)
+    n = np.diff(np.r_[first, len(records)])
+    buckets = np.zeros(len(first), HIST_ROLLUP)
+    buckets['t'] = t[first]
+    buckets['n'] = n
+    buckets['min'] = np.minimum.reduceat(values, first)
+    buckets['max'] = np.maximum.reduceat(values, first)
+    mean = np.add.reduceat(values, first) / n[:, None]
+    buckets['mean'] = mean
+    buckets['var'] = np.maximum(np.add.reduceat(values * values, first) / n[:, None] - mean * mean, 0.)
+    return buckets
+
+#############################################
+# buckets of rollups of the same time merged; counts, mean and variance of both
+#
+def merge_rollups(a, b):
+    merged = a.copy()
+    na, nb = a['n'].astype(float)[:, None], b['n'].astype(float)[:, None]
+    ma, mb = a['mean'].astype(float), b['mean'].astype(float)
+    n = na + nb
+    delta = mb - ma
+    merged['n'] = a['n'] + b['n']
+    merged['min'] = np.minimum(a['min'], b['min'])
+    merged['max'] = np.maximum(a['max'], b['max'])
+    merged['mean'] = ma + delta * nb / n
+    merged['var'] = (a['var'] * na + b['var'] * nb + delta * delta * na * nb / n) / n
+    return merged
+
+#############################################
+# rollup records of a time range at a bucket size; sorted file searched, no index needed
+# the bucket start is in taken too
+#
+def read_rollup(path, step, start, end):
+    if not os.path.exists(path):
+        return np.zeros(0, HIST_ROLLUP)
+    count = os.path.getsize(path) // HIST_ROLLUP.itemsize
+    if count == 0:
+        return np.zeros(0, HIST_ROLLUP)
+    buckets = np.memmap(path, HIST_ROLLUP, 'r', shape=(count,))
+    lo = np.searchsorted(buckets['t'], np.floor(start / step) * step, 'left')
+    hi = np.searchsorted(buckets['t'], end, 'right')
+    return np.array(buckets[lo:hi])
+
+#############################################
+# rollup records in time order reduced into points buckets of equal time between start and end
+# empty buckets left out
+#
+def reduce_rollups(buckets, start, end, points):
+    if len(buckets) == 0:
+        return buckets
+    index = np.clip( ((buckets['t'] - start) * points / max(end - start, 1e-3)).astype(int), 0, points - 1 )
+    first = np.flatnonzero(np.r_[True, index[1:] != index[:-1]])
+    w = buckets['n'].astype(float)
+    mean = buckets['mean'].astype(float)
+    n = np.add.reduceat(w, first)
+    sums = np.add.reduceat(mean * w[:, None], first) / n[:, None]
+    squares = np.add.reduceat((buckets['var'] + mean * mean) * w[:, None], first) / n[:, None]
+    reduced = np.zeros(len(first), HIST_ROLLUP)
+    reduced['t'] = np.add.reduceat(buckets['t'] * w, first) / n
+    reduced['n'] = n
+    reduced['mean'] = sums
+    reduced['var'] = np.maximum(squares - sums * sums, 0.)
+    reduced['min'] = np.minimum.reduceat(buckets['min'], first)
+    reduced['max'] = np.maximum.reduceat(buckets['max'], first)
+    return reduced
+
+#############################################
+#############################################
+#
+# history store of all devices
+#
+#############################################
+class HistoryStore:
+
+    def __init__(self, path):
+        self.path     = path
+        self.queue    = queue.Queue(HIST_QUEUE)
+        self.segments = {}    # segments being appended keyed by device identity; one day each
+        self.rollups  = {}    # rollups keyed by device identity then bucket size
+        self.last     = {}    # unix time of the last row keyed by device identity
+        self.lock     = threading.Lock()  # held by the writer while writing or compacting, by queries while reading
+        self.dropped  = 0     # rows dropped as the writer fell behind
+        self.thread   = None
+        self.compacted = 0.   # time of the last compaction run
+        os.makedirs(path, exist_ok=True)
+
+    #############################################
+    # directory of a device; address of TCP devices has ':'
+    #
+    def device_path(self, dev_id):
+        return os.path.join(self.path, dev_id.replace(':', '_').replace('/', '_'))
+
+    #############################################
+    # start writer thread
+    #
+    def start(self):
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+        print ('HIS-S> history store on "%s"' % self.path, flush=True)
+
+    #############################################
+    # queue a row to append; never waits
+    #
+    def append(self, dev_id, t, values):
+        try:
+            self.queue.put_nowait( (dev_id, t, values) )
+        except queue.Full:
+            self.dropped += 1
+
+    #############################################
+    # flush rows waiting and stop writer thread
+    #
+    def close(self):
+        if self.thread == None:
+            return
+        self.queue.put(None)
+        self.thread.join()
+        self.thread = None
+        print ('HIS-S> history store closed; %d rows dropped' % self.dropped, flush=True)
+
+    #############################################
+    # writer; rows waiting appended per device, segments flushed and compacted
+    #
+    def run(self):
+        while True:
+            rows = []
+            try:
+                rows.append(self.queue.get(timeout=HIST_FLUSH_TIME))
+                while len(rows) < HIST_QUEUE:
+                    rows.append(self.queue.get_nowait())
+            except queue.Empty:
+                pass
+            done = None in rows
+            try:
+                self.write([ row for row in rows if row != None ])
+                if time.time() - self.compacted > HIST_COMPACT_INTERVAL:
+                    self.compacted = time.time()
+                    self.compact()
+            except Exception as e:
+                print ('HIS-S> history store error "%r"' % (e), flush=True)
+            if done:
+                break
+        for segment in self.segments.values():
+            segment.close()
+        self.segments = {}
+        for rollups in self.rollups.values():
+            for rollup in rollups.values():
+                rollup.close()
+        self.rollups = {}
+
+    #############################################
+    # append rows to the segments of their days
+    #
+    def write(self, rows):
+        with self.lock:
+            self.write_rows(rows)
+
+    def write_rows(self, rows):
+        batches = {}
+        for dev_id, t, values in rows:
+            if t <= self.last.get(dev_id, 0.):
+                continue
+            self.last[dev_id] = t
+            batches.setdefault( (dev_id, day_name(t)), [] ).append( (t, values) )
+        for (dev_id, day), batch in batches.items():
+            segment = self.segment(dev_id, day)
+            records = np.array(batch, HIST_RECORD)
+            # rows older than the segment has, after a restart
+            records = records[records['t'] > segment.last]
+            if len(records) > 0:
+                segment.append(records)
+                for rollup in self.device_rollups(dev_id).values():
+                    rollup.append(records)
+        for segment in self.segments.values():
+            segment.flush()
+        for rollups in self.rollups.values():
+            for rollup in rollups.values():
+                rollup.flush()
+
+    #############################################
+    # rollups of a device, opened at first row
+    #
+    def device_rollups(self, dev_id):
+        rollups = self.rollups.get(dev_id)
+        if rollups == None:
+            os.makedirs(self.device_path(dev_id), exist_ok=True)
+            rollups = { step : Rollup(os.path.join(self.device_path(dev_id), 'rollup_%d.seg' % step), step)
+                        for step in HIST_ROLLUP_STEPS }
+            self.rollups[dev_id] = rollups
+        return rollups
+
+    #############################################
+    # segment of a device day; the one of another day closed
+    #
+    def segment(self, dev_id, day):
+        segment = self.segments.get(dev_id)
+        path = os.path.join(self.device_path(dev_id), day)
+        if segment != None and segment.path == path:
+            return segment
+        if segment != None:
+            segment.close()
+        os.makedirs(self.device_path(dev_id), exist_ok=True)
+        segment = Segment(path)
+        self.segments[dev_id] = segment
+        self.last[dev_id] = max(self.last.get(dev_id, 0.), segment.last)
+        return segment
+
+    #############################################
+    # compact raw segments older than HIST_COMPACT_DAYS; rows averaged per HIST_COMPACT_STEP
+    #
+    def compact(self):
+        oldest = day_name(time.time() - HIST_COMPACT_DAYS * 86400.)
+        for dev_dir in os.listdir(self.path):
+            dev_path = os.path.join(self.path, dev_dir)
+            if not os.path.isdir(dev_path):
+                continue
+            for fname in sorted(os.listdir(dev_path)):
+                day = fname[:-len('.seg')]
+                if not fname.endswith('.seg') or not day.isdigit() or day >= oldest:
+                    continue
+                with self.lock:
+                    self.compact_day(os.path.join(dev_path, day))
+
+    def compact_day(self, path):
+        records = np.fromfile(path + '.seg', HIST_RECORD)
+        if os.path.exists(path + '.c.seg'):
+            records = np.concatenate([ np.fromfile(path + '.c.seg', HIST_RECORD), records ])
+        compacted = np.zeros(0, HIST_RECORD)
+        if len(records) > 0:
+            step, inverse = np.unique(np.floor(records['t'] / HIST_COMPACT_STEP), return_inverse=True)
+            counts = np.bincount(inverse)
+            compacted = np.zeros(len(step), HIST_RECORD)
+            compacted['t'] = np.bincount(inverse, weights=records['t']) / counts
+            for n in range(len(STE.STE_FIELDS)):
+                compacted['v'][:, n] = np.bincount(inverse, weights=records['v'][:, n]) / counts
+            with open(path + '.c.seg.tmp', 'wb') as f:
+                f.write(compacted.tobytes())
+            with open(path + '.c.idx.tmp', 'wb') as f:
+                f.write(np.ascontiguousarray(compacted['t'][::HIST_INDEX_EVERY], '<f8').tobytes())
+            os.replace(path + '.c.seg.tmp', path + '.c.seg')
+            os.replace(path + '.c.idx.tmp', path + '.c.idx')
+        os.unlink(path + '.seg')
+        if os.path.exists(path + '.idx'):
+            os.unlink(path + '.idx')
+        print ('HIS-S> segment "%s" compacted; %d rows to %d' % (path, len(records), len(compacted)), flush=True)
+
+    #############################################
+    # times and values of a device in a time range, oldest first
+    # segments of the days in range only; raw and compacted ones of a day
+    #
+    def query(self, dev_id, start, end):
+        parts = []
+        day = datetime.date.fromtimestamp(start)
+        with self.lock:
+            while day <= datetime.date.fromtimestamp(end):
+                path = os.path.join(self.device_path(dev_id), day.strftime('%Y%m%d'))
+                parts.append(read_segment(path + '.c', start, end))
+                parts.append(read_segment(path, start, end))
+                day += datetime.timedelta(days=1)
+        records = np.concatenate(parts) if len(parts) > 0 else np.zeros(0, HIST_RECORD)
+        records = records[np.argsort(records['t'], kind='stable')]
+        return records['t'], records['v'].astype(float)
+
+    #############################################
+    # trend of a device between start and end in points buckets at most
+    # coarsest rollup giving points buckets in range taken, raw rows if none; bucket size 0 for raw rows
+    # returns bucket size and rollup records reduced to points
+    #
+    def trend(self, dev_id, start, end, points):
+        steps = [ step for step in HIST_ROLLUP_STEPS if (end - start) / step >= points ]
+        if len(steps) == 0:
+            times, values = self.query(dev_id, start, end)
+            records = np.zeros(len(times), HIST_RECORD)
+            records['t'], records['v'] = times, values
+            buckets = rollup_records(records, 1e-3) if len(records) > 0 else np.zeros(0, HIST_ROLLUP)
+            return 0, reduce_rollups(buckets, start, end, points)
+        step = steps[-1]
+        with self.lock:
+            buckets = read_rollup(os.path.join(self.device_path(dev_id), 'rollup_%d.seg' % step), step, start, end)
+        return step, reduce_rollups(buckets, start, end, points)
+#
+#############################################
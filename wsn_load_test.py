@@ -0,0 +1,262 @@
+"""
+HTTP load harness for the dashboard endpoints of wsn_server_SCD/wsn_server_ASD
+coded functions as below
+- a simulated device attached to the server by wsn_fleet_sim; no BLE or SPI hardware
+- operators run as threads, as many as the concurrency given
+    monitor  : post_monStart 0..10 at the UI polling interval then post_monStop, as monitoring.js does
+               post_monASDstart for ASD server
+    graph    : post_logList then post_graphTime and post_graphFreq on a log file of static/log
+- log file made by post_STEandBDT, post_BDTtoServer and post_BDTtoFile if static/log has none
+- every operator tells its own owner id; monitoring sessions of others on the device refused by lease
+- latency histogram, percentiles and error rate per route; refused ones (locked, disconnected) apart
+
+usage: python wsn_load_test.py [http://host:port] [concurrency] [duration sec] [SCD|ASD] [monitor share 0..1]
+
+                    started 2026-10-18
+                    updated 2026-10-18; owner id per operator
+"""
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+
+#############################################
+# target definitions to load test
+#############################################
+#
+LOAD_URL          = 'http://127.0.0.1:8081'  # flask WEB server of the server
+LOAD_TCP_PORT     = 8082              # TCP port of the server for the simulated device
+LOAD_CONCURRENCY  = 4                 # operators at once
+LOAD_DURATION     = 60.               # time period to load the server
+LOAD_SENSOR       = 'SCD'             # sensor type of the server and the simulated device
+LOAD_MONITOR_SHARE = 0.5              # share of monitor sessions; graph sessions for the rest
+LOAD_MON_INTERVAL = 3.                # post_monStart polling interval; minimum of the UI
+LOAD_MON_COUNT    = 10                # post_monStart polls of a monitor session after the first
+LOAD_THINK_TIME   = 1.                # operator pause between sessions
+LOAD_HTTP_TIMEOUT = 200.              # time period to wait a response; longer than BDT run on server
+LOAD_DEV_WAIT_TIME = 30.              # time period to wait the simulated device listed on server
+LOAD_SIM_DEVICE   = True              # attach a simulated device by wsn_fleet_sim; False if a device is there
+LOAD_BUCKETS      = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000]  # histogram bounds in ms
+LOAD_DRAW_VALUES  = ['Sum(X,Y,Z)', 'X only', 'Y only', 'Z only']  # post_graphTime drawing options
+#
+# global variables
+#
+gLock       = threading.Lock()
+gResults    = {}    # per route; latencies of ok ones, errors, refused
+gDevice     = None  # device id of the simulated device
+
+#############################################
+#############################################
+#
+# HTTP
+#
+#############################################
+# post a JSON request to a route; returns latency and response JSON, None if failed
+#
+def post(route, data):
+    req = urllib.request.Request(LOAD_URL + route, data=json.dumps(data).encode(),
+                                 headers={'Content-Type' : 'application/json'}, method='POST')
+    t = time.time()
+    try:
+        with urllib.request.urlopen(req, timeout=LOAD_HTTP_TIMEOUT) as resp:
+            body = resp.read()
+        rtn = json.loads(body)
+    except Exception:
+        latency = time.time() - t
+        record(route, latency, 'error')
+        return latency, None
+    latency = time.time() - t
+    record(route, latency, 'refused' if refused(rtn) else 'ok')
+    return latency, rtn
+
+#############################################
+# response telling the request refused; locked, disconnected or not done
+#
+def refused(rtn):
+    if not isinstance(rtn, dict):
+        return False
+    if rtn.get('msg_01') == 'N':
+        return True
+    status = rtn.get('status')
+    if isinstance(status, list) and len(status) > 0 and status[0] in ('[locked]', '[sensor device]'):
+        return True
+    if rtn.get('t') == '-':
+        return True
+    return False
+
+#############################################
+# add a result of a route
+#
+def record(route, latency, outcome):
+    with gLock:
+        result = gResults.setdefault(route, { 'ok' : [], 'error' : 0, 'refused' : 0 })
+        if outcome == 'ok':
+            result['ok'].append(latency)
+        else:
+            result[outcome] += 1
+
+#############################################
+#############################################
+#
+# operator sessions
+#
+#############################################
+# monitoring session; polls as monitoring.js does then stops
+#
+def session_monitor(end_time, owner):
+    route = '/post_monStart' if LOAD_SENSOR == 'SCD' else '/post_monASDstart'
+    for value in range(LOAD_MON_COUNT + 1):
+        latency, rtn = post(route, { 'value' : value, 'dev' : gDevice, 'owner' : owner })
+        if rtn == None or refused(rtn) or rtn.get('timer') == 'off' or time.time() >= end_time:
+            break
+        time.sleep( max(0., LOAD_MON_INTERVAL - latency) if LOAD_SENSOR == 'SCD' else LOAD_MON_INTERVAL )
+    if LOAD_SENSOR == 'SCD':
+        post('/post_monStop', { 'dev' : gDevice, 'owner' : owner })
+
+#############################################
+# graph session; log list then time and frequency graphs of a log file
+#
+def session_graph(end_time):
+    latency, rtn = post('/post_logList', {})
+    if rtn == None or len(rtn.get('rows', [])) == 0:
+        return
+    fname = random.choice(rtn['rows'])
+    post('/post_graphTime', { 'value' : random.choice(LOAD_DRAW_VALUES), 'fname' : fname })
+    post('/post_graphFreq', { 'value' : LOAD_DRAW_VALUES[0], 'fname' : fname })
+
+#############################################
+# operator; sessions one after another till the end time
+#
+def operator(end_time, owner):
+    while time.time() < end_time:
+        if random.random() < LOAD_MONITOR_SHARE:
+            session_monitor(end_time, owner)
+        else:
+            session_graph(end_time)
+        time.sleep(LOAD_THINK_TIME * random.random())
+
+#############################################
+#############################################
+#
+# setup
+#
+#############################################
+# wait the device listed on server; returns its device id, None if not
+#
+def wait_device(dev_id):
+    t = time.time()
+    while time.time() - t < LOAD_DEV_WAIT_TIME:
+        try:
+            with urllib.request.urlopen( urllib.request.Request(LOAD_URL + '/post_devList', data=b'{}', method='POST'),
+                                         timeout=5. ) as resp:
+                rows = json.loads(resp.read())['rows']
+            for row in rows:
+                if dev_id == None or row['dev'] == dev_id:
+                    return row['dev']
+        except Exception:
+            pass
+        time.sleep(1.)
+    return None
+
+#############################################
+# make a log file from a capture of the device if server has none
+#
+def seed_log():
+    latency, rtn = post('/post_logList', {})
+    if rtn == None:
+        return False
+    if len(rtn.get('rows', [])) > 0:
+        print ('LOAD> %d log files on server' % len(rtn['rows']), flush=True)
+        return True
+    print ('LOAD> no log file on server, making one from a capture => ', end='', flush=True)
+    for route, data in ( ('/post_STEandBDT', { 'dev' : gDevice, 'owner' : 'load-seed' }),
+                         ('/post_BDTtoServer', { 'dev' : gDevice, 'owner' : 'load-seed' }),
+                         ('/post_BDTtoFile', { 'value' : 'load test', 'dev' : gDevice, 'owner' : 'load-seed' }) ):
+        latency, rtn = post(route, data)
+        if rtn == None or rtn.get('msg_01') != 'Y':
+            print ('%s fail "%r"' % (route, rtn), flush=True)
+            return False
+    print (rtn.get('msg_00'), flush=True)
+    # seeding requests are not the load
+    gResults.clear()
+    return True
+
+#############################################
+# print latency histogram and error rate per route
+#
+def report(elapsed, concurrency):
+    print ('LOAD> %d operators, %.1f sec, %s server, monitor share %.2f' % (concurrency, elapsed, LOAD_SENSOR, LOAD_MONITOR_SHARE), flush=True)
+    print ('LOAD> %-18s %6s %6s %7s %6s %8s %8s %8s %8s %8s' %
+           ('route', 'count', 'req/s', 'refused', 'error%', 'p50 ms', 'p95 ms', 'p99 ms', 'max ms', 'avg ms'), flush=True)
+    for route, result in sorted(gResults.items()):
+        times = sorted(result['ok'])
+        count = len(times) + result['refused'] + result['error']
+        pct = lambda p: times[min(len(times) - 1, int(len(times) * p))] * 1000. if times else 0.
+        print ('LOAD> %-18s %6d %6.2f %7d %6.1f %8.1f %8.1f %8.1f %8.1f %8.1f' %
+               (route, count, count / elapsed, result['refused'], result['error'] * 100. / count,
+                pct(0.5), pct(0.95), pct(0.99), times[-1] * 1000. if times else 0.,
+                sum(times) * 1000. / len(times) if times else 0.), flush=True)
+    for route, result in sorted(gResults.items()):
+        times = result['ok']
+        if len(times) == 0:
+            continue
+        print ('LOAD> %s latency histogram' % route, flush=True)
+        lower = 0
+        for bound in LOAD_BUCKETS + [None]:
+            n = sum( 1 for t in times if t * 1000. >= lower and (bound == None or t * 1000. < bound) )
+            label = ('%d-%d ms' % (lower, bound)) if bound != None else ('%d ms-' % lower)
+            if n > 0:
+                print ('LOAD>   %-14s %6d %s' % (label, n, '#' * max(1, int(n * 50 / len(times)))), flush=True)
+            lower = bound
+
+#############################################
+#############################################
+#
+# Main starts here
+#
+#############################################
+#
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and not sys.argv[1].startswith('http'):
+        print (__doc__)
+        sys.exit(1)
+    if len(sys.argv) > 1:
+        LOAD_URL = sys.argv[1].rstrip('/')
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else LOAD_CONCURRENCY
+    duration    = float(sys.argv[3]) if len(sys.argv) > 3 else LOAD_DURATION
+    if len(sys.argv) > 4:
+        LOAD_SENSOR = sys.argv[4]
+    if len(sys.argv) > 5:
+        LOAD_MONITOR_SHARE = float(sys.argv[5])
+    #
+    fleet = None
+    if LOAD_SIM_DEVICE:
+        host = LOAD_URL.split('//', 1)[-1].split(':')[0]
+        fleet = subprocess.Popen( [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'wsn_fleet_sim.py'),
+                                   'fleet', '%s:%d' % (host, LOAD_TCP_PORT), '1', LOAD_SENSOR],
+                                  stdout=subprocess.DEVNULL )
+        gDevice = wait_device('sim-%s-0000' % LOAD_SENSOR)
+    else:
+        gDevice = wait_device(None)
+    try:
+        if gDevice == None:
+            print ('LOAD> no device on server %s' % LOAD_URL, flush=True)
+        elif seed_log():
+            print ('LOAD> device [%s], %d operators for %.0f sec => ' % (gDevice, concurrency, duration), flush=True)
+            start = time.time()
+            threads = [ threading.Thread(target=operator, args=(start + duration, 'load-%d' % n), daemon=True) for n in range(concurrency) ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            report(time.time() - start, concurrency)
+    except KeyboardInterrupt:
+        pass
+    if fleet != None:
+        fleet.terminate()
+#
+#############################################
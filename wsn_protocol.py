@@ -0,0 +1,197 @@
+"""
+framed message protocol between WSN servers (wsn_gateway) and WSN clients
+- every message travels as one frame; header + payload
+- header is 10 bytes in network byte order
+    type   : 1 byte, FRAME_CMD, FRAME_DATA, FRAME_NAK, FRAME_PING or FRAME_PONG
+    flags  : 1 byte, FLAG_BULK for bulk data channel, FLAG_MORE for a fragment, FLAG_ZLIB for compressed
+    req_id : 4 bytes, correlation id; a reply carries the id of its command
+    length : 4 bytes, payload length
+- payload of any size up to FRAME_MAX is one message; no newline cutting needed
+- every command gets exactly one reply with the same req_id, on the channel of the command
+- two logical channels on a connection; control (flags 0) and bulk data (FLAG_BULK)
+    bulk message is cut into FRAME_FRAGMENT fragments, all but the last flagged FLAG_MORE
+    sender queues control frames ahead of bulk fragments; control never waits a whole bulk message
+- gateway sends FRAME_PING with its send time as payload; client echoes it at once in FRAME_PONG
+- client registers by FRAME_HELLO as the first frame, gateway answers FRAME_WELCOME; both JSON
+    hello   : {"dev": device id, "sensor": sensor type, "caps": [capabilities]}
+    welcome : {"dev": device id registered, "ping": heartbeat interval, "dead": dead-peer time,
+               "caps": [capabilities accepted]}
+- capability CAP_ZLIB accepted; client may send data replies zlib compressed with FLAG_ZLIB
+    compressed before fragmentation; every fragment of the message carries FLAG_ZLIB
+- capability CAP_UDP accepted; client may push STE samples as UDP datagrams to welcome "udp" port
+    datagram is seq(4 bytes) + device id length(1 byte) + device id + STE row string; lossy, no reply
+- session record file keeps frames and datagrams exchanged for replay; one record after another
+    header is 14 bytes; time(8 bytes double), direction(1 byte), device id length(1 byte), data length(4 bytes)
+    then device id and a whole frame or datagram as on the wire
+
+usage: import wsn_protocol as PROTO
+       writer.write( PROTO.pack_frame(PROTO.FRAME_CMD, 'STE_REQ', req_id) )
+       ftype, flags, req_id, payload = await PROTO.read_frame(reader)
+
+                    started 2026-10-18; length-prefixed framing
+                    updated 2026-10-18; correlation id
+                    updated 2026-10-18; control and bulk data channels
+                    updated 2026-10-18; heartbeat
+                    updated 2026-10-18; hello/welcome registration
+                    updated 2026-10-18; zlib compression capability
+                    updated 2026-10-18; STE sample datagram
+                    updated 2026-10-18; session record
+                    updated 2026-10-18; frame receive on blocking socket
+                    updated 2026-10-18; frame taken off a receive buffer owned by the caller
+"""
+import asyncio
+import struct
+
+#############################################
+# frame definitions
+#############################################
+#
+FRAME_HEADER     = struct.Struct('!BBII')  # type, flags, req_id, length
+FRAME_HEADER_LEN = FRAME_HEADER.size
+FRAME_MAX        = 0x4000000               # 64MB; max payload length to accept
+FRAME_FRAGMENT   = 0x4000                  # 16KB; max payload length of a bulk fragment
+#
+FRAME_CMD        = 0x01                    # command message or short reply
+FRAME_DATA       = 0x02                    # capture data block; BDT text
+FRAME_NAK        = 0x03                    # negative reply; payload is the reason
+FRAME_PING       = 0x04                    # heartbeat; payload is the send time
+FRAME_PONG       = 0x05                    # heartbeat reply; payload echoed
+FRAME_HELLO      = 0x06                    # device registration; JSON of device id, sensor, caps
+FRAME_WELCOME    = 0x07                    # registration accepted; JSON of gateway parameters
+#
+FLAG_BULK        = 0x01                    # bulk data channel; control channel if not set
+FLAG_MORE        = 0x02                    # fragment of a message; more fragments follow
+FLAG_ZLIB        = 0x04                    # payload of the message is zlib compressed
+#
+CAP_ZLIB         = 'ZLIB'                  # capability to compress data replies by zlib
+CAP_UDP          = 'UDP'                   # capability to push STE samples by UDP datagram
+#
+SAMPLE_HEADER    = struct.Struct('!IB')    # STE sample datagram; seq, device id length
+#
+RECORD_HEADER    = struct.Struct('!dBBI')  # session record; time, direction, device id length, data length
+RECORD_RX        = 0                       # frame from device to gateway
+RECORD_TX        = 1                       # frame from gateway to device
+RECORD_UDP       = 2                       # STE sample datagram from device
+#
+PRIO_CONTROL     = 0                       # send queue priority of control channel frames
+PRIO_BULK        = 1                       # send queue priority of bulk channel frames
+
+#############################################
+# make a frame from a message
+#
+def pack_frame(ftype, payload, req_id = 0, flags = 0):
+    if isinstance(payload, str):
+        payload = payload.encode()
+    return FRAME_HEADER.pack(ftype, flags, req_id, len(payload)) + payload
+
+#############################################
+# make frames from a message; bulk message is cut into fragments
+#
+def pack_frames(ftype, payload, req_id = 0, flags = 0):
+    if isinstance(payload, str):
+        payload = payload.encode()
+    if not (flags & FLAG_BULK) or len(payload) <= FRAME_FRAGMENT:
+        return [ pack_frame(ftype, payload, req_id, flags) ]
+    frames = []
+    for idx in range(0, len(payload), FRAME_FRAGMENT):
+        more = FLAG_MORE if idx + FRAME_FRAGMENT < len(payload) else 0
+        frames.append( pack_frame(ftype, payload[idx:idx+FRAME_FRAGMENT], req_id, flags | more) )
+    return frames
+
+#############################################
+# make a STE sample datagram
+#
+def pack_sample(seq, dev_id, row):
+    dev_id = dev_id.encode()[0:255]
+    return SAMPLE_HEADER.pack(seq & 0xffffffff, len(dev_id)) + dev_id + row.encode()
+
+#############################################
+# get seq, device id and row from a STE sample datagram
+#
+def unpack_sample(data):
+    seq, n = SAMPLE_HEADER.unpack_from(data)
+    idx = SAMPLE_HEADER.size
+    return seq, data[idx:idx+n].decode(), data[idx+n:].decode()
+
+#############################################
+# make a session record of a frame or datagram
+#
+def pack_record(t, direction, dev_id, data):
+    dev_id = dev_id.encode()[0:255]
+    return RECORD_HEADER.pack(t, direction, len(dev_id), len(data)) + dev_id + data
+
+#############################################
+# read session records from a file; yields time, direction, device id, data
+#
+def read_records(f):
+    while True:
+        header = f.read(RECORD_HEADER.size)
+        if len(header) < RECORD_HEADER.size:
+            return
+        t, direction, n, length = RECORD_HEADER.unpack(header)
+        dev_id = f.read(n).decode()
+        data = f.read(length)
+        if len(data) < length:
+            return
+        yield t, direction, dev_id, data
+
+#############################################
+# get type, flags, req_id and payload from a whole frame
+#
+def unpack_frame(frame):
+    ftype, flags, req_id, length = FRAME_HEADER.unpack_from(frame)
+    return ftype, flags, req_id, frame[FRAME_HEADER_LEN:FRAME_HEADER_LEN+length]
+
+#############################################
+# take one frame off the head of a receive buffer; None if not whole yet
+# buf is a bytearray bytes are appended to as received
+#
+def take_frame(buf):
+    if len(buf) < FRAME_HEADER_LEN:
+        return None
+    ftype, flags, req_id, length = FRAME_HEADER.unpack_from(buf)
+    if length > FRAME_MAX:
+        raise ValueError('frame length %d exceeds %d' % (length, FRAME_MAX))
+    if len(buf) < FRAME_HEADER_LEN + length:
+        return None
+    payload = bytes(buf[FRAME_HEADER_LEN:FRAME_HEADER_LEN+length])
+    del buf[:FRAME_HEADER_LEN+length]
+    #
+    return ftype, flags, req_id, payload
+
+#############################################
+# receive one frame from a blocking socket; payload as a bytearray
+#
+def recv_frame(sock):
+    # received in place into a buffer of the size told; no copy per part
+    def recv_exactly(n):
+        data = bytearray(n)
+        view = memoryview(data)
+        got = 0
+        while got < n:
+            size = sock.recv_into(view[got:])
+            if size == 0:
+                raise ConnectionError('connection closed')
+            got += size
+        return data
+    ftype, flags, req_id, length = FRAME_HEADER.unpack( recv_exactly(FRAME_HEADER_LEN) )
+    if length > FRAME_MAX:
+        raise ValueError('frame length %d exceeds %d' % (length, FRAME_MAX))
+    payload = recv_exactly(length) if length > 0 else b''
+    #
+    return ftype, flags, req_id, payload
+
+#############################################
+# read one frame; only header waiting is limited by timeout
+# not to lose a half read frame on timeout
+#
+async def read_frame(reader, timeout = None):
+    header = await asyncio.wait_for( reader.readexactly(FRAME_HEADER_LEN), timeout=timeout )
+    ftype, flags, req_id, length = FRAME_HEADER.unpack(header)
+    if length > FRAME_MAX:
+        raise ValueError('frame length %d exceeds %d' % (length, FRAME_MAX))
+    payload = await reader.readexactly(length) if length > 0 else b''
+    #
+    return ftype, flags, req_id, payload
+#
+#############################################
@@ -0,0 +1,372 @@
+"""
+replay of a session recorded by wsn_gateway; reproducible benchmarks without BLE or SPI hardware
+coded functions as below
+- device mode; impersonates WSN clients recorded, connecting to a server as they did
+    hello as recorded, heartbeat echoed at once
+    a command is answered with the recorded reply of the same command, after recorded service time / speed
+    same commands answered by their recorded replies in turn; command word only matched if not recorded
+    STE sample datagrams pushed at recorded times / speed
+- server mode; impersonates the server, accepting a WSN client
+    recorded commands of the device sent at recorded times / speed
+    latency of replies and throughput reported per command
+- speed 1 replays at original speed, 10 ten times faster, 0 as fast as possible
+
+usage: python wsn_replay.py device record_file [host[:port] | unix:path] [speed]
+       python wsn_replay.py server record_file [port# | unix:path] [speed]
+       python wsn_replay.py list record_file
+
+                    started 2026-10-18
+"""
+import asyncio
+import json
+import os
+import socket
+import sys
+import time
+
+import wsn_protocol as PROTO
+
+#############################################
+# target definitions to replay
+#############################################
+#
+REPLAY_HOST_NAME   = '127.0.0.1'      # server to connect in device mode
+REPLAY_PORT        = 8082             # server port to connect in device mode, to listen in server mode
+REPLAY_UNIX_PREFIX = 'unix:'          # AF_UNIX socket path prefix in place of host or port
+REPLAY_SPEED       = 1.               # replay speed; 0 as fast as possible
+REPLAY_WAIT_TIME   = 30.              # time period to wait replies after the last command in server mode
+REPLAY_OPEN_WAIT_TIME = 10.           # time period to wait a connection and welcome
+#
+# global variables
+#
+gSpeed      = REPLAY_SPEED
+gStats      = {}    # per command word; count, latencies or service times, bytes
+gUnmatched  = 0     # commands not found in the record
+
+#############################################
+#############################################
+#
+# session record
+#
+#############################################
+# load a record file; records grouped by device
+#
+def load_record(path):
+    devices = {}
+    with open(path, 'rb') as f:
+        for t, direction, dev_id, data in PROTO.read_records(f):
+            devices.setdefault(dev_id, []).append( (t, direction, data) )
+    return devices
+
+#############################################
+# command word of a command message; 'BDT_REQ' of 'BDT_REQ 0 65536 1234'
+#
+def command_word(payload):
+    return payload.split(b' ', 1)[0].decode(errors='replace')
+
+#############################################
+# device script of a record; hello, commands with their replies, datagrams
+# replies keyed by command payload and channel; list of (service time, reply frames) in turn
+#
+def device_script(records):
+    script = { 'hello' : None, 'welcome' : None, 'replies' : {}, 'words' : {}, 'samples' : [], 'commands' : [] }
+    if len(records) == 0:
+        return script
+    start = records[0][0]
+    sent  = {}    # req_id to command key and send time
+    for t, direction, data in records:
+        if direction == PROTO.RECORD_UDP:
+            script['samples'].append( (t - start, data) )
+            continue
+        ftype, flags, req_id, payload = PROTO.unpack_frame(data)
+        if direction == PROTO.RECORD_TX:
+            if ftype == PROTO.FRAME_WELCOME:
+                script['welcome'] = json.loads(payload)
+            elif ftype == PROTO.FRAME_CMD:
+                key = (payload, flags & PROTO.FLAG_BULK)
+                sent[req_id] = [ key, t, [] ]
+                script['commands'].append( (t - start, data) )
+            continue
+        if ftype == PROTO.FRAME_HELLO:
+            script['hello'] = data
+            start = t
+            continue
+        if ftype == PROTO.FRAME_PONG or req_id not in sent:
+            continue
+        key, t_sent, frames = sent[req_id]
+        frames.append(data)
+        if not (flags & PROTO.FLAG_MORE):
+            del sent[req_id]
+            script['replies'].setdefault(key, []).append( (t - t_sent, frames) )
+            script['words'].setdefault(command_word(key[0]), []).append( (t - t_sent, frames) )
+    return script
+
+#############################################
+# reply of a command in turn; recorded replies of the same command, or of the same command word
+#
+def script_reply(script, turns, payload, flags):
+    global gUnmatched
+    #
+    key = (payload, flags & PROTO.FLAG_BULK)
+    replies = script['replies'].get(key)
+    if replies == None:
+        key = command_word(payload)
+        replies = script['words'].get(key)
+    if replies == None:
+        gUnmatched += 1
+        return None
+    turn = turns.get(key, 0)
+    turns[key] = turn + 1
+    return replies[turn % len(replies)]
+
+#############################################
+# add a measure to the stats of a command word
+#
+def stats_add(word, elapsed, nbytes):
+    stats = gStats.setdefault(word, { 'count' : 0, 'times' : [], 'bytes' : 0 })
+    stats['count'] += 1
+    stats['times'].append(elapsed)
+    stats['bytes'] += nbytes
+
+#############################################
+# print stats per command word
+#
+def stats_print(title, elapsed):
+    print ('RPL> %s; %.3f sec, speed %s, %d unmatched' % (title, elapsed, gSpeed if gSpeed > 0. else 'max', gUnmatched), flush=True)
+    print ('RPL> %-12s %6s %10s %10s %10s %10s %12s %10s' %
+           ('command', 'count', 'min ms', 'avg ms', 'p95 ms', 'max ms', 'bytes', 'KB/s'), flush=True)
+    for word, stats in sorted(gStats.items()):
+        times = sorted(stats['times'])
+        total = sum(times)
+        print ('RPL> %-12s %6d %10.1f %10.1f %10.1f %10.1f %12d %10.1f' %
+               (word, stats['count'], times[0] * 1000., total / len(times) * 1000.,
+                times[int(len(times) * 0.95) if len(times) > 1 else 0] * 1000., times[-1] * 1000.,
+                stats['bytes'], stats['bytes'] / 1024. / elapsed if elapsed > 0. else 0.), flush=True)
+
+#############################################
+# wait time scaled by replay speed
+#
+async def replay_sleep(seconds):
+    if gSpeed > 0. and seconds > 0.:
+        await asyncio.sleep(seconds / gSpeed)
+
+#############################################
+#############################################
+#
+# device mode
+#
+#############################################
+# send a recorded reply with the live req_id after recorded service time
+#
+async def device_reply(writer, req_id, reply, word, t):
+    service_time, frames = reply
+    await replay_sleep(service_time)
+    nbytes = 0
+    for frame in frames:
+        ftype, flags, rec_id, payload = PROTO.unpack_frame(frame)
+        writer.write( PROTO.pack_frame(ftype, payload, req_id, flags) )
+        nbytes += len(payload)
+    await writer.drain()
+    stats_add(word, time.time() - t, nbytes)
+
+#############################################
+# push recorded STE sample datagrams at recorded times
+#
+async def device_samples(samples, addr):
+    if len(samples) == 0 or addr == None:
+        return
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    start = time.time()
+    for t, data in samples:
+        await asyncio.sleep( max(0., start + t / gSpeed - time.time()) if gSpeed > 0. else 0. )
+        sock.sendto(data, addr)
+    sock.close()
+
+#############################################
+# impersonate a device recorded; returns when server closed the connection
+#
+async def device_replay(dev_id, script, host, port):
+    if script['hello'] == None:
+        print ('RPL> device [%s] no hello recorded, skipped' % dev_id, flush=True)
+        return
+    if host.startswith(REPLAY_UNIX_PREFIX):
+        reader, writer = await asyncio.wait_for( asyncio.open_unix_connection(host[len(REPLAY_UNIX_PREFIX):]), timeout=REPLAY_OPEN_WAIT_TIME )
+    else:
+        reader, writer = await asyncio.wait_for( asyncio.open_connection(host, port), timeout=REPLAY_OPEN_WAIT_TIME )
+    writer.write(script['hello'])
+    await writer.drain()
+    ftype, flags, req_id, payload = await PROTO.read_frame(reader, timeout=REPLAY_OPEN_WAIT_TIME)
+    if ftype != PROTO.FRAME_WELCOME:
+        print ('RPL> device [%s] frame type %d instead of welcome' % (dev_id, ftype), flush=True)
+        writer.close()
+        return
+    welcome = json.loads(payload)
+    print ('RPL> device [%s] registered, %d replies, %d samples recorded' %
+           (dev_id, sum(len(replies) for replies in script['replies'].values()), len(script['samples'])), flush=True)
+    udp_addr = None
+    if PROTO.CAP_UDP in welcome.get('caps', []) and welcome.get('udp', 0) > 0 and not host.startswith(REPLAY_UNIX_PREFIX):
+        udp_addr = (host, welcome['udp'])
+    samples_task = asyncio.get_running_loop().create_task( device_samples(script['samples'], udp_addr) )
+    turns = {}
+    try:
+        while True:
+            ftype, flags, req_id, payload = await PROTO.read_frame(reader)
+            if ftype == PROTO.FRAME_PING:
+                writer.write( PROTO.pack_frame(PROTO.FRAME_PONG, payload, req_id) )
+                continue
+            if ftype != PROTO.FRAME_CMD:
+                continue
+            reply = script_reply(script, turns, payload, flags)
+            if reply == None:
+                print ('RPL> device [%s] "%r" not recorded, not replied' % (dev_id, payload), flush=True)
+                continue
+            asyncio.get_running_loop().create_task( device_reply(writer, req_id, reply, command_word(payload), time.time()) )
+    except (asyncio.IncompleteReadError, ConnectionError):
+        pass
+    samples_task.cancel()
+    writer.close()
+    print ('RPL> device [%s] disconnected' % dev_id, flush=True)
+
+#############################################
+# impersonate all devices recorded
+#
+async def device_main(devices, host, port):
+    t = time.time()
+    scripts = { dev_id : device_script(records) for dev_id, records in devices.items() }
+    await asyncio.gather( *[ device_replay(dev_id, script, host, port) for dev_id, script in scripts.items() ],
+                          return_exceptions=True )
+    stats_print('device replay; service time per command', time.time() - t)
+
+#############################################
+#############################################
+#
+# server mode
+#
+#############################################
+# send recorded commands to a WSN client and measure the replies
+#
+async def server_replay(reader, writer, devices):
+    try:
+        ftype, flags, req_id, payload = await PROTO.read_frame(reader, timeout=REPLAY_OPEN_WAIT_TIME)
+        hello = json.loads(payload)
+    except Exception as e:
+        print ('RPL> registration fail "%r"' % (e), flush=True)
+        writer.close()
+        return
+    dev_id = hello.get('dev', '')
+    if dev_id not in devices:
+        dev_id = next(iter(devices))
+    script = device_script(devices[dev_id])
+    welcome = script['welcome'] or { 'ping' : 5., 'dead' : 15., 'caps' : [] }
+    welcome['dev'] = hello.get('dev', dev_id)
+    welcome['caps'] = [ cap for cap in welcome.get('caps', []) if cap in hello.get('caps', []) and cap != PROTO.CAP_UDP ]
+    welcome['udp'] = 0
+    writer.write( PROTO.pack_frame(PROTO.FRAME_WELCOME, json.dumps(welcome), req_id) )
+    print ('RPL> device [%s] replaying %d commands of [%s]' % (welcome['dev'], len(script['commands']), dev_id), flush=True)
+    #
+    pending  = {}    # req_id to command word and send time
+    partial  = {}    # req_id to bytes received
+    async def receive():
+        try:
+            while True:
+                ftype, flags, req_id, payload = await PROTO.read_frame(reader)
+                if req_id not in pending:
+                    continue
+                partial[req_id] = partial.get(req_id, 0) + len(payload)
+                if flags & PROTO.FLAG_MORE:
+                    continue
+                word, t = pending.pop(req_id)
+                stats_add(word, time.time() - t, partial.pop(req_id))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+    receive_task = asyncio.get_running_loop().create_task( receive() )
+    #
+    start = time.time()
+    for t, frame in script['commands']:
+        if gSpeed > 0.:
+            await asyncio.sleep( max(0., start + t / gSpeed - time.time()) )
+        ftype, flags, req_id, payload = PROTO.unpack_frame(frame)
+        pending[req_id] = (command_word(payload), time.time())
+        writer.write(frame)
+        await writer.drain()
+    t = time.time()
+    while len(pending) > 0 and not receive_task.done() and time.time() - t < REPLAY_WAIT_TIME:
+        await asyncio.sleep(0.01)
+    if len(pending) > 0:
+        print ('RPL> device [%s] %d commands not replied' % (welcome['dev'], len(pending)), flush=True)
+    receive_task.cancel()
+    try:
+        await receive_task
+    except asyncio.CancelledError:
+        pass
+    writer.close()
+    stats_print('server replay; latency per command', time.time() - start)
+    asyncio.get_running_loop().stop()
+
+#############################################
+# accept a WSN client and replay commands to it
+#
+def server_main(devices, port):
+    loop = asyncio.new_event_loop()
+    handler = lambda reader, writer: server_replay(reader, writer, devices)
+    if isinstance(port, str):
+        if os.path.exists(port):
+            os.unlink(port)
+        loop.run_until_complete( asyncio.start_unix_server(handler, port) )
+    else:
+        loop.run_until_complete( asyncio.start_server(handler, '0.0.0.0', port) )
+    print ('RPL> waiting a WSN client on %s' % port, flush=True)
+    loop.run_forever()
+
+#############################################
+# list devices and commands recorded
+#
+def list_record(devices):
+    for dev_id, records in devices.items():
+        script = device_script(records)
+        words = {}
+        for t, frame in script['commands']:
+            word = command_word(PROTO.unpack_frame(frame)[3])
+            words[word] = words.get(word, 0) + 1
+        duration = records[-1][0] - records[0][0]
+        print ('RPL> device [%s] %d records, %.1f sec, %d samples, commands %r' %
+               (dev_id, len(records), duration, len(script['samples']), words), flush=True)
+
+#############################################
+#############################################
+#
+# Main starts here
+#
+#############################################
+#
+if __name__ == '__main__':
+    if len(sys.argv) < 3 or sys.argv[1] not in ('device', 'server', 'list'):
+        print (__doc__)
+        sys.exit(1)
+    mode = sys.argv[1]
+    devices = load_record(sys.argv[2])
+    if len(devices) == 0:
+        print ('RPL> nothing recorded in "%s"' % sys.argv[2], flush=True)
+        sys.exit(1)
+    if len(sys.argv) > 4:
+        gSpeed = float(sys.argv[4])
+    try:
+        if mode == 'list':
+            list_record(devices)
+        elif mode == 'device':
+            host, port = REPLAY_HOST_NAME, REPLAY_PORT
+            if len(sys.argv) > 3:
+                host = sys.argv[3]
+                if not host.startswith(REPLAY_UNIX_PREFIX) and ':' in host:
+                    host, port = host.rsplit(':', 1)
+                    port = int(port)
+            asyncio.run( device_main(devices, host, port) )
+        else:
+            port = REPLAY_PORT
+            if len(sys.argv) > 3:
+                port = sys.argv[3][len(REPLAY_UNIX_PREFIX):] if sys.argv[3].startswith(REPLAY_UNIX_PREFIX) else int(sys.argv[3])
+            server_main(devices, port)
+    except KeyboardInterrupt:
+        stats_print('replay interrupted', 0.)
+#
+#############################################
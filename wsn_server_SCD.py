@@ -1,7 +1,10 @@
 """
 Sensor data monitoring and analysis application based on flask WEB application framework
 
-usage: python wsn_server_SCD.py [port#]
+usage: python wsn_server_SCD.py [port#] [unix socket path] [session record file] [flask processes]
+                                [STE history directory] [alert rules file]
+       kill -HUP <pid> to restart keeping WSN clients connected
+       WSN_GATEWAY_RPC=<rpc path> gunicorn -w <n> wsn_server_SCD:app with gateway process of wsn_gateway_rpc
 
 by Inho Byun, Researcher/KAIST
    inho.byun@gmail.com
@@ -14,20 +17,47 @@ by Inho Byun, Researcher/KAIST
                     updated 2020-12-31; argv Bug fix
                     updated 2021-01-06; graph drawing updated
                     updated 2021-08-03; updated port #
+                    updated 2026-10-18; asyncio gateway for multiple WSN clients, device addressing
+                    updated 2026-10-18; length-prefixed framed messages
+                    updated 2026-10-18; command/reply correlation, no busy-wait loops
+                    updated 2026-10-18; windowed BDT data transfer
+                    updated 2026-10-18; monitoring allowed while BDT data is transferred on bulk channel
+                    updated 2026-10-18; heartbeat on device connections, HTTP polling removed
+                    updated 2026-10-18; WSN clients registered by hello message on gateway port
+                    updated 2026-10-18; zlib compressed BDT data
+                    updated 2026-10-18; BDT data resumed by capture id and offset after reconnect
+                    updated 2026-10-18; monitoring from STE samples pushed on UDP
+                    updated 2026-10-18; AF_UNIX socket path as 2'nd argument for co-located WSN clients
+                    updated 2026-10-18; restart on SIGHUP handing WSN clients over to the new process
+                    updated 2026-10-18; session recording for wsn_replay as 3'rd argument
+                    updated 2026-10-18; flask processes as 4'th argument, WSN clients held by a gateway process
+                    updated 2026-10-18; capture jobs in background, progress by job id
+                    updated 2026-10-18; per-device leases of users in place of lock flags
+                    updated 2026-10-18; monitoring from a STE sampler per device shared by all viewers
+                    updated 2026-10-18; server-sent event streams for monitoring
+                    updated 2026-10-18; trend of the last minutes from STE ring buffer in memory
+                    updated 2026-10-18; STE history kept in daily segments, trend of days
+                    updated 2026-10-18; STE history trend from rollups, min and max band
+                    updated 2026-10-18; monitoring status by anomaly score against a baseline per device
+                    updated 2026-10-18; alert rules on every STE row and BDT spectrum, alerts and latency
 """
 import datetime
-from flask import Flask, redirect, request
+from flask import Flask, Response, redirect, request
 from jinja2 import Environment, PackageLoader, Markup, select_autoescape
+import io
 import json
 import numpy as np
-from markupsafe import escape
 import math
 ## import matplotlib.pyplot as plotter
 import os, fnmatch
+import signal
 import socket
 import sys
 import time
 
+import wsn_gateway as GW
+import wsn_gateway_rpc as RPC
+
 #############################################
 # target definitions to TCP Server
 #############################################
@@ -40,25 +70,41 @@ import time
 ##TCP_HOST_NAME = "125.131.73.31"   # Default Host Name
 TCP_HOST_NAME   = socket.gethostname()
 TCP_PORT        = 8082              # Default TCP Port Name
+TCP_UNIX_PATH   = ''                # AF_UNIX socket path for WSN clients on the same machine; '' not to open
+TCP_RECORD_FILE = ''                # session record file of messages exchanged with WSN clients; '' not to record
+TCP_HISTORY_PATH = ''               # directory of STE history segments of WSN clients; '' not to keep
+TCP_ALERT_RULES = ''                # alert rules and sinks of wsn_alert, its default ones if no such file; '' not to alert
+TCP_HANDOVER_FILE = '/tmp/wsn_server_SCD_handover.json'  # gateway state passed to the new process on restart
+TCP_HTTP_PROCESSES = 1              # flask worker processes; more than 1 runs gateway in a process of its own
+TCP_GATEWAY_RPC = '/tmp/wsn_server_SCD_gateway.rpc'  # AF_UNIX socket path of gateway process for flask workers
 TCP_HTTP_PORT   = 8081              # flask WEB server port
 ##TCP_HTTP_PORT   = 5000            # origin flask WEB server port
-TCP_PACKET_MAX  = 4096              # max TCP packet size
-TCP_POLL_TIME   = 300.              # max time interval to poll TCP port
-TCP_ERR_CNT_MAX = 8                 # max unknown error count before reconnection
+TCP_DEAD_TIME   = 15.               # time period of silence to drop a WSN client
+TCP_ZLIB        = True              # accept zlib compressed BDT data from WSN clients
+TCP_UDP         = True              # accept STE samples pushed by WSN clients on UDP port of TCP_PORT
+TCP_SAMPLE_MAX_AGE = 15.            # max age of STE row sampled to show
+TCP_MONITOR_INTERVAL = 3.           # default time interval to sample a device monitored; min of UI
+TCP_MONITOR_OWNER = 'monitor'       # owner of STE lease shared by all viewers of a device
+TCP_STREAM_WAIT_TIME = 10.          # time period a stream waits a new row; subscription renewed, keepalive sent
+TCP_TREND_MINUTES = 10.             # default minutes of STE trend; max 60 kept by the ring buffer
+TCP_HISTORY_DAYS  = 1.              # default days of STE history
+TCP_TREND_POINTS  = 120             # points of STE trend series
+TCP_TREND_POINTS_MAX = 2000         # max points of STE trend series asked
 #
 TCP_DEV_READY_MSG = 'DEV_READY'     # server message to check client ready
-TCP_DEV_OPEN_MSG  = 'DEV_OPEN'      # server message to connect client
 TCP_DEV_CLOSE_MSG = 'DEV_CLOSE'     # server message to disconnect client
 TCP_STE_START_MSG = 'STE_START'     # server message to start STE for monitoring
 TCP_STE_STOP_MSG  = 'STE_STOP'      # server message to stop STE
 TCP_STE_REQ_MSG   = 'STE_REQ'       # server message to request a STE result data 
 TCP_BDT_RUN_MSG   = 'BDT_RUN'       # server message to run BDT advanced STE /w memory write
-TCP_BDT_REQ_MSG   = 'BDT_REQ'       # server message to request BDT data
+TCP_BDT_REQ_MSG   = 'BDT_REQ'       # server message to request BDT data; 'BDT_REQ offset size id' for a chunk
+TCP_BDT_INFO_MSG  = 'BDT_INFO'      # server message to request BDT data length and capture id
+TCP_BDT_ACK_MSG   = 'BDT_ACK'       # server message to acknowledge BDT data; 'BDT_ACK id offset'
 TCP_BDT_END_MSG   = 'BDT_END'       # client message to inform BDT data transfer completed
 #
-# Some constant parameters
+TCP_BDT_RUN_WAIT_TIME = 180         # time period to wait BDT run completed on client
 #
-ACCEPT_WAIT_TIME  = 9               # time period to wait client connection
+# Some constant parameters
 #
 MAX_X_LIMIT       = 9600            # X-Axis point limit 
 #
@@ -72,196 +118,177 @@ WSN_STAMP_FREQ      = "accelometer ODR"
 #
 # global variables
 #
-gSocketServer   = None
-gSocketConn     = None
-gSocketAddr     = None
-gTCPerrCnt      = 0
-gTCPlastTime    = 0.
+gHttpSocket = None                  # flask listening socket; inherited across restart
 #
-gBDTtextList    = []
+# leases of a device held by a user and values shared by flask workers
+# kept by the gateway, by the gateway process if flask runs in processes
 #
-gSTElockFlag    = False 
-gBDTlockFlag    = False
+LEASE_STE       = 'STE'             # monitoring
+LEASE_BDT       = 'BDT'             # BDT run or BDT data saved to file
+LEASE_XFER      = 'XFER'            # BDT data being transferred on bulk channel; monitoring may go on
+LEASE_STE_TIME  = 90.               # time period before a monitoring lease expires; renewed by every poll
+LEASE_BDT_TIME  = TCP_BDT_RUN_WAIT_TIME + 30.  # time period before a BDT lease expires
+LEASE_XFER_TIME = 300.              # time period before a transfer lease expires; resumes included
+LEASE_JOB_TIME  = 900.              # time period before a lease of a job expires; waiting in queue included
+SHARED_BDT_TEXT = 'BDTtext:'        # + device id; BDT text chunks of the last capture
+#
+# flask workers started by a WSGI server reach the gateway process named in environment
+#
+if os.environ.get(RPC.RPC_ENV, '') != '':
+    RPC.attach(os.environ[RPC.RPC_ENV])
+    GW = RPC
 
 #############################################
 #############################################
 #         
-# socket stuffs
+# socket stuffs; device connections are held by wsn_gateway
 #
 #############################################
-# create, bind and listen socket
+# open gateway to accept WSN clients
 #
-def open_socket(clientNum = 1):
+def open_socket():
     global TCP_HOST_NAME
     global TCP_PORT
-    global gSocketServer
-    global gTCPerrCnt
-    global gTCPlastTime
-
+    global TCP_UNIX_PATH
+    global TCP_RECORD_FILE
+    global TCP_HTTP_PROCESSES
+    global TCP_HISTORY_PATH
+    global TCP_ALERT_RULES
+    global GW
     #
     if len(sys.argv) > 1:
         print ("TCP-S> take argument as port# (default: %d)" % TCP_PORT, flush=True)
         TCP_PORT = int(sys.argv[1])
-    gSocketServer = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    #
-    if gSocketServer != None:
-        print ("TCP-S> socket created", flush=True)
-        print ("TCP-S> trying to bind %s:%d" % (TCP_HOST_NAME, TCP_PORT), flush=True )
-        try:
-            gSocketServer.bind((TCP_HOST_NAME, TCP_PORT))
-        except:
-            print ("TCP-S> binding fail... Exiting...", flush=True)
-            return False
-    else:
-        print ("TCP-S> socket creation fail... Exiting...", flush=True)
+    if len(sys.argv) > 2:
+        print ("TCP-S> take 2'nd argument as unix socket path", flush=True)
+        TCP_UNIX_PATH = sys.argv[2]
+    if len(sys.argv) > 3:
+        print ("TCP-S> take 3'rd argument as session record file", flush=True)
+        TCP_RECORD_FILE = sys.argv[3]
+    if len(sys.argv) > 4:
+        print ("TCP-S> take 4'th argument as flask processes", flush=True)
+        TCP_HTTP_PROCESSES = int(sys.argv[4])
+    if len(sys.argv) > 5:
+        print ("TCP-S> take 5'th argument as STE history directory", flush=True)
+        TCP_HISTORY_PATH = sys.argv[5]
+    if len(sys.argv) > 6:
+        print ("TCP-S> take 6'th argument as alert rules file", flush=True)
+        TCP_ALERT_RULES = sys.argv[6]
+    # flask workers in processes reach WSN clients through gateway process
+    if TCP_HTTP_PROCESSES > 1:
+        RPC.attach(TCP_GATEWAY_RPC)
+        GW = RPC
+    print ("TCP-S> trying to open gateway %s:%d" % (TCP_HOST_NAME, TCP_PORT), flush=True )
+    if not GW.open_gateway(TCP_HOST_NAME, TCP_PORT, TCP_DEAD_TIME, TCP_ZLIB, TCP_UDP, TCP_UNIX_PATH, TCP_RECORD_FILE, TCP_HISTORY_PATH,
+                           TCP_ALERT_RULES):
+        print ("TCP-S> gateway open fail... Exiting...", flush=True)
         return False
-    print ("TCP-S> binded...", flush=True)    
-    gSocketServer.listen(clientNum)
     print ("TCP-S> listening...", flush=True) 
-    gTCPerrCnt = 0
-    gTCPlastTime = time.time()
     #
     return True 
-#############################################
-# refresh socket
-#
-def refresh_socket(clientNum = 1):
-    global gSocketServer
-    global gSocketConn
-    global gSocketAddr
-    global gTCPerrCnt
-    global gTCPlastTime
-    #
-    if gSocketConn != None:
-        print ("TCP-S> close accepted connection", flush=True)
-        gSocketConn.close()
-        gSocketConn = gSocketAddr = None
-        gTCPlastTime = gTCPerrCnt = 0
-    #
-    if gSocketServer != None:
-        gSocketServer.listen(clientNum)
-        print ("TCP-S> listening...", flush=True) 
-        gTCPerrCnt = 0
-        gTCPlastTime = time.time()
-    else:
-        print ("TCP-S> socket is null ... Exiting...", flush=True)
-        return False
-    #
-    return True    
 
 #############################################
 # close socket
 #
 def close_socket():
-    global gSocketServer
-    global gSocketConn
-    global gSocketAddr
-    global gTCPerrCnt
-    global gTCPlastTime
-    #
-    if gSocketConn != None:
-        print ("TCP-S> close accepted connection", flush=True)
-        gSocketConn.close()
-        gSocketConn = gSocketAddr = None
-        gTCPlastTime = gTCPerrCnt = 0
-    #
-    if gSocketServer != None:
-        print ("TCP-S> close socket", flush=True)
-        gSocketServer.close()
-        gSocketServer = None
+    GW.close_gateway()
     #
     return    
 
-##############################################
-# check TCP error
+#############################################
+# restart server process on SIGHUP; WSN clients kept connected, no DEV_CLOSE
+# gateway sockets and flask listening socket are inherited by the new process
 #
-def check_tcp_error():
-    global gTCPerrCnt
-    #
-    if gTCPerrCnt > TCP_ERR_CNT_MAX:
-        refresh_socket()
-        return True
+def restart_server(signum, frame):
+    print ("WSN-S> restarting...", flush=True)
+    if not GW.handover_gateway(TCP_HANDOVER_FILE):
+        print ("WSN-S> handover fail, restart cancelled", flush=True)
+        return
+    # werkzeug serves on the listening socket named by WERKZEUG_SERVER_FD as on reloading
+    os.environ['WERKZEUG_RUN_MAIN'] = 'true'
+    os.execv(sys.executable, [sys.executable] + sys.argv)
 
-    return False
+#############################################
+# flask listening socket made here and named to werkzeug by WERKZEUG_SERVER_FD; inheritable
+# so that the process restarted serves on it at once; the one inherited taken if named already
+#
+def http_socket():
+    global gHttpSocket
+    #
+    if os.environ.get('WERKZEUG_SERVER_FD', '') != '':
+        return
+    gHttpSocket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    gHttpSocket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    gHttpSocket.bind(('0.0.0.0', TCP_HTTP_PORT))
+    gHttpSocket.listen(128)
+    gHttpSocket.set_inheritable(True)
+    os.environ['WERKZEUG_SERVER_FD'] = str(gHttpSocket.fileno())
 
 ##############################################
-# accept socket
-#
-def accept_socket(blockingTimer = 8):
-    global gSocketServer
-    global gSocketConn
-    global gSocketAddr
-    global gTCPerrCnt
-    global gTCPlastTime
+# get the device a request addresses; default device if not given
+#
+def request_device(data = None):
+    dev_id = request.args.get('dev')
+    if dev_id == None:
+        if data == None:
+            try:
+                data = json.loads(request.data)
+            except:
+                data = {}
+        if isinstance(data, dict):
+            dev_id = data.get('dev')
     #
-    check_tcp_error()
-    if gSocketConn == None:
-        print ("----->\nTCP-S> wait client; accepting => ", end = '', flush=True)
-        try:
-            gSocketServer.setblocking(blockingTimer)
-            gSocketConn, gSocketAddr = gSocketServer.accept()
-        except:
-            print ("error !\n----->", flush=True)
-            gSocketConn = gSocketAddr = None
-            return False         
-        print ("accepted port# [", gSocketAddr, "]\n----->", flush=True)
-        gTCPlastTime = time.time()
-    return True    
+    return GW.find_device(dev_id)
 
 ##############################################
-# read from socket
+# get the owner of a request; id of the browser session told by UI, client address if not given
 #
-def read_from_socket(blockingTimer = 8):
-    global gSocketServer
-    global gSocketConn
-    global gTCPerrCnt
-    global gTCPlastTime
+def request_owner(data = None):
+    owner = request.args.get('owner')
+    if owner == None:
+        if data == None:
+            try:
+                data = json.loads(request.data)
+            except:
+                data = {}
+        if isinstance(data, dict):
+            owner = data.get('owner')
+    if owner == None or owner == '':
+        owner = request.remote_addr
     #
-    accept_socket(3)
-    print ("TCP-S> [RX] wait => ", end = '', flush=True)
-    rx_msg = ''
-    gSocketServer.setblocking(blockingTimer)
-    try:
-        data = gSocketConn.recv(TCP_PACKET_MAX)
-    except TimeoutError:
-        print ("timeout !", flush=True)
-    except Exception as e:
-        gTCPerrCnt += 1
-        print ('error "%r"!' % (e), flush=True)
-    else: 
-        rx_msg = data.decode()
-        n = len(rx_msg)
-        if n < 40:
-            print ('received "%r"' % rx_msg, flush=True)
-        else:
-            txt = rx_msg[0:40]
-            txt.replace('\n','\\n')
-            print ('received "%r"...; %d bytes' % (txt ,n), flush=True)
-        gTCPlastTime = time.time()        
+    return owner
+
+##############################################
+# send a command to socket and wait the reply
+# returns None if timeout or disconnected, '' if refused
+#
+def command_socket(dev_id, tx_msg, blockingTimer = 8):
+    if dev_id == None:
+        print ("TCP-S> [TX/RX] no device to command !", flush=True)
+        return None
     #    
-    return rx_msg   
+    return GW.command_device(dev_id, tx_msg, blockingTimer)
 
 #############################################
-# write to socket
+# get BDT data from socket; chunk requests kept in flight, resumed if client reconnects
+# returns list of text chunks and transfer stats, None if failed
 #
-def write_to_socket(tx_msg):
-    global gSocketServer
-    global gSocketConn
-    global gTCPerrCnt
-    global gTCPlastTime
+def bulk_from_socket(dev_id):
+    if dev_id == None:
+        print ("TCP-S> [BULK] no device to get data !", flush=True)
+        return None
     #
-    accept_socket(3)
-    print ("TCP-S> [TX] try => ", end = '', flush=True)
-    try:
-        gSocketConn.send(tx_msg.encode())
-    except Exception as e:
-        gTCPerrCnt += 1
-        print ('error "%r"!' % (e), flush=True)
-    else:
-        print ('"%r" sent to WSN client' % tx_msg, flush=True)
-        gTCPlastTime = time.time()
+    return GW.bulk_from_device(dev_id, TCP_BDT_INFO_MSG, TCP_BDT_REQ_MSG, TCP_BDT_ACK_MSG)
+
+#############################################
+# write to socket; not waiting the reply
+#
+def write_to_socket(dev_id, tx_msg):
+    if dev_id == None:
+        print ("TCP-S> [TX] no device to write !", flush=True)
+        return False
     #    
-    return
+    return GW.write_to_device(dev_id, tx_msg)
 #
 #############################################
 
@@ -334,12 +361,12 @@ def mobile():
     return template.render()
 
 #############################################
-# sensor monitoring UI
+# sensor monitoring UI; trend of the last hour, of days if STE history kept
 #
 @app.route('/m_monitor')
 def monitor():
     template = env.get_template('m_monitor.html')
-    return template.render()
+    return template.render(trend=True, history=TCP_HISTORY_PATH != '')
 
 #############################################
 # acquisition UI
@@ -394,6 +421,28 @@ def intro_0():
 # sub-menu button stuffs
 #
 
+#############################################
+# monitoring - row and status of a STE row; status of anomaly scoring by gateway
+#
+def monitor_rows(from_client, anomaly = None):
+    if from_client != None and from_client != '':
+        from_client = from_client.replace(')','')
+        from_client = from_client.replace('(','')
+        vals = from_client.split(',')     
+        # status scored by gateway against the baseline of the device
+        if anomaly != None:
+            status = anomaly['status']
+        else:
+            status = ['UNKNOWN', 'UNKNOWN']
+        rows = {'row' : vals, 'status' : status, 'timer' : 'on' }
+    else:                          
+        rows = {'row' : [time_stamp(),'?','?','?','?','?','?','?','?','?','?','?'],
+                'status' : ['-?-', '-?-'],
+                'timer' : 'on'
+               }               
+
+    return rows
+
 #############################################
 # monitoring UI - start
 #
@@ -402,71 +451,40 @@ def post_monStart():
     data = json.loads(request.data)
     value = data['value']
     #
-    global gSTElockFlag
-    global gBDTlockFlag
+    dev_id = request_device(data)
+    owner = request_owner(data)
 
     # check client socket connect
-    if (gSocketConn == None):
+    if (dev_id == None):
         rows = {'row' : [time_stamp(),'*','*','*','*','*','*','*','*','*','*','*'],
                 'status' : ['[sensor device]', '[is disconnected]'],
                 'timer' : 'off'
                }
         return json.dumps(rows)   
 
-    # check STE, BDT lock flag
-    if (value==0 and  gSTElockFlag) or gBDTlockFlag:
+    # take or renew STE lease shared by all viewers of the device; refused only while BDT runs on it
+    if not GW.acquire_lease(dev_id, LEASE_STE, TCP_MONITOR_OWNER, LEASE_STE_TIME, [LEASE_STE, LEASE_BDT]):
         rows = {'row' : [time_stamp(),'*','*','*','*','*','*','*','*','*','*','*'],
                 'status' : ['[locked]', '[by other user]'],
                 'timer' : 'off'
                }
-        write_to_socket(TCP_STE_STOP_MSG)
-        gSTElockFlag = False                     
         return json.dumps(rows)   
 
-    # send STE start & request
+    # subscribe to STE sampler of the device; sampled once per interval for all viewers
     print('WSN-S> monitoring count "%r"' % value, flush=True)
-    if value==0: 
-        write_to_socket(TCP_STE_START_MSG)
+    if value<11:    
+        interval = max(float(data.get('interval', TCP_MONITOR_INTERVAL)), TCP_MONITOR_INTERVAL)
+        GW.subscribe_samples(dev_id, owner, TCP_STE_START_MSG, TCP_STE_STOP_MSG, TCP_STE_REQ_MSG, interval, LEASE_STE_TIME)
+        sample = GW.sampled_row(dev_id)
         from_client = None
-    elif value<11:    
-        gSTElockFlag = True
-        write_to_socket(TCP_STE_REQ_MSG)
-        from_client = read_from_socket(blockingTimer = 20)
+        anomaly = None
+        if sample != None and time.time() - sample['time'] < TCP_SAMPLE_MAX_AGE:
+            from_client = sample['row']
+            anomaly = sample['anomaly']
     else:
-        post_monStop()
-        return    
+        return post_monStop()
     # get the data to post
-    if from_client != None and from_client != '':
-        from_client = from_client.replace(')','')
-        from_client = from_client.replace('(','')
-        vals = from_client.split(',')     
-        try:
-            # get the status
-            val_x = float(vals[2])
-            val_y = float(vals[4])
-            val_z = float(vals[6])
-        except Exception as e:
-            print('WSN-S> error during monitoring, "%r"' % (e), flush=True)
-            status = ['UNKNOWN', 'UNKNOWN']
-        else:    
-            # ===========================================
-            # analyz more to display status afterward....
-            # ===========================================
-            if max(val_x, val_y, val_z) >= 0.7 or (val_x > 0.2 and val_y > 0.2  and val_z > 0.2):        
-                status = ['VIBRATION', 'ABNORMAL']
-            elif max(val_x, val_y, val_z) >= 0.2:
-                status = ['VIBRATION', 'NORMAL']
-            elif val_x == 0.0 and val_y == 0.0  and val_z == 0.0: 
-                status = ['STOP', 'NORMAL']
-            else:    
-                status = ['STOP', 'UNKNOWN']
-            # ===========================================
-        rows = {'row' : vals, 'status' : status, 'timer' : 'on' }
-    else:                          
-        rows = {'row' : [time_stamp(),'?','?','?','?','?','?','?','?','?','?','?'],
-                'status' : ['-?-', '-?-'],
-                'timer' : 'on'
-               }               
+    rows = monitor_rows(from_client, anomaly)
 
     return json.dumps(rows)
 
@@ -478,11 +496,12 @@ def post_monStop():
     #data = json.loads(request.data)
     #value = data['value']
     #
-    global gSTElockFlag
+    dev_id = request_device()
+    owner = request_owner()
 
-    # send STE stop
-    write_to_socket(TCP_STE_STOP_MSG)
-    gSTElockFlag = False
+    # leave STE sampler; it sends STE stop when no viewer is left
+    if GW.unsubscribe_samples(dev_id, owner) == 0:
+        GW.release_lease(dev_id, LEASE_STE, TCP_MONITOR_OWNER)
 
     rows = {'row' : [time_stamp(),'*','*','*','*','*','*','*','*','*','*','*'],
             'status' : ['---', '---'],
@@ -490,6 +509,107 @@ def post_monStop():
             }               
     return json.dumps(rows)
 
+#############################################
+# server-sent event of data
+#
+def sse_event(event, data):
+    return 'event: %s\ndata: %s\n\n' % (event, json.dumps(data))
+
+#############################################
+# monitoring UI - stream; rows pushed as sampled till the browser closes it
+# dev, owner and interval as arguments
+#
+@app.route('/stream_mon', methods=['GET'])
+def stream_mon():
+    dev_id = request_device()
+    owner = request_owner()
+    interval = max(float(request.args.get('interval', TCP_MONITOR_INTERVAL)), TCP_MONITOR_INTERVAL)
+
+    def events():
+        # check client socket connect
+        if (dev_id == None):
+            rows = {'row' : [time_stamp(),'*','*','*','*','*','*','*','*','*','*','*'],
+                    'status' : ['[sensor device]', '[is disconnected]'],
+                    'timer' : 'off'
+                   }
+            yield sse_event('row', rows)
+            return
+        print('WSN-S> monitoring stream [%s] of [%s] opened' % (dev_id, owner), flush=True)
+        seq = 0
+        try:
+            while True:
+                # renew STE lease shared by all viewers and subscription to STE sampler
+                if not GW.acquire_lease(dev_id, LEASE_STE, TCP_MONITOR_OWNER, LEASE_STE_TIME, [LEASE_STE, LEASE_BDT]):
+                    rows = {'row' : [time_stamp(),'*','*','*','*','*','*','*','*','*','*','*'],
+                            'status' : ['[locked]', '[by other user]'],
+                            'timer' : 'off'
+                           }
+                    yield sse_event('row', rows)
+                    return
+                if GW.subscribe_samples(dev_id, owner, TCP_STE_START_MSG, TCP_STE_STOP_MSG, TCP_STE_REQ_MSG, interval, LEASE_STE_TIME) == None:
+                    rows = {'row' : [time_stamp(),'*','*','*','*','*','*','*','*','*','*','*'],
+                            'status' : ['[sensor device]', '[is disconnected]'],
+                            'timer' : 'off'
+                           }
+                    yield sse_event('row', rows)
+                    return
+                # push a row as soon as sampled, keepalive if none
+                sample = GW.sampled_row(dev_id, seq, TCP_STREAM_WAIT_TIME)
+                if sample != None and sample['seq'] != seq:
+                    seq = sample['seq']
+                    yield sse_event('row', monitor_rows(sample['row'], sample['anomaly']))
+                else:
+                    yield ': keepalive\n\n'
+        finally:
+            if GW.unsubscribe_samples(dev_id, owner) == 0:
+                GW.release_lease(dev_id, LEASE_STE, TCP_MONITOR_OWNER)
+            print('WSN-S> monitoring stream [%s] of [%s] closed' % (dev_id, owner), flush=True)
+
+    return Response(events(), mimetype='text/event-stream', headers={'Cache-Control' : 'no-cache'})
+
+#############################################
+# monitoring UI - trend of the last minutes; rows kept in memory by gateway, no disk, no device
+# dev, minutes and points as arguments
+#
+@app.route('/get_trend', methods=['GET'])
+def get_trend():
+    dev_id = request_device()
+    minutes = min(float(request.args.get('minutes', TCP_TREND_MINUTES)), 60.)
+    points = min(int(request.args.get('points', TCP_TREND_POINTS)), TCP_TREND_POINTS_MAX)
+
+    trend = GW.ste_trend(dev_id, minutes * 60., points) if dev_id != None else None
+    if trend == None:
+        trend = { 'dev' : dev_id, 'window' : minutes * 60., 'count' : 0, 'fields' : [],
+                  'mean' : [], 'max' : [], 'var' : [], 't' : [], 'y' : [] }
+    return json.dumps(trend)
+
+#############################################
+# monitoring UI - trend of days from STE history on disk; as get_trend
+# dev, start and end unix time or days before now, and points as arguments
+#
+@app.route('/get_history', methods=['GET'])
+def get_history():
+    dev_id = request.args.get('dev') or request_device()
+    end = float(request.args.get('end', time.time()))
+    start = float(request.args.get('start', end - float(request.args.get('days', TCP_HISTORY_DAYS)) * 86400.))
+    points = min(int(request.args.get('points', TCP_TREND_POINTS)), TCP_TREND_POINTS_MAX)
+
+    trend = GW.ste_history(dev_id, start, end, points) if dev_id != None else None
+    if trend == None:
+        trend = { 'dev' : dev_id, 'window' : end - start, 'count' : 0, 'fields' : [],
+                  'mean' : [], 'max' : [], 'var' : [], 't' : [], 'y' : [] }
+    return json.dumps(trend)
+
+#############################################
+# alerts UI - counts, detection to notification latency, active and recent alerts
+#
+@app.route('/get_alerts', methods=['GET'])
+def get_alerts():
+    alerts = GW.alert_status()
+    if alerts == None:
+        alerts = { 'rules' : 0, 'sinks' : [], 'counts' : {}, 'latency' : { 'count' : 0 }, 'active' : [], 'recent' : [] }
+    return json.dumps(alerts)
+
 #############################################
 # analysis UI - STEandBDT
 #
@@ -498,39 +618,37 @@ def post_STEandBDT():
     #data = json.loads(request.data)
     #value = data['value']
     #
-    global gSTElockFlag
-    global gBDTlockFlag
-    global gBDTtextList
+    dev_id = request_device()
+    owner = request_owner()
 
     # check client socket connect
-    if (gSocketConn == None):
+    if (dev_id == None):
         msgs = {'msg_00' : "sensor device is disconnected",
                 'msg_01' : 'N'
            }
         return json.dumps(msgs)
 
-    # check BDT lock flag
-    if gBDTlockFlag or gSTElockFlag:
+    # take BDT lease of the device
+    if not GW.acquire_lease(dev_id, LEASE_BDT, owner, LEASE_BDT_TIME, [LEASE_BDT, LEASE_STE, LEASE_XFER]):
         msgs = {'msg_00' : "somebody is running BDT or STE",
                 'msg_01' : 'N'
            }
         return json.dumps(msgs)
 
-    # send BDT run
-    write_to_socket(TCP_BDT_RUN_MSG)
-    time.sleep(3.0)
-    # wait till echo-back
-    write_to_socket(TCP_BDT_END_MSG)
-    from_client = ''
-    while from_client != TCP_BDT_END_MSG:
-        from_client = read_from_socket(blockingTimer = 8)
-    #
-    msgs = {'msg_00' : time_stamp(),
-            'msg_01' : 'Y'
-           }
-
-    # release BDT lock flag
-    gBDTlockFlag = False    
+    try:
+        # send BDT run and wait till completed
+        from_client = command_socket(dev_id, TCP_BDT_RUN_MSG, blockingTimer = TCP_BDT_RUN_WAIT_TIME)
+        if from_client == TCP_BDT_RUN_MSG:
+            msgs = {'msg_00' : time_stamp(),
+                    'msg_01' : 'Y'
+                   }
+        else:
+            msgs = {'msg_00' : "sensor device did not complete BDT",
+                    'msg_01' : 'N'
+                   }
+    finally:
+        # release BDT lease
+        GW.release_lease(dev_id, LEASE_BDT, owner)
     
     return json.dumps(msgs)
 
@@ -542,43 +660,41 @@ def post_BDTtoServer():
     #data = json.loads(request.data)
     #value = data['value']
     #
-    global gSTElockFlag
-    global gBDTlockFlag
-    global gBDTtextList
+    dev_id = request_device()
+    owner = request_owner()
 
-    # check BDT lock flag
-    if gBDTlockFlag or gSTElockFlag:
-        msgs = {'msg_00' : "somebody is running BDT or STE",
+    # check client socket connect
+    if (dev_id == None):
+        msgs = {'msg_00' : "sensor device is disconnected",
                 'msg_01' : 'N'
            }
         return json.dumps(msgs)
-    else:    
-        gBDTlockFlag = True    
-
-    # init data buffer
-    gBDTtextList = []
-    while True:
-        # send BDT request
-        ##accept_socket()
-        time.sleep(0.1)
-        write_to_socket(TCP_BDT_REQ_MSG)
-        time.sleep(0.1)
-        # get data from client
-        from_client = ''
-        while from_client == '':
-            from_client = read_from_socket(blockingTimer = 8)
-        if from_client.find('End of Data') == -1:
-            gBDTtextList.append(from_client)
-        else:
-            gBDTtextList.append(from_client)
-            break
-    #
-    msgs = {'msg_00' : time_stamp(),
-            'msg_01' : 'Y'
+
+    # take transfer lease of the device
+    if not GW.acquire_lease(dev_id, LEASE_XFER, owner, LEASE_XFER_TIME, [LEASE_BDT, LEASE_XFER]):
+        msgs = {'msg_00' : "somebody is running BDT or STE",
+                'msg_01' : 'N'
            }
+        return json.dumps(msgs)
 
-    # release BDT lock flag
-    gBDTlockFlag = False    
+    try:
+        # get data from client; window of BDT requests in flight
+        GW.set_shared(SHARED_BDT_TEXT + dev_id, [])
+        from_client = bulk_from_socket(dev_id)
+        if from_client != None:
+            BDTtextList, stats = from_client
+            GW.set_shared(SHARED_BDT_TEXT + dev_id, BDTtextList)
+            alert_capture(dev_id, BDTtextList)
+            msgs = {'msg_00' : time_stamp() + ' %d bytes, %.1f KB/s, %.1f%% on wire' % (stats['bytes'], stats['kbps'], stats['ratio'] * 100.),
+                    'msg_01' : 'Y'
+                   }
+        else:
+            msgs = {'msg_00' : "sensor device did not send BDT data",
+                    'msg_01' : 'N'
+                   }
+    finally:
+        # release transfer lease
+        GW.release_lease(dev_id, LEASE_XFER, owner)
     
     return json.dumps(msgs)
 
@@ -590,42 +706,129 @@ def post_BDTtoFile():
     data = json.loads(request.data)
     value = data['value']
     #
-    global gSTElockFlag
-    global gBDTlockFlag
-    global gBDTtextList
+    # device the data came from; may be disconnected since
+    dev_id = request_device(data)
+    if dev_id == None:
+        dev_id = data.get('dev') or ''
+    owner = request_owner(data)
 
-    # check BDT lock flag
-    if gBDTlockFlag or gSTElockFlag:
+    # take BDT lease of the device
+    if not GW.acquire_lease(dev_id, LEASE_BDT, owner, LEASE_BDT_TIME, [LEASE_BDT, LEASE_STE, LEASE_XFER]):
         msgs = {'msg_00' : "somebody is running BDT or STE",
                 'msg_01' : 'N'
            }
         return json.dumps(msgs)
-    else:    
-        gBDTlockFlag = True    
 
-    # write to file
-    idx = 0
-    n = len(gBDTtextList)
-    fmark = value.strip().replace(' ', '_')
-    fname  = WSN_LOG_FILE_PATH
-    fname += '/' + WSN_LOG_FILE_PREFIX
-    fname += '_' + datetime.datetime.fromtimestamp(time.time()).strftime('%Y%m%d%H%M%S')
-    if fmark != '':
-        fname += '_' + fmark
-    fname += WSN_LOG_FILE_SUFFIX
-    f = open(fname, "w")
-    for idx in range(n):
-        f.write(gBDTtextList[idx])
-    f.close()
+    try:
+        # write to file
+        idx = 0
+        BDTtextList = GW.get_shared(SHARED_BDT_TEXT + dev_id, [])
+        n = len(BDTtextList)
+        fmark = value.strip().replace(' ', '_')
+        fname  = WSN_LOG_FILE_PATH
+        fname += '/' + WSN_LOG_FILE_PREFIX
+        fname += '_' + datetime.datetime.fromtimestamp(time.time()).strftime('%Y%m%d%H%M%S')
+        if fmark != '':
+            fname += '_' + fmark
+        fname += WSN_LOG_FILE_SUFFIX
+        f = open(fname, "w")
+        for idx in range(n):
+            f.write(BDTtextList[idx])
+        f.close()
+        #
+        msgs = {'msg_00' : time_stamp() + ' "' + fname + '" was created',
+                'msg_01' : 'Y'
+               }
+    finally:
+        # release BDT lease
+        GW.release_lease(dev_id, LEASE_BDT, owner)
+
+    return json.dumps(msgs)    
+
+#############################################
+# analysis UI - capture job start; BDT run and/or transfer in background, job id returned at once
+# kind 'run' as STEandBDT, 'transfer' as BDTtoServer, 'capture' for both
+#
+@app.route('/post_jobStart', methods=['POST'])
+def post_jobStart():
+    data = json.loads(request.data)
+    kind = data.get('kind', 'capture')
     #
-    msgs = {'msg_00' : time_stamp() + ' "' + fname + '" was created',
-            'msg_01' : 'Y'
+    dev_id = request_device(data)
+    owner = request_owner(data)
+
+    # check client socket connect
+    if (dev_id == None):
+        msgs = {'msg_00' : "sensor device is disconnected",
+                'msg_01' : 'N'
            }
+        return json.dumps(msgs)
 
-    # release BDT lock flag
-    gBDTlockFlag = False    
+    # steps of the job and lease it holds till finished
+    run_step  = ['command', TCP_BDT_RUN_MSG, TCP_BDT_RUN_WAIT_TIME, TCP_BDT_RUN_MSG]
+    bulk_step = ['bulk', TCP_BDT_INFO_MSG, TCP_BDT_REQ_MSG, TCP_BDT_ACK_MSG]
+    if kind == 'run':
+        steps = [run_step]
+        lease, busy = LEASE_BDT, [LEASE_BDT, LEASE_STE, LEASE_XFER]
+    elif kind == 'transfer':
+        steps = [bulk_step]
+        lease, busy = LEASE_XFER, [LEASE_BDT, LEASE_XFER]
+    else:
+        steps = [run_step, bulk_step]
+        lease, busy = LEASE_BDT, [LEASE_BDT, LEASE_STE, LEASE_XFER]
 
-    return json.dumps(msgs)    
+    # take lease of the device; released by the job when finished
+    if not GW.acquire_lease(dev_id, lease, owner, LEASE_JOB_TIME, busy):
+        msgs = {'msg_00' : "somebody is running BDT or STE",
+                'msg_01' : 'N'
+           }
+        return json.dumps(msgs)
+
+    # queue the job to the device
+    job_id = GW.submit_job(dev_id, steps, owner, [lease], SHARED_BDT_TEXT + dev_id if kind != 'run' else '')
+    if job_id == None:
+        GW.release_lease(dev_id, lease, owner)
+        msgs = {'msg_00' : "sensor device has too many jobs waiting",
+                'msg_01' : 'N'
+           }
+        return json.dumps(msgs)
+    msgs = {'msg_00' : time_stamp() + ' job ' + job_id,
+            'msg_01' : 'Y',
+            'job'    : job_id
+           }
+    return json.dumps(msgs)
+
+#############################################
+# analysis UI - capture job progress and result
+# msg_01 'Y' if done, 'N' if failed or unknown, '-' while queued or running
+#
+@app.route('/get_job', methods=['GET'])
+def get_job():
+    status = GW.job_status(request.args.get('job', ''))
+    if status == None:
+        msgs = {'state'  : 'unknown',
+                'msg_00' : "no such job",
+                'msg_01' : 'N'
+           }
+        return json.dumps(msgs)
+    if status['state'] == 'done':
+        stats = status['stats']
+        status['msg_00'] = time_stamp()
+        if stats != None:
+            status['msg_00'] += ' %d bytes, %.1f KB/s, %.1f%% on wire' % (stats['bytes'], stats['kbps'], stats['ratio'] * 100.)
+        status['msg_01'] = 'Y'
+    elif status['state'] == 'failed':
+        status['msg_00'] = status['error']
+        status['msg_01'] = 'N'
+    elif status['state'] == 'running':
+        status['msg_00'] = 'step %d/%d "%s"' % (status['step'], status['steps'], status['what'])
+        if status['length'] > 0:
+            status['msg_00'] += ' %d of %d bytes' % (status['bytes'], status['length'])
+        status['msg_01'] = '-'
+    else:
+        status['msg_00'] = 'waiting'
+        status['msg_01'] = '-'
+    return json.dumps(status)
 
 #############################################
 # graphics - time series UI - drawing
@@ -714,19 +917,10 @@ def post_graphTime():
     return json.dumps({ 'x': x, 'y': y, 't': time_stamp, 'f': freq_stamp, 'm': value })
 
 #############################################
-# graphics - frequency UI - drawing
+# spectrum of sensor data lines as a log file holds them; 4 header lines then x, y, z accelerometer values
+# f as an open log file or lines of BDT data
 #
-@app.route('/post_graphFreq', methods=['POST'])
-def post_graphFreq():
-    data = json.loads(request.data)
-    fname = data['fname']
-    if fname == '':
-        fname = WSN_LOG_FILE_NAME
-    else:
-        fname = WSN_LOG_FILE_PATH + '/' + fname    
-    # read sensor data from file    
-    f = open(fname, "r")
-    print("WSN-S> open sensor data log file: %s" % fname, flush=True)
+def SCD_spectrum(f):
     # check 4 header lines
     row = f.readline()
     time_stamp = stamp_heder(row,WSN_STAMP_TIME)
@@ -768,7 +962,6 @@ def post_graphFreq():
                 print('WSN-S> error line at [%d], "%r"' % (n, e), flush=True)
             n += 1        
     print("WSN-S> read [%d] lines of data" % n, flush=True)    
-    f.close()          
     # prepare fourier Transform
     print("WSN-S> prepare FFT", flush=True)
     sampling_frequency = float(freq_str)
@@ -802,7 +995,39 @@ def post_graphFreq():
         y.append(y_val)
         idx += 1
     
-    return json.dumps({ 'x': x, 'y': y, 't': time_stamp, 'f': freq_stamp, 'm': 'Fourier Transform' })
+    return { 'x': x, 'y': y, 't': time_stamp, 'f': freq_stamp }
+
+#############################################
+# spectrum of BDT data captured from a device told to alert rules; nothing if not parsed
+#
+def alert_capture(dev_id, BDTtextList):
+    if len(BDTtextList) == 0:
+        return
+    try:
+        spectrum = SCD_spectrum(io.StringIO(''.join(BDTtextList)))
+    except Exception as e:
+        print('WSN-S> BDT data of [%s] not parsed to spectrum, "%r"' % (dev_id, e), flush=True)
+        return
+    GW.alert_spectrum(dev_id, spectrum['x'], spectrum['y'])
+
+#############################################
+# graphics - frequency UI - drawing
+#
+@app.route('/post_graphFreq', methods=['POST'])
+def post_graphFreq():
+    data = json.loads(request.data)
+    fname = data['fname']
+    if fname == '':
+        fname = WSN_LOG_FILE_NAME
+    else:
+        fname = WSN_LOG_FILE_PATH + '/' + fname    
+    # read sensor data from file    
+    f = open(fname, "r")
+    print("WSN-S> open sensor data log file: %s" % fname, flush=True)
+    spectrum = SCD_spectrum(f)
+    f.close()
+    spectrum['m'] = 'Fourier Transform'
+    return json.dumps(spectrum)
 
 #############################################
 #         
@@ -811,29 +1036,13 @@ def post_graphFreq():
 
 #############################################
 #
-# DEVICE READY polling
-@app.route('/get_polling/<message>', methods=['GET'])
-def get_polling(message):
-    global gSocketConn
-    global gSocketAddr
+# device listing
+@app.route('/post_devList', methods=['POST'])
+def post_devList():
+    rows = GW.list_devices()
+    print('WSN-S> "%d" devices listed ' % len(rows), flush=True)                       
 
-    msg = escape(message)
-    ret_msg = '' 
-    print('WSN-S> "%r" reeived from WSN client' % msg, flush=True)
-    if msg == TCP_DEV_READY_MSG or msg == TCP_STE_STOP_MSG or msg == TCP_DEV_CLOSE_MSG:
-        if gSocketConn != None:
-            write_to_socket(msg)
-            ret_msg = 'replied: ' + msg + ' at ' + time_stamp() + ' to WSN client'
-            if msg == TCP_DEV_CLOSE_MSG:
-                gSocketConn.close()
-                gSocketConn = gSocketAddr = None
-        else:
-            ret_msg = 'could not reply: ' + msg + ' at ' + time_stamp() + ' to WSN client'    
-    elif msg == TCP_DEV_OPEN_MSG:
-        if gSocketConn == None:
-            accept_socket(ACCEPT_WAIT_TIME)
-    #        
-    return ret_msg
+    return json.dumps({'rows' : rows})
 
 #############################################
 #
@@ -864,15 +1073,18 @@ if __name__ == '__main__':
     print("WSN-S> starting !", flush=True)
     try:
         if open_socket():
+            signal.signal(signal.SIGHUP, restart_server)
+            http_socket()
             #
             # flask web server running
             #
-            app.run(host='0.0.0.0', port=8081)
+            app.run(host='0.0.0.0', port=TCP_HTTP_PORT, threaded=(TCP_HTTP_PROCESSES == 1), processes=TCP_HTTP_PROCESSES)
             #
     ## except KeyboardInterrupt: # does not work, seems caught by flask
     except:     
         print("WSN-S> error during running, close client...", flush=True)
-        write_to_socket(TCP_DEV_CLOSE_MSG)
+        for dev in GW.list_devices():
+            write_to_socket(dev['dev'], TCP_DEV_CLOSE_MSG)
     close_socket()
     print("WSN-S> all done !", flush=True)
 #
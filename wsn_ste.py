@@ -0,0 +1,144 @@
+"""
+in-memory ring buffer of STE rows per device for trend of the last minutes
+coded functions as below
+- STE row of SCD_string_STE_data parsed into its unix time and 11 values
+    accelerometer mean/variance X/Y/Z, temperature, light, magnetometer X/Y/Z
+- fixed size ring of numpy arrays; a column per STE field, a time column
+    appended in place at the head, O(1); the oldest row overwritten when full
+    rows not newer than the last one dropped; a row sampled and pushed on UDP kept once
+- windowed mean, max and variance of each field over the last seconds; vectorized on the ring
+- series of the last seconds averaged into buckets for a trend chart; bucket_series() for rows of wsn_history too
+- no disk, no device; filled by the gateway from rows it has sampled
+
+usage: import wsn_ste as STE
+       ring = STE.SteRing(); ring.append_row(row) then ring.stats(600), ring.series(600, 120)
+
+                    started 2026-10-18
+                    updated 2026-10-18; bucket series shared with history queries
+"""
+import threading
+import time
+
+import numpy as np
+
+#############################################
+# target definitions to STE ring
+#############################################
+#
+STE_RING_SIZE     = 3600              # rows kept per device; an hour of rows at 1 sec
+STE_FIELDS        = ['accel_mean_x', 'accel_var_x', 'accel_mean_y', 'accel_var_y', 'accel_mean_z', 'accel_var_z',
+                     'temperature', 'light', 'mag_x', 'mag_y', 'mag_z']
+
+#############################################
+# unix time and values of a STE row, None if not parsed
+# row as "(YYYY-MM-DD hh:mm:ss [unix_time],v1,...,v11)"
+#
+def parse_row(row):
+    try:
+        vals = row.replace('(','').replace(')','').split(',')
+        t = float(vals[0][vals[0].index('[') + 1 : vals[0].index(']')])
+        values = [ float(val) for val in vals[1 : len(STE_FIELDS) + 1] ]
+    except (AttributeError, ValueError, IndexError):
+        return None
+    if len(values) != len(STE_FIELDS):
+        return None
+    return t, values
+
+#############################################
+#############################################
+#
+# ring buffer of a device
+#
+#############################################
+class SteRing:
+
+    def __init__(self, size = STE_RING_SIZE):
+        self.size   = size
+        self.times  = np.zeros(size)
+        self.values = np.zeros((size, len(STE_FIELDS)))
+        self.head   = 0       # index the next row written to
+        self.count  = 0       # rows kept, up to size
+        self.last   = 0.      # unix time of the last row
+        self.lock   = threading.Lock()
+
+    #############################################
+    # append a row in place; False if not newer than the last one
+    #
+    def append(self, t, values):
+        with self.lock:
+            if t <= self.last:
+                return False
+            self.times[self.head] = t
+            self.values[self.head] = values
+            self.head = (self.head + 1) % self.size
+            self.count = min(self.count + 1, self.size)
+            self.last = t
+        return True
+
+    #############################################
+    # append a STE row as the device sends it; False if not parsed or not newer
+    #
+    def append_row(self, row):
+        parsed = parse_row(row)
+        if parsed == None:
+            return False
+        return self.append(*parsed)
+
+    #############################################
+    # times and values of rows in the last seconds before now, oldest first; copies
+    #
+    def window(self, seconds, now = None):
+        if now == None:
+            now = time.time()
+        with self.lock:
+            if self.count < self.size:
+                times, values = self.times[:self.count].copy(), self.values[:self.count].copy()
+            else:
+                times, values = np.roll(self.times, -self.head), np.roll(self.values, -self.head, axis=0)
+        keep = times >= now - seconds
+        return times[keep], values[keep]
+
+    #############################################
+    # row count, mean, max and variance of each field in the last seconds
+    #
+    def stats(self, seconds, now = None):
+        times, values = self.window(seconds, now)
+        return window_stats(values)
+
+    #############################################
+    # rows of the last seconds averaged into buckets of equal time; empty buckets left out
+    # t in seconds before now, y as a list per field
+    #
+    def series(self, seconds, points, now = None):
+        if now == None:
+            now = time.time()
+        times, values = self.window(seconds, now)
+        return bucket_series(times, values, now - seconds, now, points, now)
+
+#############################################
+# rows between start and end averaged into points buckets of equal time; empty buckets left out
+# t in seconds before now, y as a list per field
+#
+def bucket_series(times, values, start, end, points, now):
+    if len(times) == 0:
+        return { 't' : [], 'y' : [ [] for field in STE_FIELDS ] }
+    bucket = np.clip( ((times - start) * points / max(end - start, 1e-3)).astype(int), 0, points - 1 )
+    counts = np.bincount(bucket, minlength=points)
+    used = counts > 0
+    sums = np.stack([ np.bincount(bucket, weights=values[:, n], minlength=points) for n in range(len(STE_FIELDS)) ])
+    t = np.bincount(bucket, weights=times, minlength=points)[used] / counts[used]
+    y = sums[:, used] / counts[used]
+    return { 't' : (t - now).round(1).tolist(), 'y' : y.round(4).tolist() }
+
+#############################################
+# row count, mean, max and variance of each field of rows
+#
+def window_stats(values):
+    if len(values) == 0:
+        return { 'count' : 0, 'mean' : [], 'max' : [], 'var' : [] }
+    return { 'count' : len(values),
+             'mean'  : values.mean(axis=0).round(4).tolist(),
+             'max'   : values.max(axis=0).round(4).tolist(),
+             'var'   : values.var(axis=0).round(4).tolist() }
+#
+#############################################